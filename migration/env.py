@@ -4,7 +4,8 @@ import sys
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import pool
+from alembic.operations import ops
+from sqlalchemy import pool, text
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
@@ -20,7 +21,7 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 from src.app.core.config import settings
-from src.app.db.models import Base
+from src.app.db.models import JOBS_NOTIFY_DDL, JOBS_NOTIFY_DROP_DDL, Base
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -63,8 +64,31 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def process_revision_directives(context, revision, directives) -> None:
+    """
+    Autogenerate не сравнивает триггеры: если триггера NOTIFY на jobs
+    в базе ещё нет, его DDL (идемпотентный) добавляется в миграцию.
+    """
+    exists = context.connection.execute(
+        text("SELECT 1 FROM pg_trigger WHERE tgname = 'jobs_notify_queued'")
+    ).scalar()
+    if exists:
+        return
+    script = directives[0]
+    script.upgrade_ops.ops.extend(
+        ops.ExecuteSQLOp(statement) for statement in JOBS_NOTIFY_DDL
+    )
+    script.downgrade_ops.ops[:0] = [
+        ops.ExecuteSQLOp(statement) for statement in JOBS_NOTIFY_DROP_DDL
+    ]
+
+
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        process_revision_directives=process_revision_directives,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -1,7 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from app.api.audio import router as audio_router
+from app.api.jobs import router as jobs_router
+from app.api.metrics import router as metrics_router
+from app.db.database import db_session
 
-main_router = APIRouter()
+# одна сессия БД на обработчик; закрывается до отправки ответа,
+# поэтому потоковые ответы не держат соединение
+main_router = APIRouter(dependencies=[Depends(db_session, scope="function")])
 
 main_router.include_router(audio_router)
+main_router.include_router(jobs_router)
+main_router.include_router(metrics_router)
@@ -1,45 +1,316 @@
+from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import FileResponse, StreamingResponse
 
 from app.core.containers import Container
-from app.schemas import AudioFileRead, UploadRead
-from app.services.audio_service import AudioService
+from app.db.models import StatusUploadEnum
+from app.schemas import (
+    AudioFileRead,
+    JobRead,
+    ResegmentRequest,
+    SegmentPage,
+    UploadComplete,
+    UploadCreate,
+    UploadOffset,
+    UploadPage,
+    UploadRead,
+    Waveform,
+)
+from app.services.audio_service import (
+    AudioService,
+    UnsupportedAudioError,
+    UploadConflictError,
+)
 
 router = APIRouter(prefix="/audio", tags=["audio"])
 
 
-@router.get("/uploads", response_model=list[UploadRead])
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Проверка заголовка If-None-Match (список ETag, W/-префикс, *)."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    if "*" in candidates:
+        return True
+    return etag in {tag.removeprefix("W/") for tag in candidates}
+
+
+@router.get("/uploads", response_model=UploadPage)
 @inject
 async def get_uploads(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = None,
+    upload_status: StatusUploadEnum | None = Query(
+        default=None, alias="status"
+    ),
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    detail: bool = False,
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    """
+    Загрузки от новых к старым. Следующая страница — по next_cursor.
+    detail=true добавляет задачи, аудиофайлы и сегменты.
+    """
+    try:
+        return await audio_service.get_uploads(
+            limit=limit,
+            cursor=cursor,
+            status=upload_status,
+            created_from=created_from,
+            created_to=created_to,
+            detail=detail,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/uploads", response_model=UploadRead, status_code=status.HTTP_201_CREATED
+)
+@inject
+async def create_upload(
+    data: UploadCreate,
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    return await audio_service.create_upload(data)
+
+
+@router.get("/uploads/{upload_id}/offset", response_model=UploadOffset)
+@inject
+async def get_upload_offset(
+    upload_id: UUID,
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    upload = await audio_service.get_upload(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+@router.patch("/uploads/{upload_id}", response_model=UploadOffset)
+@inject
+async def upload_chunk(
+    upload_id: UUID,
+    request: Request,
+    offset: int = Query(ge=0),
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    """
+    Тело запроса — сырые байты, которые пишутся в файл с позиции offset.
+    Текущий offset возвращается в ответе и доступен через GET .../offset.
+    """
+    try:
+        upload = await audio_service.write_chunk(
+            upload_id, offset, request.stream()
+        )
+    except UploadConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+@router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=UploadRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+@inject
+async def complete_upload(
+    upload_id: UUID,
+    data: UploadComplete | None = None,
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    checksum = data.checksum_sha256 if data else None
+    try:
+        upload = await audio_service.complete_upload(upload_id, checksum)
+    except UploadConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+@router.post(
+    "/{upload_id}/resegment",
+    response_model=JobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+@inject
+async def resegment_audio(
+    upload_id: UUID,
+    params: ResegmentRequest,
     audio_service: AudioService = Depends(Provide[Container.audio_service]),
 ):
-    return await audio_service.get_uploads()
+    """
+    Пересегментация с новыми порогом, окном и hangover по сохранённым
+    признакам кадров, без повторного чтения аудио.
+    """
+    try:
+        job = await audio_service.schedule_resegment(upload_id, params)
+    except UploadConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return job
 
 
 @router.get("/{upload_id}", response_model=AudioFileRead)
 @inject
 async def get_audio_info(
     upload_id: UUID,
+    if_none_match: str | None = Header(default=None),
     audio_service: AudioService = Depends(Provide[Container.audio_service]),
 ):
-    audio = await audio_service.get_audio_info(upload_id)
+    """
+    Результат анализа. Ответ отдаётся готовыми байтами с ETag;
+    при совпадении If-None-Match возвращается 304 без тела.
+    """
+    audio = await audio_service.get_audio_info_json(upload_id)
     if not audio:
         raise HTTPException(status_code=404, detail="Audio not found")
-    return audio
+    body, etag = audio
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.get("/{upload_id}/segments", response_model=SegmentPage)
+@inject
+async def get_segments(
+    upload_id: UUID,
+    from_ms: int | None = Query(default=None, ge=0),
+    to_ms: int | None = Query(default=None, ge=0),
+    limit: int = Query(default=500, ge=1, le=5000),
+    cursor: str | None = None,
+    output_format: Literal["json", "ndjson"] = Query(
+        default="json", alias="format"
+    ),
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    """
+    Сегменты, пересекающие окно [from_ms, to_ms).
+    format=ndjson отдаёт все сегменты окна потоком (limit и cursor
+    не используются).
+    """
+    audio_id = await audio_service.get_audio_id(upload_id)
+    if not audio_id:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    if output_format == "ndjson":
+        return StreamingResponse(
+            audio_service.stream_segments(audio_id, from_ms, to_ms),
+            media_type="application/x-ndjson",
+        )
+    try:
+        return await audio_service.get_segments(
+            audio_id, from_ms, to_ms, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{upload_id}/waveform", response_model=Waveform)
+@inject
+async def get_waveform(
+    upload_id: UUID,
+    level: int = Query(0, ge=0),
+    from_ms: int = Query(0, ge=0),
+    to_ms: int | None = Query(None, gt=0),
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    """
+    Пики min/max для отрисовки волны. Уровень 0 — самый подробный,
+    каждый следующий вдвое грубее. Не больше WAVEFORM_MAX_BINS точек
+    за ответ: иначе 400 с подходящим уровнем.
+    """
+    try:
+        waveform = await audio_service.get_waveform(
+            upload_id, level, from_ms, to_ms
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not waveform:
+        raise HTTPException(status_code=404, detail="Waveform not found")
+    return waveform
 
 
 @router.get("/{upload_id}/download")
 @inject
 async def download_audio(
     upload_id: UUID,
+    start_ms: int | None = Query(None, ge=0),
+    end_ms: int | None = Query(None, gt=0),
+    if_none_match: str | None = Header(default=None),
     audio_service: AudioService = Depends(Provide[Container.audio_service]),
 ):
-    file_path = await audio_service.get_upload_file_path(upload_id)
-    if not file_path:
+    """
+    Оригинальный WAV. Без start_ms/end_ms файл отдаётся FileResponse
+    (Range, multipart/byteranges, If-Range, sendfile при поддержке
+    сервером). С ними — корректный WAV-отрезок, вырезанный из файла
+    без декодирования, с переписанным заголовком.
+    """
+    download = await audio_service.get_download(upload_id)
+    if not download:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(
-        file_path, media_type="audio/wav", filename=f"{upload_id}.wav"
+    file_path, checksum = download
+
+    headers = {}
+    snippet = start_ms is not None or end_ms is not None
+    if checksum:
+        # содержимое неизменно после завершения загрузки
+        etag = f'"{checksum}"'
+        if snippet:
+            etag = f'"{checksum}-{start_ms or 0}-{end_ms or ""}"'
+        headers["ETag"] = etag
+        if etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+    if not snippet:
+        return FileResponse(
+            file_path,
+            media_type="audio/wav",
+            filename=f"{upload_id}.wav",
+            headers=headers,
+        )
+
+    try:
+        header, offset, length = await audio_service.get_wav_snippet(
+            file_path, start_ms or 0, end_ms
+        )
+    except UnsupportedAudioError as e:
+        # отрезок вырезается из заголовка файла: без него нечего отдавать
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE, detail=str(e)
+        )
+    headers["Content-Length"] = str(len(header) + length + length % 2)
+    headers["Content-Disposition"] = (
+        f'attachment; filename="{upload_id}_{start_ms or 0}.wav"'
+    )
+    return StreamingResponse(
+        audio_service.stream_file_range(file_path, offset, length, header),
+        media_type="audio/wav",
+        headers=headers,
     )
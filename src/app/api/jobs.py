@@ -0,0 +1,23 @@
+from uuid import UUID
+
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.containers import Container
+from app.schemas import JobRead
+from app.services.audio_service import AudioService
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobRead)
+@inject
+async def get_job(
+    job_id: UUID,
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    """Состояние задачи и длительности этапов (timings)."""
+    job = await audio_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,21 @@
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.containers import Container
+from app.core.metrics import JOBS_BY_STATUS
+from app.services.audio_service import AudioService
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+@inject
+async def metrics(
+    audio_service: AudioService = Depends(Provide[Container.audio_service]),
+):
+    """Метрики процесса в текстовом формате Prometheus."""
+    # глубина очереди общая для всех процессов, читается из БД
+    for status, count in (await audio_service.get_queue_depth()).items():
+        JOBS_BY_STATUS.labels(status=status).set(count)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
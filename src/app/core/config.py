@@ -1,13 +1,70 @@
 import logging
 from functools import lru_cache
+from typing import Literal
 
-from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class WorkerSettings(BaseModel):
+class WorkerSettings(BaseSettings):
+    """
+    Настройки очереди и воркера. Из окружения читаются с префиксом
+    WORKER_: WORKER_MAX_CONCURRENT_JOBS, WORKER_ANALYSIS_PROCESSES,
+    WORKER_PROFILE_MODE и т.д.
+    """
+
     MAX_ATTEMPTS: int = 3
     RETRY_BASE_DELAY: int = 5
+    # сколько задач один воркер выполняет одновременно
+    MAX_CONCURRENT_JOBS: int = 4
+
+    # канал NOTIFY о новых задачах и страховочный опрос очереди
+    JOBS_CHANNEL: str = "jobs_queued"
+    # канал NOTIFY об изменении результатов загрузки (payload — upload_id)
+    RESULTS_CHANNEL: str = "audio_results"
+    FALLBACK_POLL_INTERVAL: float = 30
+
+    # аренда задач: срок и период продления/поиска просроченных
+    LEASE_TIMEOUT: float = 60
+    HEARTBEAT_INTERVAL: float = 20
+
+    # мелкие задачи analyze (по Upload.size_bytes) выполняются пачками:
+    # один вызов пула процессов и одна транзакция на пачку
+    BATCH_MAX_BYTES: int = 1024 * 1024
+    BATCH_MAX_JOBS: int = 16
+
+    # приоритет задач: меньше — раньше. Начальный — полоса по размеру
+    # файла (границы в байтах); задача, прождавшая PRIORITY_AGING_INTERVAL
+    # секунд, поднимается на ступень, чтобы большие файлы не голодали
+    PRIORITY_SIZE_LANES: tuple[int, ...] = (
+        1024 * 1024,
+        16 * 1024 * 1024,
+        128 * 1024 * 1024,
+    )
+    PRIORITY_AGING_INTERVAL: float = 60
+    # analyze файлов крупнее LARGE_JOB_BYTES занимают не больше
+    # concurrency - SMALL_JOB_SLOTS слотов: остальные ждут мелкие задачи.
+    # Полоса крупных — минимум один слот, поэтому при concurrency
+    # <= SMALL_JOB_SLOTS мелким задачам ничего не резервируется
+    LARGE_JOB_BYTES: int = 16 * 1024 * 1024
+    SMALL_JOB_SLOTS: int = 1
+
+    # с какого числа сегментов писать их через COPY вместо INSERT
+    SEGMENTS_COPY_THRESHOLD: int = 5000
+
+    # профилирование доли задач analyze (cprofile или tracemalloc),
+    # профиль сохраняется рядом с файлом загрузки
+    PROFILE_MODE: Literal["cprofile", "tracemalloc"] | None = None
+    PROFILE_SAMPLE_RATE: float = 0.0
+
+    # пул процессов анализа на процесс воркера (None — по числу CPU,
+    # у python -m app.workers --processes N — CPU / N на процесс)
+    ANALYSIS_PROCESSES: int | None = None
+    ANALYSIS_START_METHOD: str = "spawn"
+
+    # WORKER_PROCESSES и WORKER_METRICS_PORT из Settings здесь не поля
+    model_config = SettingsConfigDict(
+        env_prefix="WORKER_", env_file=".env", extra="ignore"
+    )
 
 
 class Settings(BaseSettings):
@@ -15,12 +72,53 @@ class Settings(BaseSettings):
 
     LOG_LEVEL: int = logging.INFO
 
+    UPLOADS_DIR: str = "storage/uploads"
+    # размер блока при чтении тела запроса и перечитывании файла с диска
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # состояние SHA-256 незавершённых загрузок в памяти процесса API:
+    # сколько секунд хранить без новых чанков и сколько загрузок всего
+    UPLOAD_HASHER_TTL: float = 3600
+    UPLOAD_HASHER_CACHE_SIZE: int = 1024
+
+    # воркер внутри процесса API; false — задачи выполняют только
+    # отдельные процессы python -m app.workers
+    EMBEDDED_WORKER: bool = True
+    # число процессов воркера, запускаемых python -m app.workers
+    WORKER_PROCESSES: int = 1
+    # порт /metrics процесса воркера (у процесса i — порт + i);
+    # 0 — не открывать. Метрики API отдаёт сам API на /metrics
+    WORKER_METRICS_PORT: int = 9100
+
+    # точек (пар min/max) в одном ответе /waveform: подробный уровень
+    # длинной записи запрашивается по частям или уровнем грубее
+    WAVEFORM_MAX_BINS: int = 32768
+
+    # кэш результатов анализа в процессе API
+    RESULT_CACHE_SIZE: int = 1024
+    RESULT_CACHE_TTL: float = 300
+    # как долго /metrics отдаёт прочитанную глубину очереди, секунды:
+    # GROUP BY по всей таблице jobs не выполняется на каждый опрос
+    QUEUE_DEPTH_CACHE_TTL: float = 5
+
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
     DB_USER: str
     DB_PASS: str
 
+    # пул соединений SQLAlchemy на процесс (API и воркер считаются
+    # отдельно): pool_size постоянных + до DB_MAX_OVERFLOW временных
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    # проверка соединения перед выдачей и пересоздание старых (-1 — нет)
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    # кэш подготовленных запросов asyncpg на соединение
+    # (0 — для pgbouncer в режиме transaction)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_ECHO: bool = False
+
     PGADMIN_DEFAULT_EMAIL: str
     PGADMIN_DEFAULT_PASSWORD: str
 
@@ -1,7 +1,6 @@
 from dependency_injector import containers, providers
 
 from app.services.audio_service import AudioService
-from app.workers.worker import Worker
 
 
 class Container(containers.DeclarativeContainer):
@@ -9,7 +8,8 @@ class Container(containers.DeclarativeContainer):
     Контейнер зависимостей приложения.
     """
 
-    wiring_config = containers.WiringConfiguration(modules=["app.api.audio"])
+    wiring_config = containers.WiringConfiguration(
+        modules=["app.api.audio", "app.api.jobs", "app.api.metrics"]
+    )
 
     audio_service = providers.Singleton(AudioService)
-    worker = providers.Singleton(Worker)
@@ -0,0 +1,154 @@
+import time
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# границы корзин по умолчанию, секунды
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+
+
+# ----------------------------------------------------------------------
+# Метрики приложения
+# ----------------------------------------------------------------------
+JOBS_BY_STATUS = Gauge(
+    "audio_jobs",
+    "Jobs in the queue table by status (cached QUEUE_DEPTH_CACHE_TTL)",
+    ("status",),
+)
+JOB_PICKUP_DELAY = Histogram(
+    "audio_job_pickup_delay_seconds",
+    "Time from a job becoming runnable (run_after) to its pickup",
+    ("type",),
+    buckets=DEFAULT_BUCKETS,
+)
+JOB_STAGE_SECONDS = Histogram(
+    "audio_job_stage_seconds",
+    "Duration of job processing stages",
+    ("stage",),
+    buckets=DEFAULT_BUCKETS,
+)
+JOBS_COMPLETED = Counter(
+    "audio_jobs_completed",
+    "Jobs finished successfully",
+    ("type",),
+)
+JOB_RETRIES = Counter(
+    "audio_job_retries",
+    "Failed job attempts scheduled for retry",
+    ("type",),
+)
+JOB_FAILURES = Counter(
+    "audio_job_failures",
+    "Jobs failed permanently",
+    ("type",),
+)
+JOB_LEASES_EXPIRED = Counter(
+    "audio_job_leases_expired",
+    "Jobs whose lease expired (crashed or stalled worker)",
+)
+AUDIO_ANALYZED_SECONDS = Counter(
+    "audio_analyzed_audio_seconds",
+    "Seconds of audio analyzed",
+)
+ANALYSIS_CPU_SECONDS = Counter(
+    "audio_analysis_cpu_seconds",
+    "CPU seconds spent in analysis processes",
+)
+ANALYSIS_REALTIME_FACTOR = Histogram(
+    "audio_analysis_realtime_factor",
+    "Seconds of audio analyzed per CPU second, per analysis call",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "audio_db_pool_checkout_seconds",
+    "Time to get a connection from the SQLAlchemy pool",
+    buckets=DEFAULT_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "audio_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+    buckets=DEFAULT_BUCKETS,
+)
+
+LISTENER_CONNECTED = Gauge(
+    "audio_listener_connected",
+    "1 while the LISTEN connection for the channel is up",
+    ("channel",),
+)
+
+
+def pool_checkout_wait_seconds() -> float:
+    """Суммарное ожидание соединений из пула в этом процессе."""
+    return (
+        REGISTRY.get_sample_value("audio_db_pool_checkout_seconds_sum") or 0.0
+    )
+
+
+def observe_analysis(audio_s: float, cpu_s: float) -> None:
+    """Учитывает вызов анализа: секунды аудио на секунду CPU."""
+    AUDIO_ANALYZED_SECONDS.inc(audio_s)
+    ANALYSIS_CPU_SECONDS.inc(cpu_s)
+    if cpu_s > 0:
+        ANALYSIS_REALTIME_FACTOR.observe(audio_s / cpu_s)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий ожидание при checkout."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+class HttpMetricsMiddleware:
+    """
+    ASGI-middleware латентности HTTP. Метка route — шаблон пути
+    (/audio/{upload_id}), а не сам путь, чтобы не плодить ряды.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,159 @@
+import os
+import struct
+
+import numpy as np
+
+PEAKS_MAGIC = b"PEAK"
+PEAKS_VERSION = 1
+PEAKS_BASE_SAMPLES = 256  # отсчётов на точку нулевого уровня
+PEAKS_MIN_BINS = 512  # уровни строятся, пока точек больше этого числа
+PEAKS_MAX_LEVELS = 16
+
+# magic, версия, число уровней, частота дискретизации, отсчётов на точку
+_HEADER = struct.Struct("<4sHHII")
+
+
+class PeakPyramidBuilder:
+    """
+    Потоковое построение пирамиды пиков min/max (int16) по моно-сигналу.
+    Нулевой уровень считается по блокам отсчётов, каждый следующий
+    уровень вдвое грубее предыдущего и строится из него в finish().
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        base_samples: int = PEAKS_BASE_SAMPLES,
+    ):
+        self.sample_rate = sample_rate
+        self.base_samples = base_samples
+        self._bin_size = base_samples
+        self._pending = np.empty(0, dtype=np.int16)
+        self._blocks: list[np.ndarray] = []
+
+    def feed(self, samples: np.ndarray) -> None:
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        n_full = len(samples) // self._bin_size * self._bin_size
+        self._pending = samples[n_full:].copy()
+        if n_full:
+            bins = samples[:n_full].reshape(-1, self._bin_size)
+            self._blocks.append(
+                np.stack((bins.min(axis=1), bins.max(axis=1)), axis=1)
+            )
+
+    def finish(self) -> list[np.ndarray]:
+        """Уровни пирамиды: массивы (n_bins, 2) с парами (min, max)."""
+        if len(self._pending):
+            self._blocks.append(
+                np.array([[self._pending.min(), self._pending.max()]])
+            )
+            self._pending = self._pending[:0]
+        level = (
+            np.clip(np.concatenate(self._blocks), -32768, 32767).astype(
+                np.int16
+            )
+            if self._blocks
+            else np.empty((0, 2), dtype=np.int16)
+        )
+        levels = [level]
+        while len(level) > PEAKS_MIN_BINS and len(levels) < PEAKS_MAX_LEVELS:
+            if len(level) % 2:
+                level = np.concatenate((level, level[-1:]))
+            pairs = level.reshape(-1, 2, 2)
+            level = np.stack(
+                (pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)),
+                axis=1,
+            )
+            levels.append(level)
+        return levels
+
+    def write(self, path: str) -> None:
+        """Пишет пирамиду атомарно (через временный файл)."""
+        levels = self.finish()
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    PEAKS_MAGIC,
+                    PEAKS_VERSION,
+                    len(levels),
+                    self.sample_rate,
+                    self.base_samples,
+                )
+            )
+            f.write(struct.pack(f"<{len(levels)}Q", *map(len, levels)))
+            for level in levels:
+                f.write(level.astype("<i2").tobytes())
+        os.replace(tmp, path)
+
+
+class PeakPyramid:
+    """Чтение пирамиды пиков через memmap: читаются только нужные точки."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, n_levels, self.sample_rate, self.base_samples = (
+                _HEADER.unpack(f.read(_HEADER.size))
+            )
+            if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+                raise ValueError("Unsupported peaks file")
+            self.bins = struct.unpack(f"<{n_levels}Q", f.read(8 * n_levels))
+        self._offsets = np.cumsum(
+            (_HEADER.size + 8 * n_levels, *(4 * n for n in self.bins))
+        ).tolist()
+
+    @property
+    def levels(self) -> int:
+        return len(self.bins)
+
+    def samples_per_bin(self, level: int) -> int:
+        return self.base_samples << level
+
+    def bin_range(
+        self, level: int, from_ms: int = 0, to_ms: int | None = None
+    ) -> tuple[int, int]:
+        """Номера первой и следующей за последней точек [from_ms, to_ms)."""
+        if not 0 <= level < self.levels:
+            raise ValueError(f"level must be in [0, {self.levels - 1}]")
+        n_bins = self.bins[level]
+        bin_ms = self.samples_per_bin(level) * 1000 / self.sample_rate
+        start = min(int(from_ms // bin_ms), n_bins)
+        end = n_bins if to_ms is None else int(-(-to_ms // bin_ms))
+        return start, max(min(end, n_bins), start)
+
+    def read(
+        self,
+        level: int,
+        from_ms: int = 0,
+        to_ms: int | None = None,
+        max_bins: int | None = None,
+    ) -> tuple[int, np.ndarray]:
+        """
+        Номер первой точки и массив (n, 2) для интервала [from_ms, to_ms).
+        Больше max_bins точек не читается: ValueError с ближайшим
+        уровнем, на котором интервал укладывается в ограничение.
+        """
+        start, end = self.bin_range(level, from_ms, to_ms)
+        if max_bins is not None and end - start > max_bins:
+            for coarser in range(level + 1, self.levels):
+                first, last = self.bin_range(coarser, from_ms, to_ms)
+                if last - first <= max_bins:
+                    hint = f"use level >= {coarser} or a narrower range"
+                    break
+            else:
+                hint = "use a narrower range"
+            raise ValueError(
+                f"Too many bins ({end - start} > {max_bins}): {hint}"
+            )
+        if start == end:
+            return start, np.empty((0, 2), dtype=np.int16)
+        peaks = np.memmap(
+            self.path,
+            dtype="<i2",
+            mode="r",
+            offset=self._offsets[level],
+            shape=(self.bins[level], 2),
+        )
+        return start, np.array(peaks[start:end])
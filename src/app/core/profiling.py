@@ -0,0 +1,69 @@
+import cProfile
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+class Spans:
+    """
+    Длительности этапов задачи в секундах. Повторный вход в этап
+    с тем же именем суммируется (например, чтение по блокам).
+    """
+
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def update(self, durations: dict[str, float]) -> None:
+        for name, seconds in durations.items():
+            self.add(name, seconds)
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            name: round(seconds, 6) for name, seconds in self.durations.items()
+        }
+
+
+@contextmanager
+def profiling(mode: str | None, path: str | None) -> Iterator[None]:
+    """
+    Снимает профиль блока with и сохраняет его в path:
+    cprofile — pstats-файл (python -m pstats), tracemalloc — снимок
+    (tracemalloc.Snapshot.load). Без mode ничего не делает.
+    """
+    if mode is None or path is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+        return
+
+    tracemalloc.start(25)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        snapshot.dump(path)
@@ -0,0 +1,29 @@
+import os
+from uuid import UUID
+
+from app.core.config import settings
+
+
+def upload_dir(upload_id: UUID | str) -> str:
+    """Каталог с файлами загрузки (оригинал и служебные файлы анализа)."""
+    return os.path.join(settings.UPLOADS_DIR, str(upload_id))
+
+
+def upload_file_path(upload_id: UUID | str) -> str:
+    """Путь к оригинальному файлу загрузки."""
+    return os.path.join(upload_dir(upload_id), "file")
+
+
+def upload_peaks_path(upload_id: UUID | str) -> str:
+    """Путь к пирамиде пиков для отрисовки волны."""
+    return os.path.join(upload_dir(upload_id), "peaks")
+
+
+def upload_features_path(upload_id: UUID | str) -> str:
+    """Путь к признакам кадров (float32 .npy) для пересегментации."""
+    return os.path.join(upload_dir(upload_id), "features.npy")
+
+
+def upload_profile_path(upload_id: UUID | str, mode: str) -> str:
+    """Путь к профилю анализа (cprofile — pstats, tracemalloc — снимок)."""
+    return os.path.join(upload_dir(upload_id), f"profile.{mode}")
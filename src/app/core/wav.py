@@ -0,0 +1,195 @@
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (формат, байт на отсчёт) -> dtype отсчёта, имя кодека,
+# смещение и множитель приведения к шкале int16
+_CODECS = {
+    (WAVE_FORMAT_PCM, 1): ("u1", "pcm_u8", -128.0, 256.0),
+    (WAVE_FORMAT_PCM, 2): ("<i2", "pcm_s16le", 0.0, 1.0),
+    # 24 бита распаковываются в int32 со старшими байтами отсчёта
+    (WAVE_FORMAT_PCM, 3): ("<i4", "pcm_s24le", 0.0, 1.0 / 2**16),
+    (WAVE_FORMAT_PCM, 4): ("<i4", "pcm_s32le", 0.0, 1.0 / 2**16),
+    (WAVE_FORMAT_IEEE_FLOAT, 4): ("<f4", "pcm_f32le", 0.0, 32768.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 8): ("<f8", "pcm_f64le", 0.0, 32768.0),
+}
+
+
+@dataclass(frozen=True)
+class WavLayout:
+    """Расположение чанков WAV-файла: fmt как есть и границы данных."""
+
+    fmt_chunk: bytes
+    channels: int
+    sample_rate: int
+    block_align: int
+    data_offset: int
+    data_size: int
+    # PCM или IEEE float (для EXTENSIBLE — из SubFormat)
+    format_tag: int = WAVE_FORMAT_PCM
+
+    @property
+    def sample_width(self) -> int:
+        """Байт на отсчёт одного канала (размер контейнера)."""
+        return self.block_align // self.channels
+
+    @property
+    def codec(self) -> str:
+        return _CODECS[self.format_tag, self.sample_width][1]
+
+    def channel_views(self, raw: bytes) -> np.ndarray:
+        """
+        Матрица отсчётов (n_frames, channels) в исходном типе:
+        столбцы — strided view по каналам без копирования.
+        24-битные отсчёты распаковываются одной векторной операцией.
+        """
+        dtype = _CODECS[self.format_tag, self.sample_width][0]
+        n_frames = len(raw) // self.block_align
+        if self.sample_width != 3:
+            samples = np.frombuffer(
+                raw, dtype=dtype, count=n_frames * self.channels
+            )
+            return samples.reshape(n_frames, self.channels)
+
+        # байты отсчёта кладутся в старшие три байта int32:
+        # [0, b0, b1, b2] — знак сохраняется без отдельного расширения
+        packed = np.frombuffer(
+            raw, dtype=np.uint8, count=n_frames * self.block_align
+        )
+        unpacked = np.zeros((n_frames * self.channels, 4), dtype=np.uint8)
+        unpacked[:, 1:] = packed.reshape(-1, 3)
+        return unpacked.view("<i4").reshape(n_frames, self.channels)
+
+    def downmix(self, raw: bytes) -> np.ndarray:
+        """
+        Моно-сигнал в шкале int16 за один проход по данным.
+        16-битное моно возвращается как есть, без копирования.
+        """
+        _, _, offset, scale = _CODECS[self.format_tag, self.sample_width]
+        samples = self.channel_views(raw)
+        if self.channels == 1 and self.sample_width == 2:
+            return samples[:, 0]
+        if self.channels == 1:
+            mono = samples[:, 0].astype(np.float32)
+        else:
+            mono = samples.mean(axis=1, dtype=np.float32)
+        if offset:
+            mono += np.float32(offset)
+        if scale != 1.0:
+            mono *= np.float32(scale)
+        return mono
+
+    def iter_blocks(self, f: BinaryIO, n_frames: int) -> Iterator[bytes]:
+        """Данные блоками по n_frames фреймов (неполный фрейм отбрасывается)."""
+        f.seek(self.data_offset)
+        remaining = self.n_frames * self.block_align
+        block = max(n_frames, 1) * self.block_align
+        while remaining > 0:
+            raw = f.read(min(block, remaining))
+            raw = raw[: len(raw) // self.block_align * self.block_align]
+            if not raw:
+                break
+            remaining -= len(raw)
+            yield raw
+
+    @property
+    def n_frames(self) -> int:
+        return self.data_size // self.block_align
+
+    def frame_at(self, ms: int) -> int:
+        """Номер фрейма WAV для момента ms (с ограничением длиной записи)."""
+        return min(max(ms, 0) * self.sample_rate // 1000, self.n_frames)
+
+    def byte_range(self, start_ms: int, end_ms: int | None) -> tuple[int, int]:
+        """
+        Абсолютное смещение и длина данных отрезка [start_ms, end_ms).
+        Границы выровнены по фреймам, поэтому каналы не перемешиваются.
+        """
+        start = self.frame_at(start_ms)
+        end = self.n_frames if end_ms is None else self.frame_at(end_ms)
+        if end <= start:
+            raise ValueError("Empty or out of range audio interval")
+        return (
+            self.data_offset + start * self.block_align,
+            (end - start) * self.block_align,
+        )
+
+    def header(self, data_size: int) -> bytes:
+        """Заголовок RIFF для файла с тем же fmt и data_size байт данных."""
+        fmt = self.fmt_chunk + b"\0" * (len(self.fmt_chunk) % 2)
+        riff_size = 4 + 8 + len(fmt) + 8 + data_size + data_size % 2
+        return b"".join(
+            (
+                struct.pack("<4sI4s", b"RIFF", riff_size, b"WAVE"),
+                struct.pack("<4sI", b"fmt ", len(self.fmt_chunk)),
+                fmt,
+                struct.pack("<4sI", b"data", data_size),
+            )
+        )
+
+
+def read_wav_layout(f: BinaryIO) -> WavLayout:
+    """
+    Разбирает заголовок RIFF/WAVE, не читая аудиоданные.
+    Неизвестные чанки (LIST, fact и т.п.) пропускаются.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise ValueError("WAV data chunk not found")
+        chunk_id, size = struct.unpack("<4sI", chunk)
+        if chunk_id == b"data":
+            break
+        if chunk_id == b"fmt ":
+            fmt = f.read(size)
+            if len(fmt) < 16:
+                raise ValueError("Malformed WAV fmt chunk")
+            f.seek(size % 2, 1)
+        else:
+            f.seek(size + size % 2, 1)
+
+    if fmt is None:
+        raise ValueError("WAV fmt chunk not found")
+    format_tag, channels, sample_rate = struct.unpack_from("<HHI", fmt)
+    (block_align,) = struct.unpack_from("<H", fmt, 12)
+    if not channels or not sample_rate or not block_align:
+        raise ValueError("Malformed WAV fmt chunk")
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # первые два байта GUID SubFormat — обычный тег формата
+        (format_tag,) = struct.unpack_from("<H", fmt, 24)
+    if (
+        block_align % channels
+        or (format_tag, block_align // channels) not in _CODECS
+    ):
+        raise ValueError(
+            f"Unsupported WAV encoding: format {format_tag:#06x}, "
+            f"{block_align // channels} bytes per sample"
+        )
+
+    data_offset = f.tell()
+    # потоковые писатели оставляют в размере 0 или 0xFFFFFFFF
+    file_size = f.seek(0, 2)
+    data_size = file_size - data_offset
+    if 0 < size < data_size:
+        data_size = size
+    return WavLayout(
+        fmt_chunk=fmt,
+        channels=channels,
+        sample_rate=sample_rate,
+        block_align=block_align,
+        data_offset=data_offset,
+        data_size=data_size,
+        format_tag=format_tag,
+    )
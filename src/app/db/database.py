@@ -1,4 +1,7 @@
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from functools import wraps
 
 from sqlalchemy.ext.asyncio import (
@@ -8,6 +11,7 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from app.core.config import settings
+from app.core.metrics import TimedQueuePool
 
 logger = logging.getLogger(__name__)
 
@@ -15,22 +19,66 @@ logger = logging.getLogger(__name__)
 DATABSE_URL = settings.DATABASE_URL
 
 
-engine = create_async_engine(DATABSE_URL, echo=True)
+engine = create_async_engine(
+    DATABSE_URL,
+    echo=settings.DB_ECHO,
+    poolclass=TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args=dict(
+        prepared_statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE
+    ),
+)
 async_session_maker = async_sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
+# сессия текущей единицы работы (запрос API, задача воркера)
+_current_session: ContextVar[AsyncSession | None] = ContextVar(
+    "current_session", default=None
+)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """
+    Одна сессия на единицу работы: все методы с @connection внутри
+    блока получают её, а не открывают свою. Вложенный вызов
+    переиспользует внешнюю сессию. Соединение берётся из пула только
+    на время транзакции, между commit сессия его не держит.
+    Ошибку откатывает только внешний блок: вложенный её пропускает
+    дальше, и внешний код, перехвативший ошибку, сам решает, когда
+    откатить транзакцию.
+    """
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        return
+
+    async with async_session_maker() as session:
+        token = _current_session.set(session)
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            _current_session.reset(token)
+
+
+async def db_session() -> AsyncIterator[AsyncSession]:
+    """Зависимость FastAPI: сессия на время обработчика запроса."""
+    async with unit_of_work() as session:
+        yield session
+
 
 def connection(method):
     @wraps(method)
     async def wrapper(self, *args, **kwargs):
-        async with async_session_maker() as session:
-            try:
-                return await method(self, *args, session=session, **kwargs)
-            except Exception as e:
-                session.rollback()
-                raise e
-            finally:
-                await session.close()
+        async with unit_of_work() as session:
+            return await method(self, *args, session=session, **kwargs)
 
     return wrapper
@@ -3,21 +3,28 @@ from datetime import datetime
 from enum import Enum
 
 from sqlalchemy import (
+    DDL,
     JSON,
     TIMESTAMP,
+    BigInteger,
 )
 from sqlalchemy import Enum as EnumORM
 from sqlalchemy import (
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
+    event,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from app.core.config import worker_settings
+
 
 class StatusUploadEnum(Enum):
     receiving = "receiving"
@@ -49,14 +56,15 @@ class Upload(Base):
     )
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     content_type: Mapped[str] = mapped_column(String(128), nullable=False)
-    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
-    checksum_sha256: Mapped[str | None] = mapped_column(String(64))
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # индекс для дедупликации по содержимому
+    checksum_sha256: Mapped[str | None] = mapped_column(String(64), index=True)
     status: Mapped[StatusUploadEnum] = mapped_column(
         EnumORM(StatusUploadEnum),
         default="receiving",
         nullable=False,
     )
-    uploaded_bytes: Mapped[int] = mapped_column(Integer, default=0)
+    uploaded_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
     error_message: Mapped[str | None] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
@@ -69,6 +77,11 @@ class Upload(Base):
         back_populates="upload", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # keyset-пагинация списка загрузок
+        Index("ix_uploads_created_at_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return (
             f"Upload(id={self.id}, filename={self.filename},"
@@ -80,6 +93,13 @@ class Upload(Base):
 # Таблица jobs — очередь фоновых задач
 # ----------------------------------------------------------------------
 class Job(Base):
+    """
+    Задача очереди. Воркеры будит триггер jobs_notify_queued: любая
+    вставка или изменение status/run_after, после которых задача
+    в статусе queued, шлёт NOTIFY JOBS_CHANNEL при commit. Вызывать
+    notify() для этого канала при постановке задачи не нужно.
+    """
+
     __tablename__ = "jobs"
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -96,8 +116,22 @@ class Job(Base):
         nullable=False,
     )
     attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # меньше — раньше; см. app.services.priority и старение в воркере
+    priority: Mapped[int] = mapped_column(
+        Integer, default=0, server_default=text("0"), nullable=False
+    )
     payload: Mapped[dict | None] = mapped_column(JSON)
     last_error: Mapped[str | None] = mapped_column(Text)
+    # длительности этапов последнего выполнения, секунды
+    timings: Mapped[dict | None] = mapped_column(JSON)
+    # не брать задачу в работу раньше этого времени (отложенные повторы)
+    run_after: Mapped[datetime] = mapped_column(
+        TIMESTAMP, default=datetime.utcnow, nullable=False
+    )
+    # аренда задачи воркером: продлевается heartbeat'ом, по истечении
+    # задача возвращается в очередь
+    locked_by: Mapped[str | None] = mapped_column(String(128))
+    locked_until: Mapped[datetime | None] = mapped_column(TIMESTAMP)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow
@@ -107,6 +141,26 @@ class Job(Base):
 
     __table_args__ = (
         UniqueConstraint("upload_id", "type", name="uq_jobs_upload_type"),
+        # выборка очереди: только queued, по приоритету и сроку запуска
+        Index(
+            "ix_jobs_queued_priority",
+            "priority",
+            "run_after",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        # ближайший срок запуска (ожидание отложенных задач)
+        Index(
+            "ix_jobs_queued_run_after",
+            "type",
+            "run_after",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        # поиск просроченной аренды
+        Index(
+            "ix_jobs_in_progress_locked_until",
+            "locked_until",
+            postgresql_where=text("status = 'in_progress'"),
+        ),
     )
 
     def __repr__(self):
@@ -116,6 +170,36 @@ class Job(Base):
         )
 
 
+# ----------------------------------------------------------------------
+# NOTIFY о задачах в очереди (см. Job). Пустой payload: одинаковые
+# уведомления одной транзакции Postgres схлопывает, поэтому массовый
+# UPDATE будит воркеры один раз. Autogenerate триггеры не видит,
+# в миграцию их добавляет migration/env.py.
+# ----------------------------------------------------------------------
+JOBS_NOTIFY_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION notify_job_queued() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify(TG_ARGV[0], '');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE TRIGGER jobs_notify_queued
+    AFTER INSERT OR UPDATE OF status, run_after ON jobs
+    FOR EACH ROW WHEN (NEW.status = 'queued')
+    EXECUTE FUNCTION notify_job_queued('{worker_settings.JOBS_CHANNEL}')
+    """,
+)
+JOBS_NOTIFY_DROP_DDL = (
+    "DROP TRIGGER IF EXISTS jobs_notify_queued ON jobs",
+    "DROP FUNCTION IF EXISTS notify_job_queued()",
+)
+for statement in JOBS_NOTIFY_DDL:
+    event.listen(Job.__table__, "after_create", DDL(statement))
+
+
 # ----------------------------------------------------------------------
 # Таблица audio_files — итоговые файлы после обработки
 # ----------------------------------------------------------------------
@@ -172,6 +256,11 @@ class Segment(Base):
 
     audio_file: Mapped["AudioFile"] = relationship(back_populates="segments")
 
+    __table_args__ = (
+        # выборка сегментов файла по временному окну
+        Index("ix_segments_audio_id_start_ms", "audio_id", "start_ms"),
+    )
+
     def __repr__(self):
         return (
             f"Segment(id={self.id}, audio_id={self.audio_id},"
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from contextlib import suppress
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import LISTENER_CONNECTED
+
+logger = logging.getLogger(__name__)
+
+# переподключение LISTEN: первая задержка и предел, секунды
+RECONNECT_DELAY = 1.0
+RECONNECT_DELAY_MAX = 30.0
+# проверка живости соединения подписки и её таймаут, секунды
+PING_INTERVAL = 30.0
+PING_TIMEOUT = 10.0
+
+
+async def notify(
+    session: AsyncSession, channel: str, payload: str = ""
+) -> None:
+    """
+    Ставит NOTIFY в текущую транзакцию сессии.
+    Подписчики получат его только после commit.
+    JOBS_CHANNEL отсюда не вызывается: его шлёт триггер на jobs.
+    """
+    await session.execute(select(func.pg_notify(channel, payload)))
+
+
+class PgListener:
+    """
+    Подписка на канал Postgres (LISTEN) через отдельное asyncpg-соединение.
+    Соединение из пула SQLAlchemy не подходит: оно должно жить всё время
+    подписки. Фоновая задача следит за соединением (обрыв со стороны
+    сервера и периодический SELECT 1) и переподключается с нарастающей
+    задержкой. Уведомления за время обрыва теряются, поэтому после
+    переподключения вызывается on_reconnect и будится wait().
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        callback: Callable[[str], None] | None = None,
+        on_reconnect: Callable[[], None] | None = None,
+    ):
+        self.channel = channel
+        self.callback = callback
+        self.on_reconnect = on_reconnect
+        self._conn: asyncpg.Connection | None = None
+        self._event = asyncio.Event()
+        self._lost = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def start(self) -> None:
+        await self._connect()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._conn is None:
+            return
+        try:
+            await self._conn.close()
+        finally:
+            self._conn = None
+            LISTENER_CONNECTED.labels(channel=self.channel).set(0)
+
+    def clear(self) -> None:
+        """Сбрасывает накопленные уведомления."""
+        self._event.clear()
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Ждёт уведомление не дольше timeout секунд.
+        Возвращает False, если вышли по таймауту.
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    async def _connect(self) -> bool:
+        conn = None
+        try:
+            conn = await asyncpg.connect(
+                host=settings.DB_HOST,
+                port=settings.DB_PORT,
+                user=settings.DB_USER,
+                password=settings.DB_PASS,
+                database=settings.DB_NAME,
+            )
+            await conn.add_listener(self.channel, self._on_notify)
+        except (OSError, asyncpg.PostgresError) as e:
+            logger.warning("LISTEN %s failed: %s", self.channel, e)
+            if conn is not None:
+                conn.terminate()
+            return False
+        self._lost.clear()
+        conn.add_termination_listener(self._on_termination)
+        self._conn = conn
+        LISTENER_CONNECTED.labels(channel=self.channel).set(1)
+        logger.info("Listening on channel %s", self.channel)
+        return True
+
+    async def _supervise(self) -> None:
+        delay = RECONNECT_DELAY
+        while True:
+            if self.connected:
+                await self._watch()
+                logger.warning(
+                    "LISTEN %s connection lost, reconnecting", self.channel
+                )
+                self._conn = None
+                LISTENER_CONNECTED.labels(channel=self.channel).set(0)
+            if not await self._connect():
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+                continue
+            delay = RECONNECT_DELAY
+            self._event.set()
+            if self.on_reconnect is not None:
+                self.on_reconnect()
+
+    async def _watch(self) -> None:
+        """
+        Возвращается, когда соединение потеряно. Обрыв без закрытия
+        сокета (сеть, зависший сервер) ловится по SELECT 1 раз
+        в PING_INTERVAL.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), PING_INTERVAL)
+                return
+            except TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(
+                    self._conn.fetchval("SELECT 1"), PING_TIMEOUT
+                )
+            except (OSError, TimeoutError, asyncpg.PostgresError) as e:
+                logger.warning("LISTEN %s ping failed: %r", self.channel, e)
+                self._conn.terminate()
+                return
+
+    def _on_termination(self, conn) -> None:
+        if conn is self._conn:
+            self._lost.set()
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str) -> None:
+        self._event.set()
+        if self.callback is not None:
+            self.callback(payload)
@@ -6,27 +6,55 @@ from fastapi import FastAPI
 
 from app.api import main_router
 from app.core.common import configure_logging
+from app.core.config import settings, worker_settings
+from app.core.containers import Container
+from app.core.metrics import HttpMetricsMiddleware
+from app.db.notifications import PgListener
+from app.workers.pool import AnalysisPool
 from app.workers.worker import Worker
 
 configure_logging()
 
 stop_event = asyncio.Event()
-worker = Worker(stop_event)
+analysis_pool = AnalysisPool(
+    max_workers=worker_settings.ANALYSIS_PROCESSES,
+    start_method=worker_settings.ANALYSIS_START_METHOD,
+)
+worker = Worker(stop_event, analysis_pool)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
-    worker_task = asyncio.create_task(worker.worker_loop())
-    yield
-    # shutdown
-    stop_event.set()
-    await worker_task
+    audio_service = app.container.audio_service()
+    results_listener = PgListener(
+        worker_settings.RESULTS_CHANNEL,
+        callback=audio_service.invalidate_audio_info,
+        # инвалидации за время обрыва потеряны
+        on_reconnect=audio_service.audio_info_cache.clear,
+    )
+    await results_listener.start()
+    worker_task = None
+    if settings.EMBEDDED_WORKER:
+        analysis_pool.start()
+        worker_task = asyncio.create_task(worker.worker_loop())
+    try:
+        yield
+    finally:
+        # shutdown
+        if worker_task is not None:
+            stop_event.set()
+            await worker_task
+            analysis_pool.shutdown()
+        await results_listener.stop()
 
 
 def create_app() -> FastAPI:
     app = FastAPI(lifespan=lifespan)
+    # контейнер при создании связывает Provide[...] в модулях wiring_config
+    app.container = Container()
     app.include_router(main_router)
+    app.add_middleware(HttpMetricsMiddleware)
 
     return app
 
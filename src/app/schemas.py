@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class SegmentBase(BaseModel):
@@ -24,6 +24,21 @@ class SegmentRead(SegmentBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SegmentPage(BaseModel):
+    items: list[SegmentRead]
+    next_cursor: str | None = None
+
+
+class Waveform(BaseModel):
+    level: int
+    levels: int
+    sample_rate: int
+    samples_per_bin: int
+    start_ms: float
+    # пары (min, max) подряд: [min0, max0, min1, max1, ...]
+    data: list[int]
+
+
 class AudioFileBase(BaseModel):
     file_path: str
     duration_s: float | None = None
@@ -51,6 +66,7 @@ class JobBase(BaseModel):
     type: str
     status: str
     attempts: int | None = 0
+    priority: int = 0
     payload: dict | None = None
     last_error: str | None = None
 
@@ -62,6 +78,7 @@ class JobCreate(JobBase):
 class JobRead(JobBase):
     id: UUID
     upload_id: UUID
+    timings: dict[str, float] | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -78,15 +95,47 @@ class UploadBase(BaseModel):
     error_message: str | None = None
 
 
-class UploadCreate(UploadBase):
-    pass
+class UploadCreate(BaseModel):
+    filename: str = Field(max_length=255)
+    content_type: str = Field(default="audio/wav", max_length=128)
+    size_bytes: int = Field(gt=0)
+
+
+class UploadComplete(BaseModel):
+    # ожидаемый клиентом SHA-256, сверяется с посчитанным сервером
+    checksum_sha256: str | None = Field(default=None, max_length=64)
 
 
-class UploadRead(UploadBase):
+class ResegmentRequest(BaseModel):
+    threshold: float = Field(default=500, gt=0)
+    # кратно длине кадра анализа (50мс)
+    window_ms: int = Field(default=50, ge=50, multiple_of=50)
+    hangover_ms: int = Field(default=0, ge=0)
+
+
+class UploadOffset(BaseModel):
+    id: UUID
+    status: str
+    size_bytes: int
+    uploaded_bytes: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UploadSummary(UploadBase):
     id: UUID
     created_at: datetime
     updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UploadRead(UploadSummary):
     jobs: list[JobRead] = []
     audio_files: list[AudioFileRead] = []
 
-    model_config = ConfigDict(from_attributes=True)
+
+class UploadPage(BaseModel):
+    items: list[UploadRead] | list[UploadSummary]
+    # курсор следующей страницы, None — страниц больше нет
+    next_cursor: str | None = None
@@ -1,77 +1,382 @@
+import asyncio
+import fcntl
+import hashlib
 import logging
 import os
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import select
+import aiofiles
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import selectinload
 
-from app.db.database import connection
-from app.db.models import AudioFile, Segment, Upload
-from app.schemas import AudioFileRead, UploadRead
+from app.core.config import settings
+from app.core.peaks import PeakPyramid
+from app.core.storage import upload_file_path, upload_peaks_path
+from app.core.wav import read_wav_layout
+from app.db.database import async_session_maker, connection
+from app.db.models import (
+    AudioFile,
+    Job,
+    JobStatusEnum,
+    Segment,
+    StatusUploadEnum,
+    Upload,
+)
+from app.schemas import (
+    AudioFileRead,
+    JobRead,
+    ResegmentRequest,
+    SegmentPage,
+    SegmentRead,
+    UploadCreate,
+    UploadPage,
+    UploadRead,
+    UploadSummary,
+    Waveform,
+)
+from app.services.cache import ResultCache, make_etag
+from app.services.dedup import (
+    clone_analysis,
+    find_analyzed_duplicate,
+    share_upload_storage,
+)
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.priority import job_priority
 
 logger = logging.getLogger(__name__)
 
+SEGMENTS_STREAM_BATCH = 1000
+
+
+class UploadConflictError(Exception):
+    """Состояние загрузки не позволяет выполнить операцию."""
+
+
+class UnsupportedAudioError(Exception):
+    """Файл загрузки повреждён или закодирован неподдерживаемым образом."""
+
 
 class AudioService:
     """
     Сервисный слой для работы с аудио и загрузками.
     """
 
+    def __init__(self):
+        # состояние SHA-256 незавершённых загрузок: id -> (offset, hasher,
+        # monotonic-время записи) от давних к свежим. Брошенные загрузки
+        # вытесняются через UPLOAD_HASHER_TTL; при промахе (вытеснение,
+        # рестарт, другой процесс) хеш пересчитывается с диска.
+        self._hashers: OrderedDict[
+            UUID, tuple[int, "hashlib._Hash", float]
+        ] = OrderedDict()
+        # готовые ответы GET /audio/{upload_id}, сбрасываются по NOTIFY
+        self.audio_info_cache = ResultCache(
+            settings.RESULT_CACHE_SIZE, settings.RESULT_CACHE_TTL
+        )
+        # глубина очереди для /metrics: (monotonic-время чтения, счётчики)
+        self._queue_depth: tuple[float, dict[str, int]] | None = None
+        self._queue_depth_lock = asyncio.Lock()
+
+    def invalidate_audio_info(self, upload_id: str) -> None:
+        """Обработчик NOTIFY об изменении результатов загрузки."""
+        try:
+            self.audio_info_cache.invalidate(UUID(upload_id))
+        except ValueError:
+            self.audio_info_cache.clear()
+
     @connection
-    async def get_uploads(self, session) -> list[UploadRead]:
+    async def get_uploads(
+        self,
+        limit: int,
+        cursor: str | None,
+        status: StatusUploadEnum | None,
+        created_from: datetime | None,
+        created_to: datetime | None,
+        detail: bool,
+        session,
+    ) -> UploadPage:
         """
-        Возвращает список всех загрузок.
+        Страница загрузок, от новых к старым (keyset по created_at, id).
+        Без detail возвращаются только поля загрузки; с detail задачи,
+        файлы и сегменты подгружаются пачками через selectinload.
+        ValueError, если курсор повреждён.
         """
         q = select(Upload)
+        if cursor:
+            created_at, upload_id = decode_cursor(cursor, 2)
+            q = q.where(
+                tuple_(Upload.created_at, Upload.id)
+                < (datetime.fromisoformat(created_at), UUID(upload_id))
+            )
+        if status:
+            q = q.where(Upload.status == status)
+        if created_from:
+            q = q.where(Upload.created_at >= created_from)
+        if created_to:
+            q = q.where(Upload.created_at < created_to)
+        if detail:
+            q = q.options(
+                selectinload(Upload.jobs),
+                selectinload(Upload.audio_files).selectinload(
+                    AudioFile.segments
+                ),
+            )
+        q = q.order_by(Upload.created_at.desc(), Upload.id.desc()).limit(
+            limit + 1
+        )
+
         result = await session.execute(q)
         uploads = result.scalars().all()
+        next_cursor = None
+        if len(uploads) > limit:
+            uploads = uploads[:limit]
+            last = uploads[-1]
+            next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
         logger.info("Fetched %s uploads", len(uploads))
-        return [UploadRead.model_validate(u) for u in uploads]
 
-    @connection
-    async def get_audio_info(
-        self, upload_id: str, session
-    ) -> AudioFileRead | None:
+        schema = UploadRead if detail else UploadSummary
+        return UploadPage(
+            items=[schema.model_validate(u) for u in uploads],
+            next_cursor=next_cursor,
+        )
+
+    async def get_audio_info_json(
+        self, upload_id: UUID
+    ) -> tuple[bytes, str] | None:
+        """
+        Сериализованный AudioFileRead и его ETag.
+        Результаты готовой (ready) загрузки неизменны и берутся из кэша.
+        """
+        cached = self.audio_info_cache.get(upload_id)
+        if cached:
+            return cached
+
+        generation = self.audio_info_cache.generation
+        loaded = await self._load_audio_info(upload_id)
+        if loaded is None:
+            return None
+        audio, ready = loaded
+        body = audio.model_dump_json().encode()
+        if ready:
+            self.audio_info_cache.set(upload_id, body, generation)
+        return body, make_etag(body)
+
+    async def get_audio_info(self, upload_id: UUID) -> AudioFileRead | None:
         """
         Возвращает информацию об обработанном аудиофайле
         (AudioFile + Segments).
         """
-        q_audio = select(AudioFile).where(
-            AudioFile.upload_id == UUID(upload_id)
+        loaded = await self._load_audio_info(upload_id)
+        return loaded[0] if loaded else None
+
+    @connection
+    async def _load_audio_info(
+        self, upload_id: UUID, session
+    ) -> tuple[AudioFileRead, bool] | None:
+        """AudioFileRead и признак того, что загрузка в статусе ready."""
+        # сегменты подгружаются вторым запросом (selectin), без lazy load
+        q_audio = (
+            select(AudioFile, Upload.status)
+            .join(Upload, AudioFile.upload_id == Upload.id)
+            .where(AudioFile.upload_id == upload_id)
+            .options(selectinload(AudioFile.segments))
         )
         result = await session.execute(q_audio)
-        audio = result.scalar_one_or_none()
-        if not audio:
+        row = result.one_or_none()
+        if not row:
             logger.warning("AudioFile for upload %s not found", upload_id)
             return None
 
-        # подгружаем связанные сегменты
-        q_segments = select(Segment).where(Segment.audio_id == audio.id)
-        result_segments = await session.execute(q_segments)
-        segments = result_segments.scalars().all()
+        audio, status = row
+        return (
+            AudioFileRead.model_validate(audio),
+            status == StatusUploadEnum.ready,
+        )
+
+    @connection
+    async def get_audio_id(self, upload_id: UUID, session) -> UUID | None:
+        """id AudioFile загрузки (None, если анализа ещё нет)."""
+        q = select(AudioFile.id).where(AudioFile.upload_id == upload_id)
+        return (await session.execute(q)).scalar_one_or_none()
+
+    @connection
+    async def get_segments(
+        self,
+        audio_id: UUID,
+        from_ms: int | None,
+        to_ms: int | None,
+        limit: int,
+        cursor: str | None,
+        session,
+    ) -> SegmentPage:
+        """
+        Страница сегментов, пересекающих окно [from_ms, to_ms),
+        по порядку start_ms (keyset по start_ms, id).
+        ValueError, если курсор повреждён.
+        """
+        q = self._segments_query(audio_id, from_ms, to_ms)
+        if cursor:
+            start_ms, segment_id = decode_cursor(cursor, 2)
+            q = q.where(
+                tuple_(Segment.start_ms, Segment.id)
+                > (int(start_ms), int(segment_id))
+            )
+        q = q.limit(limit + 1)
+
+        segments = (await session.execute(q)).scalars().all()
+        next_cursor = None
+        if len(segments) > limit:
+            segments = segments[:limit]
+            last = segments[-1]
+            next_cursor = encode_cursor(last.start_ms, last.id)
+        return SegmentPage(
+            items=[SegmentRead.model_validate(s) for s in segments],
+            next_cursor=next_cursor,
+        )
+
+    async def stream_segments(
+        self, audio_id: UUID, from_ms: int | None, to_ms: int | None
+    ) -> AsyncIterator[bytes]:
+        """
+        Сегменты окна в формате NDJSON. Строки читаются серверным
+        курсором пачками по SEGMENTS_STREAM_BATCH и сразу отдаются,
+        весь результат в памяти не собирается.
+        """
+        q = self._segments_query(audio_id, from_ms, to_ms).execution_options(
+            yield_per=SEGMENTS_STREAM_BATCH
+        )
+        async with async_session_maker() as session:
+            result = await session.stream_scalars(q)
+            async for batch in result.partitions():
+                yield b"".join(
+                    SegmentRead.model_validate(s).model_dump_json().encode()
+                    + b"\n"
+                    for s in batch
+                )
+                # объекты пачки больше не нужны сессии
+                session.expunge_all()
+
+    @staticmethod
+    def _segments_query(
+        audio_id: UUID, from_ms: int | None, to_ms: int | None
+    ):
+        q = select(Segment).where(Segment.audio_id == audio_id)
+        if from_ms is not None:
+            # сегменты одного файла не пересекаются, поэтому раньше from_ms
+            # может начинаться только один нужный сегмент — последний
+            # с start_ms <= from_ms; нижняя граница идёт по индексу
+            first_start = (
+                select(func.max(Segment.start_ms))
+                .where(
+                    Segment.audio_id == audio_id, Segment.start_ms <= from_ms
+                )
+                .scalar_subquery()
+            )
+            q = q.where(
+                Segment.start_ms >= func.coalesce(first_start, 0),
+                Segment.end_ms > from_ms,
+            )
+        if to_ms is not None:
+            q = q.where(Segment.start_ms < to_ms)
+        return q.order_by(Segment.start_ms, Segment.id)
+
+    async def get_waveform(
+        self, upload_id: UUID, level: int, from_ms: int, to_ms: int | None
+    ) -> Waveform | None:
+        """
+        Срез пирамиды пиков для отрисовки волны (memmap, без БД).
+        ValueError, если уровня нет или в срезе больше WAVEFORM_MAX_BINS
+        точек.
+        """
+        peaks_path = upload_peaks_path(upload_id)
 
-        # подставляем сегменты для сериализации
-        audio.segments = segments
-        return AudioFileRead.model_validate(audio)
+        def read():
+            if not os.path.exists(peaks_path):
+                return None
+            pyramid = PeakPyramid(peaks_path)
+            start, peaks = pyramid.read(
+                level, from_ms, to_ms, max_bins=settings.WAVEFORM_MAX_BINS
+            )
+            samples_per_bin = pyramid.samples_per_bin(level)
+            return Waveform(
+                level=level,
+                levels=pyramid.levels,
+                sample_rate=pyramid.sample_rate,
+                samples_per_bin=samples_per_bin,
+                start_ms=start * samples_per_bin * 1000 / pyramid.sample_rate,
+                data=peaks.ravel().tolist(),
+            )
+
+        return await asyncio.to_thread(read)
 
     @connection
-    async def get_upload_file_path(
-        self, upload_id: str, session
-    ) -> str | None:
+    async def get_download(
+        self, upload_id: UUID, session
+    ) -> tuple[str, str | None] | None:
         """
-        Возвращает путь к оригинальному файлу (для скачивания).
+        Возвращает путь к оригинальному файлу (для скачивания)
+        и его SHA-256, из которого строится ETag.
         """
         upload = await session.get(Upload, upload_id)
-        if not upload:
-            logger.warning("Upload %s not found", upload_id)
         if not upload:
             logger.warning("Upload %s not found", upload_id)
             return None
 
-        file_path = f"storage/uploads/{upload.id}/file"
+        file_path = upload_file_path(upload.id)
         if not os.path.exists(file_path):
             logger.error("File not found at %s", file_path)
             return None
-        return file_path
+        return file_path, upload.checksum_sha256
+
+    async def get_wav_snippet(
+        self, file_path: str, start_ms: int, end_ms: int | None
+    ) -> tuple[bytes, int, int]:
+        """
+        Заголовок WAV для отрезка [start_ms, end_ms) и диапазон байт
+        его данных в исходном файле (смещение, длина).
+
+        UnsupportedAudioError, если заголовок файла не разбирается;
+        ValueError, если отрезок пуст или вне записи.
+        """
+
+        def read_layout():
+            with open(file_path, "rb") as f:
+                return read_wav_layout(f)
+
+        try:
+            layout = await asyncio.to_thread(read_layout)
+        except ValueError as e:
+            raise UnsupportedAudioError(str(e)) from e
+        offset, length = layout.byte_range(start_ms, end_ms)
+        return layout.header(length), offset, length
+
+    async def stream_file_range(
+        self, file_path: str, offset: int, length: int, prefix: bytes = b""
+    ) -> AsyncIterator[bytes]:
+        """
+        Отдаёт prefix и length байт файла начиная с offset
+        блоками по UPLOAD_CHUNK_SIZE.
+        """
+        yield prefix
+        async with aiofiles.open(file_path, "rb") as f:
+            await f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = await f.read(
+                    min(settings.UPLOAD_CHUNK_SIZE, remaining)
+                )
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        if length % 2:
+            # выравнивающий байт чанка data
+            yield b"\0"
 
     @connection
     async def get_upload_by_id(self, upload_id: str, session) -> Upload | None:
@@ -80,3 +385,325 @@ class AudioService:
         """
         upload = await session.get(Upload, upload_id)
         return upload
+
+    @connection
+    async def create_upload(self, data: UploadCreate, session) -> UploadRead:
+        """
+        Создаёт загрузку в статусе receiving и пустой файл под неё.
+        """
+        upload = Upload(
+            filename=data.filename,
+            content_type=data.content_type,
+            size_bytes=data.size_bytes,
+            status=StatusUploadEnum.receiving,
+            uploaded_bytes=0,
+            jobs=[],
+            audio_files=[],
+        )
+        session.add(upload)
+        await session.flush()
+
+        await asyncio.to_thread(
+            _create_empty_file, upload_file_path(upload.id)
+        )
+        await session.commit()
+        logger.info("Upload %s created (%s bytes)", upload.id, data.size_bytes)
+        return UploadRead.model_validate(upload)
+
+    async def write_chunk(
+        self,
+        upload_id: UUID,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+    ) -> Upload | None:
+        """
+        Дописывает поток байт в файл загрузки с позиции offset.
+        offset должен совпадать с uploaded_bytes: чанки идут по порядку,
+        иначе нельзя вести SHA-256 инкрементально. Данные пишутся на диск
+        по мере чтения тела запроса, offset в БД сдвигается только после
+        успешной записи всего тела. При ошибке или обрыве соединения
+        клиент повторяет запрос с прежнего offset (GET .../offset),
+        а недописанный хвост отбрасывается.
+        """
+        file_path = upload_file_path(upload_id)
+        if not os.path.exists(file_path):
+            return None
+
+        async with aiofiles.open(file_path, "r+b") as f:
+            # один писатель на загрузку, в том числе между процессами
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadConflictError("Upload is being written")
+
+            upload = await self._get_receiving_upload(upload_id)
+            if upload is None:
+                return None
+            if offset != upload.uploaded_bytes:
+                raise UploadConflictError(
+                    f"Offset mismatch: expected {upload.uploaded_bytes}"
+                )
+
+            hasher = await self._get_hasher(upload_id, offset)
+            # отбрасываем хвост чанка, оборванного до записи offset в БД
+            await f.truncate(offset)
+            await f.seek(offset)
+            written = 0
+            try:
+                async for chunk in chunks:
+                    if offset + written + len(chunk) > upload.size_bytes:
+                        raise UploadConflictError(
+                            "Chunk exceeds declared upload size"
+                        )
+                    await f.write(chunk)
+                    hasher.update(chunk)
+                    written += len(chunk)
+                await f.flush()
+            except BaseException:
+                # хеш уже включает недописанный хвост: следующий запрос
+                # пересчитает его с диска до offset
+                self._hashers.pop(upload_id, None)
+                raise
+            self._store_hasher(upload_id, offset + written, hasher)
+            upload = await self._advance_offset(
+                upload_id, offset, offset + written
+            )
+        return upload
+
+    @connection
+    async def get_upload(self, upload_id: UUID, session) -> Upload | None:
+        """Upload без связей (для offset и статуса)."""
+        return await session.get(Upload, upload_id)
+
+    @connection
+    async def complete_upload(
+        self, upload_id: UUID, checksum_sha256: str | None, session
+    ) -> UploadRead | None:
+        """
+        Завершает загрузку: сверяет размер и SHA-256 и ставит задачу
+        analyze в очередь. Если такое же содержимое уже проанализировано,
+        результат копируется без задачи, а файл заменяется hardlink'ом.
+        Повторный вызов возвращает текущее состояние.
+        """
+        upload = await session.get(Upload, upload_id, with_for_update=True)
+        if not upload:
+            return None
+        if upload.status != StatusUploadEnum.receiving:
+            return await self._read_upload(session, upload_id)
+        if upload.uploaded_bytes != upload.size_bytes:
+            raise UploadConflictError(
+                f"Upload incomplete: {upload.uploaded_bytes} of "
+                f"{upload.size_bytes} bytes received"
+            )
+
+        hasher = await self._get_hasher(upload_id, upload.uploaded_bytes)
+        checksum = hasher.hexdigest()
+        if checksum_sha256 and checksum_sha256.lower() != checksum:
+            raise UploadConflictError("Checksum mismatch")
+
+        upload.checksum_sha256 = checksum
+        self._hashers.pop(upload_id, None)
+
+        source = await find_analyzed_duplicate(session, upload_id, checksum)
+        if source:
+            await asyncio.to_thread(
+                share_upload_storage, source.upload_id, upload_id
+            )
+            await clone_analysis(session, source, upload_id)
+            upload.status = StatusUploadEnum.ready
+            await session.commit()
+            logger.info(
+                "Upload %s is a duplicate of %s, analysis reused",
+                upload_id,
+                source.upload_id,
+            )
+            return await self._read_upload(session, upload_id)
+
+        upload.status = StatusUploadEnum.processing
+        session.add(
+            Job(
+                upload_id=upload.id,
+                type="analyze",
+                status=JobStatusEnum.queued,
+                priority=job_priority("analyze", upload.size_bytes),
+            )
+        )
+        await session.commit()
+        logger.info("Upload %s completed, analyze job queued", upload_id)
+        return await self._read_upload(session, upload_id)
+
+    @connection
+    async def get_job(self, job_id: UUID, session) -> JobRead | None:
+        """Задача с длительностями этапов последнего выполнения."""
+        job = await session.get(Job, job_id)
+        if not job:
+            logger.warning("Job %s not found", job_id)
+            return None
+        return JobRead.model_validate(job)
+
+    async def get_queue_depth(self) -> dict[str, int]:
+        """
+        Число задач по статусам (для /metrics). Значение кэшируется
+        на QUEUE_DEPTH_CACHE_TTL, одновременные опросы ждут один запрос.
+        """
+        async with self._queue_depth_lock:
+            now = time.monotonic()
+            if (
+                self._queue_depth is None
+                or now - self._queue_depth[0] >= settings.QUEUE_DEPTH_CACHE_TTL
+            ):
+                self._queue_depth = (now, await self._count_jobs())
+            return self._queue_depth[1]
+
+    @connection
+    async def _count_jobs(self, session) -> dict[str, int]:
+        q = select(Job.status, func.count()).group_by(Job.status)
+        counts = dict((await session.execute(q)).all())
+        return {
+            status.value: counts.get(status, 0) for status in JobStatusEnum
+        }
+
+    @connection
+    async def schedule_resegment(
+        self, upload_id: UUID, params: ResegmentRequest, session
+    ) -> JobRead | None:
+        """
+        Ставит задачу resegment с параметрами в payload. Задача одна
+        на загрузку (uq_jobs_upload_type), поэтому повторный запрос
+        перезапускает её с новыми параметрами.
+        """
+        upload = await session.get(Upload, upload_id)
+        if not upload:
+            return None
+        if upload.status != StatusUploadEnum.ready:
+            raise UploadConflictError("Upload is not analyzed yet")
+
+        now = datetime.utcnow()
+        payload = params.model_dump()
+        priority = job_priority("resegment", upload.size_bytes)
+        q = (
+            pg_insert(Job)
+            .values(
+                upload_id=upload_id,
+                type="resegment",
+                status=JobStatusEnum.queued,
+                priority=priority,
+                payload=payload,
+            )
+            .on_conflict_do_update(
+                constraint="uq_jobs_upload_type",
+                set_=dict(
+                    status=JobStatusEnum.queued,
+                    payload=payload,
+                    attempts=0,
+                    priority=priority,
+                    last_error=None,
+                    run_after=now,
+                    updated_at=now,
+                ),
+                # выполняющуюся задачу не трогаем
+                where=Job.status != JobStatusEnum.in_progress,
+            )
+            .returning(Job)
+        )
+        job = (await session.execute(q)).scalar_one_or_none()
+        if not job:
+            raise UploadConflictError("Resegmentation is already running")
+        await session.commit()
+        logger.info("Resegment job queued for upload %s", upload_id)
+        return JobRead.model_validate(job)
+
+    async def _read_upload(self, session, upload_id: UUID) -> UploadRead:
+        """Upload со всеми связями, загруженными заранее."""
+        q = (
+            select(Upload)
+            .where(Upload.id == upload_id)
+            .options(
+                selectinload(Upload.jobs),
+                selectinload(Upload.audio_files).selectinload(
+                    AudioFile.segments
+                ),
+            )
+            .execution_options(populate_existing=True)
+        )
+        upload = (await session.execute(q)).scalar_one()
+        return UploadRead.model_validate(upload)
+
+    @connection
+    async def _get_receiving_upload(
+        self, upload_id: UUID, session
+    ) -> Upload | None:
+        upload = await session.get(Upload, upload_id)
+        # тело запроса читается долго: транзакцию (и соединение)
+        # сессии запроса на это время не держим
+        await session.commit()
+        if upload and upload.status != StatusUploadEnum.receiving:
+            raise UploadConflictError("Upload is already completed")
+        return upload
+
+    @connection
+    async def _advance_offset(
+        self, upload_id: UUID, offset: int, new_offset: int, session
+    ) -> Upload:
+        """Сдвигает uploaded_bytes, только если его никто не изменил."""
+        res = await session.execute(
+            update(Upload)
+            .where(Upload.id == upload_id, Upload.uploaded_bytes == offset)
+            .values(uploaded_bytes=new_offset)
+            .returning(Upload)
+        )
+        upload = res.scalar_one_or_none()
+        await session.commit()
+        if upload is None:
+            raise UploadConflictError("Upload offset changed concurrently")
+        return upload
+
+    async def _get_hasher(self, upload_id: UUID, offset: int):
+        """
+        SHA-256 первых offset байт файла: из кэша или пересчётом с диска.
+        """
+        cached = self._hashers.get(upload_id)
+        if cached and cached[0] == offset:
+            return cached[1]
+        hasher = await asyncio.to_thread(
+            _hash_file_prefix, upload_file_path(upload_id), offset
+        )
+        self._store_hasher(upload_id, offset, hasher)
+        return hasher
+
+    def _store_hasher(self, upload_id: UUID, offset: int, hasher) -> None:
+        """
+        Кэширует состояние SHA-256 загрузки и вытесняет записи,
+        не обновлявшиеся дольше UPLOAD_HASHER_TTL, и самые давние
+        сверх UPLOAD_HASHER_CACHE_SIZE.
+        """
+        now = time.monotonic()
+        self._hashers[upload_id] = (offset, hasher, now)
+        self._hashers.move_to_end(upload_id)
+        expired_at = now - settings.UPLOAD_HASHER_TTL
+        while self._hashers:
+            _, _, updated_at = next(iter(self._hashers.values()))
+            if (
+                updated_at >= expired_at
+                and len(self._hashers) <= settings.UPLOAD_HASHER_CACHE_SIZE
+            ):
+                break
+            self._hashers.popitem(last=False)
+
+
+def _create_empty_file(file_path: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    open(file_path, "wb").close()
+
+
+def _hash_file_prefix(file_path: str, size: int):
+    """Читает файл блоками и хеширует первые size байт."""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while size > 0:
+            block = f.read(min(settings.UPLOAD_CHUNK_SIZE, size))
+            if not block:
+                break
+            hasher.update(block)
+            size -= len(block)
+    return hasher
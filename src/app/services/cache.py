@@ -0,0 +1,57 @@
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+
+class ResultCache:
+    """
+    LRU-кэш сериализованных ответов с ограничением размера и TTL.
+    Хранит готовые байты тела и их ETag, чтобы повторный запрос
+    не требовал ни запросов в БД, ни валидации Pydantic.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, bytes, str]] = (
+            OrderedDict()
+        )
+        # счётчик инвалидаций: set() не сохраняет значение, загруженное
+        # до инвалидации, которая пришла во время загрузки
+        self.generation = 0
+
+    def get(self, key: Hashable) -> tuple[bytes, str] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, body, etag = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body, etag
+
+    def set(self, key: Hashable, body: bytes, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._entries[key] = (
+            time.monotonic() + self.ttl,
+            body,
+            make_etag(body),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.generation += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
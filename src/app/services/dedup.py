@@ -0,0 +1,130 @@
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.dialects.postgresql import distinct_on
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.storage import upload_dir, upload_file_path
+from app.db.models import AudioFile, Segment, StatusUploadEnum, Upload
+
+logger = logging.getLogger(__name__)
+
+
+async def find_analyzed_duplicate(
+    session: AsyncSession, upload_id: uuid.UUID, checksum: str
+) -> AudioFile | None:
+    """
+    Готовый результат анализа другой загрузки с тем же содержимым
+    (поиск по индексу uploads.checksum_sha256).
+    """
+    q = (
+        select(AudioFile)
+        .join(Upload, AudioFile.upload_id == Upload.id)
+        .where(
+            Upload.checksum_sha256 == checksum,
+            Upload.status == StatusUploadEnum.ready,
+            Upload.id != upload_id,
+        )
+        .order_by(AudioFile.created_at)
+        .limit(1)
+    )
+    return (await session.execute(q)).scalar_one_or_none()
+
+
+async def find_analyzed_duplicates(
+    session: AsyncSession, upload_ids: list[uuid.UUID]
+) -> dict[uuid.UUID, AudioFile]:
+    """
+    То же для нескольких загрузок одним запросом:
+    {upload_id: готовый AudioFile загрузки с тем же checksum}.
+    Загрузки без найденного дубликата в результат не попадают.
+    """
+    if not upload_ids:
+        return {}
+    target = aliased(Upload)
+    q = (
+        select(target.id, AudioFile)
+        .join(Upload, Upload.checksum_sha256 == target.checksum_sha256)
+        .join(AudioFile, AudioFile.upload_id == Upload.id)
+        .where(
+            target.id.in_(upload_ids),
+            Upload.status == StatusUploadEnum.ready,
+            Upload.id != target.id,
+        )
+        .order_by(target.id, AudioFile.created_at)
+        .ext(distinct_on(target.id))
+    )
+    return dict((await session.execute(q)).all())
+
+
+async def clone_analysis(
+    session: AsyncSession, source: AudioFile, upload_id: uuid.UUID
+) -> uuid.UUID:
+    """
+    Копирует AudioFile и его сегменты на новую загрузку.
+    Сегменты копируются на стороне БД одним INSERT ... SELECT.
+    """
+    audio_id = uuid.uuid4()
+    await session.execute(
+        insert(AudioFile).values(
+            id=audio_id,
+            upload_id=upload_id,
+            file_path=upload_file_path(upload_id),
+            duration_s=source.duration_s,
+            channels=source.channels,
+            sample_rate=source.sample_rate,
+            format=source.format,
+            rms_avg=source.rms_avg,
+            zcr_avg=source.zcr_avg,
+        )
+    )
+    segments = select(
+        literal(audio_id, Segment.audio_id.type),
+        Segment.start_ms,
+        Segment.end_ms,
+        Segment.rms,
+        Segment.zcr,
+        Segment.transcript,
+        literal(datetime.utcnow(), Segment.created_at.type),
+    ).where(Segment.audio_id == source.id)
+    await session.execute(
+        insert(Segment).from_select(
+            [
+                "audio_id",
+                "start_ms",
+                "end_ms",
+                "rms",
+                "zcr",
+                "transcript",
+                "created_at",
+            ],
+            segments,
+        )
+    )
+    return audio_id
+
+
+def share_upload_storage(source_id: uuid.UUID, target_id: uuid.UUID) -> None:
+    """
+    Заменяет файлы target жёсткими ссылками на файлы source с тем же
+    содержимым, чтобы дубликат не занимал место на диске.
+    """
+    source_dir, target_dir = upload_dir(source_id), upload_dir(target_id)
+    os.makedirs(target_dir, exist_ok=True)
+    for entry in os.scandir(source_dir):
+        if not entry.is_file():
+            continue
+        target = os.path.join(target_dir, entry.name)
+        tmp = f"{target}.link"
+        try:
+            os.link(entry.path, tmp)
+            os.replace(tmp, target)
+        except OSError as e:
+            # другой том или ФС без hardlink — оставляем свою копию
+            logger.warning("Cannot share %s: %s", entry.path, e)
+            if os.path.exists(tmp):
+                os.unlink(tmp)
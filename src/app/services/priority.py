@@ -0,0 +1,15 @@
+from bisect import bisect_left
+
+from app.core.config import worker_settings
+
+
+def job_priority(job_type: str, size_bytes: int) -> int:
+    """
+    Начальный приоритет задачи (меньше — раньше). analyze попадает
+    в полосу по размеру файла: 0 до первой границы PRIORITY_SIZE_LANES,
+    1 до второй и т.д. resegment читает только признаки кадров и всегда
+    идёт в полосе 0. Ожидающие задачи поднимает старение воркера.
+    """
+    if job_type != "analyze":
+        return 0
+    return bisect_left(worker_settings.PRIORITY_SIZE_LANES, size_bytes)
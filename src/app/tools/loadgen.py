@@ -0,0 +1,376 @@
+"""
+Нагрузочный прогон приёма аудио: API и встроенный воркер из
+app.main.create_app в одном процессе, локальный Postgres из .env.
+
+    python -m app.tools.loadgen --rate 2 --duration 60 \\
+        --sizes 5:70,60:25,600:5 --output report.json
+
+Загрузки приходят пуассоновским потоком (открытая модель: новые
+не ждут завершения старых), поэтому при перегрузке растёт задержка,
+а не падает частота запросов. В отчёт (JSON) попадают перцентили
+задержки от постановки в очередь до готовности, глубина очереди
+и использование соединений с БД во времени, настройки воркера.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import asyncpg
+import httpx
+import numpy as np
+
+from app.core.config import settings, worker_settings
+from app.core.metrics import pool_checkout_wait_seconds
+from app.db.database import engine
+from app.db.notifications import PgListener
+from app.main import create_app
+from app.tools.synth import SynthSpec, wav_bytes
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 95, 99)
+FINAL_STATUSES = ("ready", "failed")
+
+
+@dataclass
+class UploadRun:
+    size: str
+    duration_s: float
+    upload_id: str | None = None
+    # perf_counter: отправка complete (постановка в очередь) и итог
+    enqueued_at: float | None = None
+    finished_at: float | None = None
+    status: str | None = None
+    error: str | None = None
+
+
+def _percentiles(values: list[float]) -> dict | None:
+    if not values:
+        return None
+    arr = np.asarray(values)
+    stats = dict(mean=arr.mean(), max=arr.max())
+    stats.update((f"p{p}", np.percentile(arr, p)) for p in PERCENTILES)
+    return dict(
+        count=len(values), **{k: round(float(v), 6) for k, v in stats.items()}
+    )
+
+
+def _parse_sizes(value: str) -> list[tuple[float, float]]:
+    """'5:70,60:25' -> [(секунд аудио, вес), ...]."""
+    sizes = []
+    for item in value.split(","):
+        seconds, _, weight = item.partition(":")
+        sizes.append((float(seconds), float(weight or 1)))
+    return sizes
+
+
+class LoadGenerator:
+    def __init__(self, app, args: argparse.Namespace):
+        if args.seed is None:
+            # одинаковое содержимое в повторных прогонах по той же БД
+            # сервер не анализирует, а копирует (дедупликация)
+            args.seed = int(np.random.SeedSequence().entropy % 2**32)
+        self.app = app
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.runs: list[UploadRun] = []
+        self.timeline: list[dict] = []
+        self.http: dict[str, list[float]] = {
+            "create": [],
+            "upload": [],
+            "complete": [],
+        }
+        self._waiters: dict[str, asyncio.Event] = {}
+        self._start = 0.0
+
+    async def run(self) -> dict:
+        sizes = _parse_sizes(self.args.sizes)
+        weights = np.array([w for _, w in sizes])
+        wait_before = pool_checkout_wait_seconds()
+
+        listener = PgListener(
+            worker_settings.RESULTS_CHANNEL, callback=self._on_result
+        )
+        await listener.start()
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadgen", timeout=None
+        ) as client:
+            self._start = time.perf_counter()
+            sampler = asyncio.create_task(self._sample())
+            tasks = []
+            i = 0
+            # пуассоновский поток: экспоненциальные интервалы
+            next_at = self.rng.exponential(1 / self.args.rate)
+            while next_at < self.args.duration:
+                await asyncio.sleep(
+                    max(0.0, self._start + next_at - time.perf_counter())
+                )
+                seconds, _ = sizes[
+                    self.rng.choice(len(sizes), p=weights / weights.sum())
+                ]
+                run = UploadRun(size=f"{seconds:g}s", duration_s=seconds)
+                self.runs.append(run)
+                tasks.append(asyncio.create_task(self._upload(client, run, i)))
+                i += 1
+                next_at += self.rng.exponential(1 / self.args.rate)
+
+            arrivals_done = time.perf_counter() - self._start
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*tasks), self.args.drain_timeout
+                )
+            except TimeoutError:
+                logger.warning("Drain timeout, %d uploads pending", len(tasks))
+            sampler.cancel()
+            with suppress(asyncio.CancelledError):
+                await sampler
+        await listener.stop()
+
+        wait_after = pool_checkout_wait_seconds()
+        return self._report(arrivals_done, wait_after - wait_before)
+
+    def _on_result(self, upload_id: str) -> None:
+        event = self._waiters.get(upload_id)
+        if event is not None:
+            event.set()
+
+    async def _timed(self, step: str, request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await request
+        self.http[step].append(time.perf_counter() - start)
+        response.raise_for_status()
+        return response
+
+    async def _upload(
+        self, client: httpx.AsyncClient, run: UploadRun, index: int
+    ) -> None:
+        args = self.args
+        spec = SynthSpec(
+            f"load_{index}",
+            run.duration_s,
+            sample_rate=args.sample_rate,
+            channels=args.channels,
+            seed=args.seed * 1_000_003 + index,
+        )
+        try:
+            # генерация в потоке, чтобы не задерживать цикл событий
+            raw = await asyncio.to_thread(wav_bytes, spec)
+            upload = await self._timed(
+                "create",
+                client.post(
+                    "/audio/uploads",
+                    json=dict(
+                        filename=f"{spec.name}.wav", size_bytes=len(raw)
+                    ),
+                ),
+            )
+            run.upload_id = upload_id = upload.json()["id"]
+            event = self._waiters[upload_id] = asyncio.Event()
+
+            for offset in range(0, len(raw), args.chunk_size):
+                await self._timed(
+                    "upload",
+                    client.patch(
+                        f"/audio/uploads/{upload_id}",
+                        params=dict(offset=offset),
+                        content=raw[offset : offset + args.chunk_size],
+                    ),
+                )
+            run.enqueued_at = time.perf_counter()
+            completed = await self._timed(
+                "complete",
+                client.post(f"/audio/uploads/{upload_id}/complete"),
+            )
+            if completed.json()["status"] in FINAL_STATUSES:
+                # дубликат уже проанализированного содержимого:
+                # результат скопирован без задачи и без NOTIFY
+                run.status = "reused"
+                return
+
+            # уведомление приходит и о повторных попытках, поэтому
+            # статус загрузки проверяется после каждого. Задача могла
+            # завершиться до этой строки: событие тогда уже выставлено
+            while True:
+                await event.wait()
+                event.clear()
+                finished_at = time.perf_counter()
+                response = await client.get(
+                    f"/audio/uploads/{upload_id}/offset"
+                )
+                status = response.json()["status"]
+                if status in FINAL_STATUSES:
+                    run.status = status
+                    run.finished_at = finished_at
+                    return
+        except Exception as e:
+            # любая ошибка — итог одной загрузки, а не всего прогона:
+            # иначе gather прервётся и отчёт не будет записан
+            run.status = "error"
+            run.error = repr(e)
+
+    async def _sample(self) -> None:
+        """
+        Глубина очереди и соединения с БД раз в sample_interval.
+        Отдельное соединение asyncpg, чтобы не занимать пул приложения.
+        """
+        conn = await asyncpg.connect(
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            user=settings.DB_USER,
+            password=settings.DB_PASS,
+            database=settings.DB_NAME,
+        )
+        try:
+            while True:
+                jobs = dict(
+                    await conn.fetch(
+                        "SELECT status::text, count(*) FROM jobs "
+                        "GROUP BY status"
+                    )
+                )
+                backends = await conn.fetchval(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database()"
+                )
+                pool = engine.pool
+                self.timeline.append(
+                    dict(
+                        t=round(time.perf_counter() - self._start, 3),
+                        jobs=jobs,
+                        db_pool=dict(
+                            size=pool.size(),
+                            checked_out=pool.checkedout(),
+                            overflow=max(pool.overflow(), 0),
+                        ),
+                        # включая это соединение и подписки LISTEN
+                        db_backends=backends,
+                    )
+                )
+                await asyncio.sleep(self.args.sample_interval)
+        finally:
+            await conn.close()
+
+    def _report(self, arrivals_s: float, checkout_wait_s: float) -> dict:
+        finished = [r for r in self.runs if r.finished_at is not None]
+        latencies = [r.finished_at - r.enqueued_at for r in finished]
+        counts = {"submitted": len(self.runs)}
+        for run in self.runs:
+            status = run.status or "timed_out"
+            counts[status] = counts.get(status, 0) + 1
+
+        elapsed = (
+            max(r.finished_at for r in finished) if finished else 0
+        ) - self._start
+        ready = [r for r in finished if r.status == "ready"]
+        audio_s = sum(r.duration_s for r in ready)
+
+        by_size = {}
+        for run in finished:
+            by_size.setdefault(run.size, []).append(
+                run.finished_at - run.enqueued_at
+            )
+
+        return dict(
+            started_at=datetime.now(timezone.utc).isoformat(),
+            config=vars(self.args),
+            worker_settings=worker_settings.model_dump(),
+            arrivals_s=round(arrivals_s, 3),
+            uploads=counts,
+            errors=sorted({r.error for r in self.runs if r.error}),
+            throughput=dict(
+                jobs_per_s=len(ready) / elapsed if elapsed > 0 else None,
+                audio_s_per_s=audio_s / elapsed if elapsed > 0 else None,
+            ),
+            latency_s=dict(
+                enqueue_to_done=_percentiles(latencies),
+                by_size={
+                    size: _percentiles(values)
+                    for size, values in sorted(by_size.items())
+                },
+                http={
+                    step: _percentiles(values)
+                    for step, values in self.http.items()
+                },
+            ),
+            db=dict(
+                pool_checked_out_max=max(
+                    (s["db_pool"]["checked_out"] for s in self.timeline),
+                    default=0,
+                ),
+                backends_max=max(
+                    (s["db_backends"] for s in self.timeline), default=0
+                ),
+                pool_checkout_wait_s=round(checkout_wait_s, 6),
+            ),
+            timeline=self.timeline,
+        )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.tools.loadgen",
+        description="Load test of upload -> analyze -> ready",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=1.0, help="uploads per second"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=60, help="arrival phase, seconds"
+    )
+    parser.add_argument(
+        "--sizes",
+        default="5:70,60:25,600:5",
+        help="audio length mix, seconds:weight[,...]",
+    )
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=4 * 1024 * 1024,
+        help="bytes per PATCH request",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=600,
+        help="seconds to wait for pending jobs after arrivals stop",
+    )
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="corpus seed (random by default, saved in the report)",
+    )
+    parser.add_argument(
+        "--output", default="-", help="report path, '-' for stdout"
+    )
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None) -> dict:
+    args = parse_args(argv)
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        report = await LoadGenerator(app, args).run()
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
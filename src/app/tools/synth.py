@@ -0,0 +1,149 @@
+import io
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import numpy as np
+
+from app.core.wav import WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM
+
+BLOCK_S = 10  # секунд сигнала в одном блоке генерации
+
+# (формат, бит на отсчёт) по имени кодека
+SAMPLE_FORMATS = {
+    "pcm_s16le": (WAVE_FORMAT_PCM, 16),
+    "pcm_s24le": (WAVE_FORMAT_PCM, 24),
+    "pcm_f32le": (WAVE_FORMAT_IEEE_FLOAT, 32),
+}
+
+
+@dataclass(frozen=True)
+class SynthSpec:
+    """
+    Детерминированная синтетическая запись: чередование «фраз»
+    (гармонический тон с огибающей слогов), тишины и шума.
+    Одинаковые параметры дают байт-в-байт одинаковый файл.
+    """
+
+    name: str
+    duration_s: float
+    sample_rate: int = 16000
+    channels: int = 1
+    codec: str = "pcm_s16le"
+    seed: int = 0
+    # доли времени фраз и шумовых участков, остальное — тишина
+    speech_ratio: float = 0.5
+    noise_ratio: float = 0.1
+
+    @property
+    def n_frames(self) -> int:
+        return int(self.duration_s * self.sample_rate)
+
+    @property
+    def data_size(self) -> int:
+        _, bits = SAMPLE_FORMATS[self.codec]
+        return self.n_frames * self.channels * bits // 8
+
+
+def _layout(spec: SynthSpec) -> np.ndarray:
+    """Тип участка для каждой секунды: 0 — тишина, 1 — фраза, 2 — шум."""
+    rng = np.random.default_rng(spec.seed)
+    seconds = int(np.ceil(spec.duration_s))
+    return rng.choice(
+        3,
+        size=seconds,
+        p=[
+            1 - spec.speech_ratio - spec.noise_ratio,
+            spec.speech_ratio,
+            spec.noise_ratio,
+        ],
+    )
+
+
+def _block(
+    spec: SynthSpec, kinds: np.ndarray, start: int, n: int
+) -> np.ndarray:
+    """Блок сигнала float32 в [-1, 1] формы (n, channels)."""
+    sr = spec.sample_rate
+    # шум зависит от номера блока, а не от порядка вызовов
+    rng = np.random.default_rng((spec.seed, start))
+    t = (start + np.arange(n)) / sr
+    kind = kinds[(start + np.arange(n)) // sr]
+
+    # высота тона и темп слогов свои для каждого seed: иначе записи
+    # из одних фраз совпадали бы побайтно при разных seed
+    voice = np.random.default_rng(spec.seed).uniform(0.8, 1.25, 2)
+    # фаза — интеграл f0 = v * (110 + 60 sin(2π·0.3t)) от нуля до t:
+    # считается от начала записи, поэтому тон без скачков на стыке блоков
+    vibrato = 2 * np.pi * 0.3
+    phase = voice[0] * (
+        2 * np.pi * 110 * t
+        + 2 * np.pi * 60 / vibrato * (1 - np.cos(vibrato * t))
+    )
+    voiced = sum(np.sin(k * phase) / k for k in (1, 2, 3, 5))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * voice[1] * t), 0, None) ** 2
+    speech = 0.3 * voiced * syllables
+
+    noise = rng.normal(0, 0.1, n)
+    floor = rng.normal(0, 0.001, n)  # фоновый шум под всем сигналом
+    mono = floor + np.where(kind == 1, speech, np.where(kind == 2, noise, 0))
+
+    channels = [mono]
+    for ch in range(1, spec.channels):
+        # остальные каналы — ослабленная копия с небольшой задержкой
+        channels.append(0.8 * np.roll(mono, 7 * ch))
+    return np.clip(np.stack(channels, axis=1), -1, 1).astype(np.float32)
+
+
+def _encode(block: np.ndarray, codec: str) -> bytes:
+    if codec == "pcm_s16le":
+        return (block * 32767).astype("<i2").tobytes()
+    if codec == "pcm_f32le":
+        return block.astype("<f4").tobytes()
+    # 24 бита: младшие три байта int32
+    samples = (block * 8388607).astype("<i4").reshape(-1, 1)
+    return samples.view(np.uint8)[:, :3].tobytes()
+
+
+def _header(spec: SynthSpec) -> bytes:
+    format_tag, bits = SAMPLE_FORMATS[spec.codec]
+    block_align = spec.channels * bits // 8
+    fmt = struct.pack(
+        "<HHIIHH",
+        format_tag,
+        spec.channels,
+        spec.sample_rate,
+        spec.sample_rate * block_align,
+        block_align,
+        bits,
+    )
+    return b"".join(
+        (
+            struct.pack("<4sI4s", b"RIFF", 36 + spec.data_size, b"WAVE"),
+            struct.pack("<4sI", b"fmt ", len(fmt)),
+            fmt,
+            struct.pack("<4sI", b"data", spec.data_size),
+        )
+    )
+
+
+def iter_wav(spec: SynthSpec) -> Iterator[bytes]:
+    """WAV блоками по BLOCK_S секунд: память не зависит от длины."""
+    yield _header(spec)
+    kinds = _layout(spec)
+    block = BLOCK_S * spec.sample_rate
+    for start in range(0, spec.n_frames, block):
+        n = min(block, spec.n_frames - start)
+        yield _encode(_block(spec, kinds, start, n), spec.codec)
+
+
+def write_wav(spec: SynthSpec, f: BinaryIO) -> None:
+    for chunk in iter_wav(spec):
+        f.write(chunk)
+
+
+def wav_bytes(spec: SynthSpec) -> bytes:
+    buf = io.BytesIO()
+    write_wav(spec, buf)
+    return buf.getvalue()
@@ -0,0 +1,3 @@
+from app.workers.runner import main
+
+main()
@@ -0,0 +1,392 @@
+import io
+import os
+from typing import BinaryIO
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from app.core.peaks import PeakPyramidBuilder
+from app.core.profiling import Spans, profiling
+from app.core.wav import read_wav_layout
+
+FRAME_S = 0.05  # длина кадра анализа — 50мс
+VOICE_THRESHOLD = 500  # порог RMS, выше которого кадр считается речью
+BLOCK_FRAMES = 1200  # кадров анализа в одном блоке чтения (~60с)
+
+
+def frame_signal(audio: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Нарезает сигнал на кадры по window_size отсчётов без копирования
+    (strided view). Неполный хвостовой кадр в результат не попадает.
+    """
+    n_frames = len(audio) // window_size
+    step = audio.strides[0]
+    return as_strided(
+        audio,
+        shape=(n_frames, window_size),
+        strides=(step * window_size, step),
+        writeable=False,
+    )
+
+
+def _features(frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """RMS и ZCR для матрицы кадров (n_frames, window_size) во float32."""
+    samples = frames.astype(np.float32)
+    rms = np.sqrt(
+        np.einsum("ij,ij->i", samples, samples) / np.float32(frames.shape[1])
+    )
+    if frames.shape[1] < 2:
+        return rms, np.zeros(len(frames), dtype=np.float32)
+
+    # знак вместо произведения отсчётов: int16 * int16 переполняется
+    signs = np.sign(frames)
+    crossings = np.count_nonzero(signs[:, :-1] * signs[:, 1:] < 0, axis=1)
+    zcr = (crossings / (frames.shape[1] - 1)).astype(np.float32)
+    return rms, zcr
+
+
+class FrameAnalyzer:
+    """
+    Потоковый покадровый анализ: сигнал подаётся блоками через feed(),
+    неполный кадр и открытый сегмент речи переносятся между блоками,
+    поэтому память не зависит от длины записи.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        window_size: int,
+        threshold: float = VOICE_THRESHOLD,
+        hangover: int = 0,
+        keep_features: bool = False,
+    ):
+        self.sample_rate = sample_rate
+        self.window_size = window_size
+        self.threshold = threshold
+        # сколько кадров тишины после речи ещё считаются сегментом
+        self.hangover = hangover
+        self.segments: list[dict] = []
+        # блоки признаков (n, 2): rms, zcr — для сохранения в .npy
+        self.features: list[np.ndarray] | None = [] if keep_features else None
+
+        self._pending = np.empty(0, dtype=np.int16)  # хвост неполного кадра
+        self._n_samples = 0
+        self._n_frames = 0
+        self._rms_total = 0.0
+        self._zcr_total = 0.0
+        # открытый сегмент: (первый кадр, сумма rms, сумма zcr, кадров)
+        self._open: tuple[int, float, float, int] | None = None
+        self._last_voiced = -hangover - 1  # последний кадр выше порога
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Обрабатывает очередной блок отсчётов."""
+        self._n_samples += len(samples)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        n_full = len(samples) // self.window_size * self.window_size
+        self._pending = samples[n_full:].copy()
+        if n_full:
+            frames = frame_signal(samples[:n_full], self.window_size)
+            self._consume(*_features(frames))
+
+    def feed_features(
+        self, rms: np.ndarray, zcr: np.ndarray, n_samples: int
+    ) -> None:
+        """Подаёт готовые признаки кадров (пересегментация без декодирования)."""
+        self._n_samples += n_samples
+        self._consume(rms, zcr)
+
+    def finish(self) -> tuple[dict, list[dict]]:
+        """
+        Досчитывает неполный последний кадр и закрывает открытый сегмент.
+        Возвращает (средние rms/zcr, список сегментов).
+        """
+        if len(self._pending):
+            self._consume(*_features(self._pending[np.newaxis, :]))
+            self._pending = self._pending[:0]
+        if self._open is not None:
+            start, rms_sum, zcr_sum, count = self._open
+            self._emit(
+                np.array([start]),
+                np.array([self._n_frames]),
+                np.array([rms_sum]),
+                np.array([zcr_sum]),
+                np.array([count]),
+            )
+            self._open = None
+
+        averages = dict(
+            rms_avg=(
+                self._rms_total / self._n_frames if self._n_frames else None
+            ),
+            zcr_avg=(
+                self._zcr_total / self._n_frames if self._n_frames else None
+            ),
+        )
+        return averages, self.segments
+
+    def _consume(self, rms: np.ndarray, zcr: np.ndarray) -> None:
+        """Ищет переходы речь/тишина в блоке кадров с учётом состояния."""
+        offset = self._n_frames
+        self._n_frames += len(rms)
+        self._rms_total += float(np.sum(rms, dtype=np.float64))
+        self._zcr_total += float(np.sum(zcr, dtype=np.float64))
+        if self.features is not None:
+            self.features.append(np.stack((rms, zcr), axis=1))
+
+        carried = self._open
+        voiced = rms > self.threshold
+        if self.hangover:
+            # расстояние до последнего кадра речи, в том числе из прошлых блоков
+            idx = np.arange(offset, self._n_frames)
+            last = np.maximum.accumulate(
+                np.where(voiced, idx, self._last_voiced)
+            )
+            self._last_voiced = int(last[-1])
+            voiced = idx - last <= self.hangover
+        voiced = voiced.astype(np.int8)
+        edges = np.diff(voiced, prepend=np.int8(carried is not None))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if carried is not None:
+            # сегмент, начатый в прошлом блоке, продолжается с кадра 0
+            starts = np.concatenate(([0], starts))
+
+        rms_cs = np.concatenate(([0.0], np.cumsum(rms, dtype=np.float64)))
+        zcr_cs = np.concatenate(([0.0], np.cumsum(zcr, dtype=np.float64)))
+
+        closed = starts[: len(ends)]
+        seg_start = closed + offset
+        seg_rms = rms_cs[ends] - rms_cs[closed]
+        seg_zcr = zcr_cs[ends] - zcr_cs[closed]
+        seg_count = ends - closed
+        if carried is not None and len(ends):
+            seg_start[0] = carried[0]
+            seg_rms[0] += carried[1]
+            seg_zcr[0] += carried[2]
+            seg_count[0] += carried[3]
+        if len(ends):
+            self._emit(seg_start, ends + offset, seg_rms, seg_zcr, seg_count)
+
+        if len(starts) == len(ends):
+            self._open = None
+            return
+        start = int(starts[-1])
+        tail = (
+            float(rms_cs[-1] - rms_cs[start]),
+            float(zcr_cs[-1] - zcr_cs[start]),
+            len(rms) - start,
+        )
+        if carried is not None and not len(ends):
+            self._open = (
+                carried[0],
+                carried[1] + tail[0],
+                carried[2] + tail[1],
+                carried[3] + tail[2],
+            )
+        else:
+            self._open = (start + offset, *tail)
+
+    def _emit(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        rms_sum: np.ndarray,
+        zcr_sum: np.ndarray,
+        count: np.ndarray,
+    ) -> None:
+        """Переводит границы сегментов из кадров в миллисекунды."""
+        # целочисленно: float-деление даёт 64599 вместо 64600
+        start_samples = starts.astype(np.int64) * self.window_size
+        end_samples = np.minimum(
+            ends.astype(np.int64) * self.window_size, self._n_samples
+        )
+        start_ms = start_samples * 1000 // self.sample_rate
+        end_ms = end_samples * 1000 // self.sample_rate
+        self.segments.extend(
+            dict(start_ms=s, end_ms=e, rms=r, zcr=z)
+            for s, e, r, z in zip(
+                start_ms.tolist(),
+                end_ms.tolist(),
+                (rms_sum / count).tolist(),
+                (zcr_sum / count).tolist(),
+            )
+        )
+
+
+def _analyze_wave(
+    f: BinaryIO,
+    peaks_path: str | None = None,
+    features_path: str | None = None,
+    spans: Spans | None = None,
+) -> tuple[dict, list[dict]]:
+    """
+    Читает WAV блоками по BLOCK_FRAMES кадров анализа и сводит каналы
+    в моно (шкала int16). Если задан peaks_path, в том же проходе
+    строится пирамида пиков, если features_path — сохраняются
+    признаки кадров. В spans копятся этапы read/decode/analyze/sidecars.
+    """
+    spans = spans or Spans()
+    with spans.span("read"):
+        layout = read_wav_layout(f)
+    sample_rate = layout.sample_rate
+    window_size = int(sample_rate * FRAME_S)
+    analyzer = FrameAnalyzer(
+        sample_rate, window_size, keep_features=features_path is not None
+    )
+    peaks = PeakPyramidBuilder(sample_rate) if peaks_path else None
+
+    blocks = layout.iter_blocks(f, window_size * BLOCK_FRAMES)
+    while True:
+        with spans.span("read"):
+            raw = next(blocks, None)
+        if raw is None:
+            break
+        with spans.span("decode"):
+            samples = layout.downmix(raw)
+        with spans.span("analyze"):
+            analyzer.feed(samples)
+            if peaks:
+                peaks.feed(samples)
+
+    with spans.span("analyze"):
+        averages, segments = analyzer.finish()
+    with spans.span("sidecars"):
+        if peaks:
+            peaks.write(peaks_path)
+        if features_path:
+            _save_features(features_path, analyzer.features)
+    meta = dict(
+        duration_s=layout.n_frames / sample_rate,
+        channels=layout.channels,
+        sample_rate=sample_rate,
+        format=f"wav/{layout.codec}",
+        **averages,
+    )
+    return meta, segments
+
+
+def _save_features(path: str, blocks: list[np.ndarray]) -> None:
+    """Пишет признаки кадров (n_frames, 2) float32 в .npy атомарно."""
+    features = (
+        np.concatenate(blocks) if blocks else np.empty((0, 2), np.float32)
+    )
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, features.astype(np.float32, copy=False))
+    os.replace(tmp, path)
+
+
+def analyze_audio_bytes(raw_bytes: bytes) -> tuple[dict, list[dict]]:
+    """
+    Анализ WAV, уже загруженного в память.
+    Возвращает (метаданные, список сегментов)
+    """
+    return _analyze_wave(io.BytesIO(raw_bytes))
+
+
+def analyze_audio_file(
+    file_path: str,
+    peaks_path: str | None = None,
+    features_path: str | None = None,
+    spans: Spans | None = None,
+) -> tuple[dict, list[dict]]:
+    """
+    Потоковый анализ WAV с диска: файл читается блоками фиксированного
+    размера, пиковая память не зависит от длины записи.
+    Результат совпадает с analyze_audio_bytes. Пирамида пиков для
+    отрисовки волны пишется в peaks_path, признаки кадров —
+    в features_path, если они заданы.
+    """
+    with open(file_path, "rb") as f:
+        return _analyze_wave(f, peaks_path, features_path, spans)
+
+
+def analyze_job_file(
+    file_path: str,
+    peaks_path: str | None = None,
+    features_path: str | None = None,
+    profile: str | None = None,
+    profile_path: str | None = None,
+) -> tuple[dict, list[dict], dict[str, float]]:
+    """
+    Точка входа задачи analyze в дочернем процессе: анализ файла
+    с замером этапов. При profile дополнительно снимается профиль
+    (cprofile/tracemalloc) в profile_path.
+    """
+    spans = Spans()
+    with profiling(profile, profile_path):
+        meta, segments = analyze_audio_file(
+            file_path, peaks_path, features_path, spans
+        )
+    return meta, segments, spans.as_dict()
+
+
+def analyze_audio_batch(
+    items: list[tuple[str, str | None, str | None]],
+) -> list[tuple[dict, list[dict], dict[str, float]] | str]:
+    """
+    Анализ пачки мелких файлов за один вызов пула процессов.
+    items — аргументы analyze_job_file; ошибка файла возвращается
+    строкой на его месте и не прерывает остальные.
+    """
+    results = []
+    for args in items:
+        try:
+            results.append(analyze_job_file(*args))
+        except Exception as e:
+            results.append(str(e))
+    return results
+
+
+def resegment_features(
+    features_path: str,
+    sample_rate: int,
+    duration_s: float,
+    threshold: float = VOICE_THRESHOLD,
+    window_ms: int = int(FRAME_S * 1000),
+    hangover_ms: int = 0,
+) -> list[dict]:
+    """
+    Пересчитывает сегменты по сохранённым признакам кадров
+    (memmap .npy) с новыми порогом, окном и hangover, не читая аудио.
+    Окно кратно длине кадра: RMS окна — корень из среднего квадрата
+    RMS кадров, ZCR — среднее.
+    """
+    frame_ms = int(FRAME_S * 1000)
+    if window_ms <= 0 or window_ms % frame_ms:
+        raise ValueError(f"window_ms must be a multiple of {frame_ms}")
+    k = window_ms // frame_ms
+    features = np.load(features_path, mmap_mode="r")
+    frame_size = int(sample_rate * FRAME_S)
+    analyzer = FrameAnalyzer(
+        sample_rate,
+        frame_size * k,
+        threshold,
+        hangover=-(-hangover_ms // window_ms),
+    )
+    remaining = round(duration_s * sample_rate)
+
+    # блоками, чтобы не держать в памяти копию всего массива
+    step = BLOCK_FRAMES * k
+    for start in range(0, len(features), step):
+        block = np.asarray(features[start : start + step], dtype=np.float32)
+        block_samples = min(len(block) * frame_size, remaining)
+        remaining -= block_samples
+        if k == 1:
+            analyzer.feed_features(block[:, 0], block[:, 1], block_samples)
+            continue
+        n = -(-len(block) // k)
+        pad = n * k - len(block)
+        rms_sq = np.pad(block[:, 0] ** 2, (0, pad))
+        zcr = np.pad(block[:, 1], (0, pad))
+        # в неполном последнем окне среднее только по реальным кадрам
+        counts = np.full(n, k, dtype=np.float32)
+        counts[-1] -= pad
+        analyzer.feed_features(
+            np.sqrt(rms_sq.reshape(n, k).sum(axis=1) / counts),
+            zcr.reshape(n, k).sum(axis=1) / counts,
+            block_samples,
+        )
+    _, segments = analyzer.finish()
+    return segments
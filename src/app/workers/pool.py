@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def _ignore_sigint() -> None:
+    """
+    Ctrl+C приходит всей группе процессов. Дочерние процессы его
+    игнорируют: остановкой управляет родитель, который дожидается
+    задач в работе.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _timed_call(func: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    """Выполняется в дочернем процессе: результат и затраченное CPU."""
+    start = time.process_time()
+    result = func(*args)
+    return result, time.process_time() - start
+
+
+class AnalysisPool:
+    """
+    Пул процессов для CPU-тяжёлого анализа аудио.
+    Запускается и останавливается вместе с приложением (lifespan),
+    чтобы анализ не занимал GIL и event loop API.
+    """
+
+    def __init__(
+        self, max_workers: int | None = None, start_method: str = "spawn"
+    ):
+        self.max_workers = max_workers
+        self.start_method = start_method
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_ignore_sigint,
+        )
+        logger.info(
+            "Analysis pool started (max_workers=%s, start_method=%s)",
+            self._executor._max_workers,
+            self.start_method,
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        logger.info("Analysis pool stopped")
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет func(*args) в дочернем процессе.
+        Аргументы и результат передаются через pickle, поэтому передавать
+        стоит пути к файлам, а не содержимое.
+        """
+        if self._executor is None:
+            raise RuntimeError("Analysis pool is not started")
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # дочерний процесс упал — пересоздаём пул для следующих задач
+            if self._executor is executor:
+                logger.error("Analysis pool is broken, restarting")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.start()
+            raise
+
+    async def run_timed(
+        self, func: Callable[..., Any], *args: Any
+    ) -> tuple[Any, float]:
+        """Как run(), но также возвращает CPU-время дочернего процесса."""
+        return await self.run(_timed_call, func, *args)
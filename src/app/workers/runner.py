@@ -0,0 +1,199 @@
+"""
+Отдельный воркер очереди задач:
+
+    python -m app.workers [--processes N] [--concurrency M]
+
+Запускает N процессов, в каждом свой Worker.worker_loop и пул анализа.
+Без WORKER_ANALYSIS_PROCESSES CPU машины делятся между пулами поровну.
+Воркеры могут работать на любом числе машин и контейнеров с общей
+БД и каталогом загрузок: задачи разбираются через SKIP LOCKED.
+SIGTERM (или Ctrl+C) останавливает приём новых задач и дожидается
+задач в работе; повторный сигнал прерывает их, аренду таких задач
+потом вернёт в очередь другой воркер.
+
+Каждый процесс отдаёт свои метрики Prometheus на отдельном порту:
+WORKER_METRICS_PORT + номер процесса.
+
+Код процессов живёт здесь, а не в __main__.py: spawn не умеет
+импортировать __main__ пакета в дочернем процессе.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from prometheus_client import start_http_server
+
+from app.core.common import configure_logging
+from app.core.config import settings, worker_settings
+from app.workers.pool import AnalysisPool
+from app.workers.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+# период проверки дочерних процессов супервизором, секунды
+SUPERVISE_INTERVAL = 1.0
+# задержка перезапуска упавшего процесса: удваивается при каждом
+# падении подряд до RESTART_BACKOFF_MAX и сбрасывается, если процесс
+# проработал дольше RESTART_BACKOFF_RESET
+RESTART_BACKOFF_BASE = 1.0
+RESTART_BACKOFF_MAX = 60.0
+RESTART_BACKOFF_RESET = 60.0
+
+
+def start_metrics_server(index: int) -> None:
+    """/metrics процесса воркера на WORKER_METRICS_PORT + index."""
+    if not settings.WORKER_METRICS_PORT:
+        return
+    port = settings.WORKER_METRICS_PORT + index
+    start_http_server(port)
+    logger.info("Metrics on port %s", port)
+
+
+def analysis_pool_size(processes: int) -> int:
+    """
+    Процессов анализа в пуле одного процесса воркера: заданное
+    WORKER_ANALYSIS_PROCESSES или доля CPU машины, чтобы processes
+    пулов вместе не запускали processes * cpu_count процессов.
+    """
+    if worker_settings.ANALYSIS_PROCESSES:
+        return worker_settings.ANALYSIS_PROCESSES
+    return max((os.cpu_count() or 1) // processes, 1)
+
+
+async def serve(concurrency: int, index: int = 0, processes: int = 1) -> None:
+    """Один процесс воркера: пул анализа и цикл задач до сигнала."""
+    start_metrics_server(index)
+    stop_event = asyncio.Event()
+    main_task = asyncio.current_task()
+
+    def on_signal(signum: int) -> None:
+        if stop_event.is_set():
+            logger.warning("Second signal, cancelling running jobs")
+            main_task.cancel()
+            return
+        logger.info(
+            "%s received, draining running jobs", signal.Signals(signum).name
+        )
+        stop_event.set()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, on_signal, signum)
+
+    pool = AnalysisPool(
+        max_workers=analysis_pool_size(processes),
+        start_method=worker_settings.ANALYSIS_START_METHOD,
+    )
+    pool.start()
+    try:
+        await Worker(stop_event, pool, concurrency).worker_loop()
+    except asyncio.CancelledError:
+        logger.warning("Worker cancelled")
+    finally:
+        pool.shutdown()
+
+
+def run_process(concurrency: int, index: int, processes: int) -> None:
+    """Точка входа дочернего процесса."""
+    configure_logging()
+    asyncio.run(serve(concurrency, index, processes))
+
+
+def supervise(processes: int, concurrency: int) -> None:
+    """
+    Запускает процессы воркера и перезапускает упавшие с нарастающей
+    задержкой, чтобы процесс, падающий при старте (нет БД, ошибка
+    конфигурации), не перезапускался каждую секунду.
+    Сигналы остановки пересылаются дочерним процессам.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    stopping = False
+    # по номеру процесса: время запуска, падений подряд, когда перезапуск
+    started_at = [0.0] * processes
+    crashes = [0] * processes
+    restart_at: list[float | None] = [None] * processes
+
+    def start(i: int) -> multiprocessing.Process:
+        proc = ctx.Process(
+            target=run_process,
+            args=(concurrency, i, processes),
+            name=f"worker-{i}",
+        )
+        proc.start()
+        started_at[i] = time.monotonic()
+        logger.info("Started %s (pid %s)", proc.name, proc.pid)
+        return proc
+
+    def on_signal(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for proc in procs:
+            if proc.is_alive():
+                # Ctrl+C дочерние процессы получают сами
+                if signum != signal.SIGINT:
+                    proc.terminate()
+
+    procs = [start(i) for i in range(processes)]
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    while not stopping:
+        time.sleep(SUPERVISE_INTERVAL)
+        now = time.monotonic()
+        for i, proc in enumerate(procs):
+            if stopping or proc.is_alive():
+                continue
+            if restart_at[i] is None:
+                if now - started_at[i] > RESTART_BACKOFF_RESET:
+                    crashes[i] = 0
+                delay = min(
+                    RESTART_BACKOFF_BASE * 2 ** crashes[i],
+                    RESTART_BACKOFF_MAX,
+                )
+                crashes[i] += 1
+                restart_at[i] = now + delay
+                logger.error(
+                    "%s exited with code %s, restarting in %.0fs",
+                    proc.name,
+                    proc.exitcode,
+                    delay,
+                )
+            if now >= restart_at[i]:
+                restart_at[i] = None
+                procs[i] = start(i)
+
+    for proc in procs:
+        proc.join()
+    logger.info("All worker processes stopped")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.workers", description="Job queue worker"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.WORKER_PROCESSES,
+        help="worker processes (default: WORKER_PROCESSES)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=worker_settings.MAX_CONCURRENT_JOBS,
+        help="jobs per process",
+    )
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.processes == 1:
+        # один процесс — без супервизора: SIGTERM от контейнера
+        # приходит прямо в цикл воркера
+        asyncio.run(serve(args.concurrency))
+    else:
+        supervise(args.processes, args.concurrency)
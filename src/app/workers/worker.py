@@ -1,15 +1,34 @@
 import asyncio
-import io
 import logging
-import wave
+import os
+import random
+import socket
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta
+from functools import partial
 
-import aiofiles
-import numpy as np
-from sqlalchemy import select
+from sqlalchemy import and_, delete, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import worker_settings
-from app.db.database import connection
+from app.core.metrics import (
+    JOB_FAILURES,
+    JOB_LEASES_EXPIRED,
+    JOB_PICKUP_DELAY,
+    JOB_RETRIES,
+    JOB_STAGE_SECONDS,
+    JOBS_COMPLETED,
+    observe_analysis,
+)
+from app.core.profiling import Spans
+from app.core.storage import (
+    upload_features_path,
+    upload_file_path,
+    upload_peaks_path,
+    upload_profile_path,
+)
+from app.db.database import connection, unit_of_work
 from app.db.models import (
     AudioFile,
     Job,
@@ -18,56 +37,497 @@ from app.db.models import (
     StatusUploadEnum,
     Upload,
 )
+from app.db.notifications import PgListener, notify
+from app.services.dedup import (
+    clone_analysis,
+    find_analyzed_duplicate,
+    find_analyzed_duplicates,
+    share_upload_storage,
+)
+from app.workers.analysis import (
+    analyze_audio_batch,
+    analyze_job_file,
+    resegment_features,
+)
+from app.workers.pool import AnalysisPool
 
 logger = logging.getLogger(__name__)
 
 
 MAX_ATTEMPTS = worker_settings.MAX_ATTEMPTS
 RETRY_BASE_DELAY = worker_settings.RETRY_BASE_DELAY
+MAX_CONCURRENT_JOBS = worker_settings.MAX_CONCURRENT_JOBS
+JOBS_CHANNEL = worker_settings.JOBS_CHANNEL
+RESULTS_CHANNEL = worker_settings.RESULTS_CHANNEL
+FALLBACK_POLL_INTERVAL = worker_settings.FALLBACK_POLL_INTERVAL
+LEASE_TIMEOUT = worker_settings.LEASE_TIMEOUT
+HEARTBEAT_INTERVAL = worker_settings.HEARTBEAT_INTERVAL
+SEGMENTS_COPY_THRESHOLD = worker_settings.SEGMENTS_COPY_THRESHOLD
+BATCH_MAX_BYTES = worker_settings.BATCH_MAX_BYTES
+BATCH_MAX_JOBS = worker_settings.BATCH_MAX_JOBS
+PROFILE_MODE = worker_settings.PROFILE_MODE
+PROFILE_SAMPLE_RATE = worker_settings.PROFILE_SAMPLE_RATE
+PRIORITY_AGING_INTERVAL = worker_settings.PRIORITY_AGING_INTERVAL
+LARGE_JOB_BYTES = worker_settings.LARGE_JOB_BYTES
+SMALL_JOB_SLOTS = worker_settings.SMALL_JOB_SLOTS
+
+# типы задач, которые выполняет воркер
+JOB_TYPES = ("analyze", "resegment")
+
+# пауза после ошибки выборки из очереди (недоступна БД, таймаут пула):
+# удваивается при ошибках подряд до FALLBACK_POLL_INTERVAL
+CLAIM_ERROR_BACKOFF = 1.0
+
+
+class LeaseLostError(RuntimeError):
+    """Аренда задачи истекла, и её забрал другой воркер."""
 
 
 class Worker:
-    def __init__(self, stop_event: asyncio.Event):
+    def __init__(
+        self,
+        stop_event: asyncio.Event,
+        pool: AnalysisPool,
+        concurrency: int = MAX_CONCURRENT_JOBS,
+    ):
         self.stop_event = stop_event
+        self.pool = pool
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        # полоса крупных файлов: остальные слоты остаются мелким задачам.
+        # Не меньше слота, иначе крупные файлы не выполнялись бы вовсе;
+        # при concurrency <= SMALL_JOB_SLOTS резерва мелким нет
+        self.large_slots = max(concurrency - SMALL_JOB_SLOTS, 1)
+        if concurrency <= SMALL_JOB_SLOTS:
+            logger.warning(
+                "concurrency=%s <= SMALL_JOB_SLOTS=%s: no slots reserved "
+                "for small jobs",
+                concurrency,
+                SMALL_JOB_SLOTS,
+            )
+        self._large_jobs: set[uuid.UUID] = set()
+        # выставляется, когда крупная задача освобождает слот полосы:
+        # ждущие крупные задачи снова можно забирать
+        self._large_slot_freed = asyncio.Event()
+        self.listener = PgListener(JOBS_CHANNEL)
+        self.worker_id = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
 
     async def worker_loop(self) -> None:
         """
         Главный цикл фонового воркера.
-        Запускается при старте FastAPI (через on_startup).
+        Запускается в lifespan FastAPI или отдельным процессом
+        (python -m app.workers).
+        Забирает задачи пачками по числу свободных слотов и выполняет их
+        конкурентно (мелкие analyze — группой в одном слоте);
+        при остановке дожидается задач в работе. Ошибка выборки
+        не останавливает цикл: слоты возвращаются, повтор — после паузы.
         """
-        logger.info("Worker started")
-        while not self.stop_event.is_set():
-            job = await self._fetch_next_job()
-            if not job:
-                await asyncio.sleep(2)
-                continue
-            try:
-                await self._process_job(job)
-            except Exception as e:
-                logger.exception("Job %s failed: %s", job.id, e)
-                await self._handle_failure(job, str(e))
-            await asyncio.sleep(0)
+        logger.info("Worker started (concurrency=%s)", self.concurrency)
+        await self.listener.start()
+        maintenance = asyncio.create_task(self._maintenance_loop())
+        errors = 0
+        try:
+            while not self.stop_event.is_set():
+                free = await self._acquire_slots()
+                if self.stop_event.is_set():
+                    # остановка пришла, пока все слоты были заняты:
+                    # новые задачи не берём
+                    for _ in range(free):
+                        self._slots.release()
+                    break
+                try:
+                    await self._dispatch(free)
+                    errors = 0
+                except Exception:
+                    delay = min(
+                        CLAIM_ERROR_BACKOFF * 2**errors, FALLBACK_POLL_INTERVAL
+                    )
+                    errors += 1
+                    logger.exception(
+                        "Failed to claim jobs, retry in %ss", delay
+                    )
+                    with suppress(TimeoutError):
+                        await asyncio.wait_for(self.stop_event.wait(), delay)
+
+            if self._tasks:
+                logger.info("Waiting for %s running jobs", len(self._tasks))
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            maintenance.cancel()
+            await self.listener.stop()
         logger.info("Worker stopped")
 
+    async def _dispatch(self, free: int) -> None:
+        """
+        Забирает задачи на free занятых слотов и запускает их; слоты,
+        на которые задач не нашлось (или выборка упала), возвращает.
+        Если запускать нечего, ждёт новых задач.
+        """
+        # уведомления, пришедшие во время выборки, разбудят следующий wait
+        self.listener.clear()
+        self._large_slot_freed.clear()
+        groups = []
+        try:
+            groups = await self._fetch_next_jobs(free)
+            for group in groups:
+                self._start_job(group)
+        finally:
+            for _ in range(free - len(groups)):
+                self._slots.release()
+        if groups:
+            return
+        # при занятой полосе крупные задачи не забираются,
+        # и их срок не должен будить цикл
+        max_bytes = (
+            LARGE_JOB_BYTES
+            if len(self._large_jobs) >= self.large_slots
+            else None
+        )
+        next_due = await self._seconds_until_next_job(max_bytes)
+        await self._wait_for_jobs(min(next_due, FALLBACK_POLL_INTERVAL))
+
+    async def _wait_for_jobs(self, timeout: float) -> None:
+        """
+        Ждёт NOTIFY о новой задаче, освобождение слота крупных задач,
+        остановку воркера или таймаут страховочного опроса — что
+        наступит раньше.
+        """
+        waiters = {
+            asyncio.create_task(self.listener.wait(timeout)),
+            asyncio.create_task(self._large_slot_freed.wait()),
+            asyncio.create_task(self.stop_event.wait()),
+        }
+        _, pending = await asyncio.wait(
+            waiters, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+
+    async def _maintenance_loop(self) -> None:
+        """
+        Периодически продлевает аренду задач этого воркера, возвращает
+        в очередь задачи с истёкшей арендой (упавшие воркеры) и поднимает
+        приоритет долго ждущих задач.
+        """
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                if self._tasks:
+                    await self._extend_leases()
+                await self._reap_expired_leases()
+                await self._age_queued_jobs()
+            except Exception:
+                logger.exception("Lease maintenance failed")
+
+    async def _acquire_slots(self) -> int:
+        """Ждёт хотя бы один свободный слот и занимает все свободные."""
+        await self._slots.acquire()
+        acquired = 1
+        while not self._slots.locked():
+            await self._slots.acquire()
+            acquired += 1
+        return acquired
+
+    def _start_job(self, group: list[Job]) -> None:
+        if len(group) == 1:
+            task = asyncio.create_task(self._run_job(group[0]))
+        else:
+            task = asyncio.create_task(self._run_batch(group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_job(self, job: Job) -> None:
+        """
+        Выполняет задачу в своём слоте и освобождает его по завершении.
+        Обработка и запись ошибки идут в одной сессии (unit of work):
+        перед записью ошибки транзакция обработки откатывается.
+        """
+        try:
+            async with unit_of_work() as session:
+                try:
+                    await self._process_job(job)
+                except LeaseLostError:
+                    await session.rollback()
+                    logger.warning(
+                        "Lease of job %s lost, result dropped", job.id
+                    )
+                except Exception as e:
+                    await session.rollback()
+                    logger.exception("Job %s failed: %s", job.id, e)
+                    await self._handle_failure(job, str(e))
+        except Exception:
+            logger.exception("Failed to record failure of job %s", job.id)
+        finally:
+            if job.id in self._large_jobs:
+                self._large_jobs.discard(job.id)
+                self._large_slot_freed.set()
+            self._slots.release()
+
+    async def _run_batch(self, jobs: list[Job]) -> None:
+        """
+        Выполняет пачку мелких задач в одном слоте и одной сессии.
+        При ошибке пачки неудача записывается только задачам, которые
+        ещё не завершены (дубликаты фиксируются до вызова пула).
+        """
+        finished: set[uuid.UUID] = set()
+        try:
+            async with unit_of_work() as session:
+                try:
+                    await self._process_batch(jobs, finished)
+                except Exception as e:
+                    await session.rollback()
+                    logger.exception(
+                        "Batch of %s jobs failed: %s", len(jobs), e
+                    )
+                    for job in jobs:
+                        if job.id in finished:
+                            continue
+                        try:
+                            await self._handle_failure(job, str(e))
+                        except Exception:
+                            logger.exception(
+                                "Failed to record failure of job %s", job.id
+                            )
+        finally:
+            self._slots.release()
+
     @connection
-    async def _fetch_next_job(self, session: AsyncSession) -> Job | None:
-        """Берём одну задачу analyze со статусом queued (с блокировкой)."""
+    async def _fetch_next_jobs(
+        self, limit: int, session: AsyncSession
+    ) -> list[list[Job]]:
+        """
+        Забирает до limit задач со статусом queued и раскладывает их
+        по слотам. Крупные файлы берутся, только пока свободна их полоса
+        (large_slots), остальные слоты — задачам до LARGE_JOB_BYTES.
+        Мелкие задачи analyze собираются в одну группу, которая
+        добирается такими же задачами до BATCH_MAX_JOBS.
+        """
+        large_free = self.large_slots - len(self._large_jobs)
+        claimed = []
+        if large_free > 0:
+            claimed = await self._claim_jobs(session, min(limit, large_free))
+        if len(claimed) < limit:
+            claimed += await self._claim_jobs(
+                session, limit - len(claimed), max_bytes=LARGE_JOB_BYTES
+            )
+        groups, small, large = [], [], []
+        for job, size_bytes in claimed:
+            if job.type == "analyze" and size_bytes <= BATCH_MAX_BYTES:
+                small.append(job)
+            else:
+                groups.append([job])
+                if job.type == "analyze" and size_bytes > LARGE_JOB_BYTES:
+                    large.append(job.id)
+        if small and len(small) < BATCH_MAX_JOBS:
+            claimed = await self._claim_jobs(
+                session, BATCH_MAX_JOBS - len(small), small_only=True
+            )
+            small.extend(job for job, _ in claimed)
+        if small:
+            groups.append(small)
+        await session.commit()
+        self._large_jobs.update(large)
+        for group in groups:
+            for job in group:
+                logger.info("Picked job %s", job.id)
+        return groups
+
+    async def _claim_jobs(
+        self,
+        session: AsyncSession,
+        limit: int,
+        small_only: bool = False,
+        max_bytes: int | None = None,
+    ) -> list[tuple[Job, int]]:
+        """
+        Один UPDATE ... FROM uploads ... RETURNING: строки задач
+        блокируются через SKIP LOCKED в порядке приоритета (индекс
+        ix_jobs_queued_priority), вместе с задачей возвращается размер
+        файла загрузки. max_bytes ограничивает размер файлов analyze.
+        """
+        claimable = (
+            select(Job.id)
+            .where(
+                Job.type.in_(JOB_TYPES),
+                Job.status == JobStatusEnum.queued,
+                Job.run_after <= datetime.utcnow(),
+            )
+            .order_by(Job.priority, Job.run_after)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=Job)
+        )
+        if small_only:
+            claimable = claimable.join(
+                Upload, Upload.id == Job.upload_id
+            ).where(
+                Job.type == "analyze", Upload.size_bytes <= BATCH_MAX_BYTES
+            )
+        elif max_bytes is not None:
+            claimable = claimable.join(
+                Upload, Upload.id == Job.upload_id
+            ).where(or_(Job.type != "analyze", Upload.size_bytes <= max_bytes))
         q = (
-            select(Job)
-            .where(Job.type == "analyze", Job.status == JobStatusEnum.queued)
-            .with_for_update(skip_locked=True)
-            .limit(1)
+            update(Job)
+            .where(
+                Job.id.in_(claimable.scalar_subquery()),
+                Upload.id == Job.upload_id,
+            )
+            .values(
+                status=JobStatusEnum.in_progress,
+                attempts=Job.attempts + 1,
+                locked_by=self.worker_id,
+                locked_until=datetime.utcnow()
+                + timedelta(seconds=LEASE_TIMEOUT),
+            )
+            .returning(Job, Upload.size_bytes)
         )
         res = await session.execute(q)
-        job = res.scalar_one_or_none()
-        if not job:
-            return None
+        claimed = [(job, size_bytes) for job, size_bytes in res.all()]
+        now = datetime.utcnow()
+        for job, _ in claimed:
+            JOB_PICKUP_DELAY.labels(type=job.type).observe(
+                (now - job.run_after).total_seconds()
+            )
+        return claimed
 
-        job.status = JobStatusEnum.in_progress
-        job.attempts += 1
+    @connection
+    async def _extend_leases(self, session: AsyncSession) -> None:
+        """Продлевает аренду всех задач воркера одним запросом."""
+        await session.execute(
+            update(Job)
+            .where(
+                Job.locked_by == self.worker_id,
+                Job.status == JobStatusEnum.in_progress,
+            )
+            .values(
+                locked_until=datetime.utcnow()
+                + timedelta(seconds=LEASE_TIMEOUT)
+            )
+        )
         await session.commit()
-        logger.info("Picked job %s", job.id)
-        return job
+
+    @connection
+    async def _reap_expired_leases(self, session: AsyncSession) -> None:
+        """
+        Задачи с истёкшей арендой возвращаются в очередь пачкой,
+        исчерпавшие попытки помечаются failed.
+        """
+        now = datetime.utcnow()
+        expired = and_(
+            Job.status == JobStatusEnum.in_progress, Job.locked_until < now
+        )
+        released = dict(
+            locked_by=None, locked_until=None, last_error="Lease expired"
+        )
+
+        res = await session.execute(
+            update(Job)
+            .where(expired, Job.attempts >= MAX_ATTEMPTS)
+            .values(status=JobStatusEnum.failed, **released)
+            .returning(Job.upload_id, Job.type)
+        )
+        failed = res.all()
+        # неудачная пересегментация не портит уже готовый анализ
+        failed_uploads = [
+            upload_id for upload_id, type_ in failed if type_ == "analyze"
+        ]
+        if failed_uploads:
+            await session.execute(
+                update(Upload)
+                .where(Upload.id.in_(failed_uploads))
+                .values(status=StatusUploadEnum.failed)
+            )
+
+        res = await session.execute(
+            update(Job)
+            .where(expired)
+            .values(status=JobStatusEnum.queued, run_after=now, **released)
+            .returning(Job.id)
+        )
+        requeued = res.scalars().all()
+        await session.commit()
+
+        if failed or requeued:
+            JOB_LEASES_EXPIRED.inc(len(failed) + len(requeued))
+            for _, type_ in failed:
+                JOB_FAILURES.labels(type=type_).inc()
+            logger.warning(
+                "Expired leases: %s jobs requeued, %s failed",
+                len(requeued),
+                len(failed),
+            )
+
+    @connection
+    async def _age_queued_jobs(self, session: AsyncSession) -> None:
+        """
+        Старение: задача, которая может выполняться и не менялась
+        PRIORITY_AGING_INTERVAL секунд, поднимается на ступень. UPDATE
+        обновляет updated_at, поэтому следующая ступень — не раньше чем
+        через интервал, даже если старение запускают несколько воркеров.
+        """
+        threshold = datetime.utcnow() - timedelta(
+            seconds=PRIORITY_AGING_INTERVAL
+        )
+        res = await session.execute(
+            update(Job)
+            .where(
+                Job.status == JobStatusEnum.queued,
+                Job.priority > 0,
+                Job.run_after < threshold,
+                Job.updated_at < threshold,
+            )
+            .values(priority=Job.priority - 1)
+        )
+        await session.commit()
+        if res.rowcount:
+            logger.info("Aged %s queued jobs", res.rowcount)
+
+    async def _release_job(
+        self, job: Job, session: AsyncSession, **values
+    ) -> bool:
+        """
+        Снимает аренду и обновляет задачу, только если она всё ещё
+        принадлежит этому воркеру. Строка остаётся заблокированной
+        до конца транзакции. При commit процессы API получают NOTIFY
+        и сбрасывают кэш результатов загрузки.
+        """
+        res = await session.execute(
+            update(Job)
+            .where(
+                Job.id == job.id,
+                Job.locked_by == self.worker_id,
+                Job.status == JobStatusEnum.in_progress,
+            )
+            .values(locked_by=None, locked_until=None, **values)
+        )
+        if res.rowcount != 1:
+            return False
+        await notify(session, RESULTS_CHANNEL, str(job.upload_id))
+        return True
+
+    @connection
+    async def _seconds_until_next_job(
+        self, max_bytes: int | None = None, *, session: AsyncSession
+    ) -> float:
+        """
+        Сколько секунд до ближайшей отложенной задачи
+        (inf, если в очереди ничего нет). max_bytes — тот же фильтр
+        размера файлов analyze, что и при выборке (_claim_jobs).
+        """
+        q = select(func.min(Job.run_after)).where(
+            Job.type.in_(JOB_TYPES), Job.status == JobStatusEnum.queued
+        )
+        if max_bytes is not None:
+            q = q.join(Upload, Upload.id == Job.upload_id).where(
+                or_(Job.type != "analyze", Upload.size_bytes <= max_bytes)
+            )
+        run_after = (await session.execute(q)).scalar_one_or_none()
+        if run_after is None:
+            return float("inf")
+        return max((run_after - datetime.utcnow()).total_seconds(), 0)
 
     @connection
     async def _process_job(self, job: Job, session: AsyncSession) -> None:
@@ -75,133 +535,416 @@ class Worker:
         upload = await session.get(Upload, job.upload_id)
         if not upload:
             raise RuntimeError("Upload not found")
+        if job.type == "resegment":
+            await self._resegment(job, session)
+            return
+
+        # дубликат мог завершиться, пока задача ждала в очереди
+        if upload.checksum_sha256 and await self._reuse_duplicate(
+            job, upload, session
+        ):
+            return
+        # анализ идёт долго: транзакцию на это время закрываем,
+        # и соединение возвращается в пул
+        await session.commit()
 
-        file_path = f"storage/uploads/{upload.id}/file"
+        file_path = upload_file_path(upload.id)
         logger.info("Processing file %s", file_path)
 
-        # читаем файл
-        async with aiofiles.open(file_path, "rb") as f:
-            wav_bytes = await f.read()
-
-        loop = asyncio.get_running_loop()
-        meta, segments = await loop.run_in_executor(
-            None, analyze_audio_bytes, wav_bytes
-        )
-
-        # создаём AudioFile
-        audio = AudioFile(
-            upload_id=upload.id,
-            file_path=file_path,
-            duration_s=meta["duration_s"],
-            channels=meta["channels"],
-            sample_rate=meta["sample_rate"],
-            format=meta["format"],
-            rms_avg=meta["rms_avg"],
-            zcr_avg=meta["zcr_avg"],
-        )
-        session.add(audio)
-        await session.flush()  # чтобы получить audio.id
-
-        for seg in segments:
-            session.add(
-                Segment(
-                    audio_id=audio.id,
-                    start_ms=seg["start_ms"],
-                    end_ms=seg["end_ms"],
-                    rms=seg["rms"],
-                    zcr=seg["zcr"],
-                    transcript="(placeholder)",
-                )
+        spans = Spans()
+        profile = self._profile_mode()
+        # в дочерний процесс передаётся только путь, файл читается там
+        with spans.span("pool"):
+            (meta, segments, child_spans), cpu_s = await self.pool.run_timed(
+                analyze_job_file,
+                file_path,
+                upload_peaks_path(upload.id),
+                upload_features_path(upload.id),
+                profile,
+                upload_profile_path(upload.id, profile) if profile else None,
             )
+        spans.update(child_spans)
+        observe_analysis(meta["duration_s"], cpu_s)
 
-        job.status = JobStatusEnum.done
-        upload.status = StatusUploadEnum.ready
-        await session.commit()
+        with spans.span("persist"):
+            # job получен из другой сессии, поэтому статус меняем запросом
+            if not await self._release_job(
+                job, session, status=JobStatusEnum.done
+            ):
+                raise LeaseLostError(job.id)
+            await self._save_results(
+                session, upload.id, file_path, meta, segments
+            )
+            upload.status = StatusUploadEnum.ready
+        with spans.span("commit"):
+            await session.commit()
+        JOBS_COMPLETED.labels(type=job.type).inc()
+        await self._save_timings(session, {job.id: spans})
         logger.info("Job %s finished successfully", job.id)
 
+    @connection
+    async def _process_batch(
+        self,
+        jobs: list[Job],
+        finished: set[uuid.UUID],
+        session: AsyncSession,
+    ) -> None:
+        """
+        Анализ пачки мелких файлов: один вызов пула и одна транзакция.
+        Каждая задача записывается в своей точке сохранения, поэтому
+        ошибка одной не откатывает результаты остальных.
+        Дубликаты уже проанализированного содержимого (один запрос
+        на всю пачку) копируются, в пул уходят только остальные.
+        В finished добавляются id задач, итог которых зафиксирован.
+        """
+        duplicates = await find_analyzed_duplicates(
+            session, [job.upload_id for job in jobs]
+        )
+        reused = 0
+        for job in jobs:
+            source = duplicates.get(job.upload_id)
+            if source is None:
+                continue
+            try:
+                async with session.begin_nested():
+                    await self._apply_duplicate(
+                        job, job.upload_id, source, session
+                    )
+                reused += 1
+            except LeaseLostError:
+                logger.warning("Lease of job %s lost, result dropped", job.id)
+            except Exception as e:
+                logger.exception("Job %s failed: %s", job.id, e)
+                async with session.begin_nested():
+                    await self._record_failure(job, str(e), session)
+        handled = [job.id for job in jobs if job.upload_id in duplicates]
+        jobs = [job for job in jobs if job.upload_id not in duplicates]
+        if not jobs:
+            await session.commit()
+            finished.update(handled)
+            JOBS_COMPLETED.labels(type="analyze").inc(reused)
+            logger.info("Batch of %s jobs reused analysis", reused)
+            return
+        # дубликаты записаны; анализ идёт долго, транзакцию закрываем
+        await session.commit()
+        finished.update(handled)
+
+        items = [
+            (
+                upload_file_path(job.upload_id),
+                upload_peaks_path(job.upload_id),
+                upload_features_path(job.upload_id),
+            )
+            for job in jobs
+        ]
+        logger.info("Processing batch of %s files", len(jobs))
+        batch_spans = Spans()
+        with batch_spans.span("pool"):
+            results, cpu_s = await self.pool.run_timed(
+                analyze_audio_batch, items
+            )
+        observe_analysis(
+            sum(r[0]["duration_s"] for r in results if not isinstance(r, str)),
+            cpu_s,
+        )
+
+        # общие этапы пачки (pool, commit) пишутся в каждую задачу
+        job_spans: dict[uuid.UUID, Spans] = {}
+        for job, (file_path, _, _), result in zip(jobs, items, results):
+            if isinstance(result, str):
+                logger.error("Job %s failed: %s", job.id, result)
+                async with session.begin_nested():
+                    await self._record_failure(job, result, session)
+                continue
+            meta, segments, child_spans = result
+            spans = Spans()
+            spans.update(child_spans)
+            try:
+                with spans.span("persist"):
+                    async with session.begin_nested():
+                        if not await self._release_job(
+                            job, session, status=JobStatusEnum.done
+                        ):
+                            raise LeaseLostError(job.id)
+                        await self._save_results(
+                            session, job.upload_id, file_path, meta, segments
+                        )
+                        await session.execute(
+                            update(Upload)
+                            .where(Upload.id == job.upload_id)
+                            .values(status=StatusUploadEnum.ready)
+                        )
+                job_spans[job.id] = spans
+            except LeaseLostError:
+                logger.warning("Lease of job %s lost, result dropped", job.id)
+            except Exception as e:
+                logger.exception("Job %s failed: %s", job.id, e)
+                async with session.begin_nested():
+                    await self._record_failure(job, str(e), session)
+        with batch_spans.span("commit"):
+            await session.commit()
+        finished.update(job.id for job in jobs)
+        JOBS_COMPLETED.labels(type="analyze").inc(len(job_spans) + reused)
+        for spans in job_spans.values():
+            spans.update(batch_spans.durations)
+        await self._save_timings(session, job_spans)
+        logger.info("Batch of %s jobs finished", len(jobs))
+
+    async def _resegment(self, job: Job, session: AsyncSession) -> None:
+        """
+        Пересчёт сегментов по сохранённым признакам кадров
+        с параметрами из job.payload; аудио не читается.
+        """
+        audio = (
+            await session.execute(
+                select(AudioFile)
+                .where(AudioFile.upload_id == job.upload_id)
+                .order_by(AudioFile.created_at.desc())
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+        if not audio:
+            raise RuntimeError("Upload is not analyzed")
+        features_path = upload_features_path(job.upload_id)
+        if not os.path.exists(features_path):
+            raise RuntimeError("Frame features not found")
+        await session.commit()
+
+        spans = Spans()
+        with spans.span("resegment"):
+            segments = await self.pool.run(
+                partial(resegment_features, **(job.payload or {})),
+                features_path,
+                audio.sample_rate,
+                audio.duration_s,
+            )
+
+        with spans.span("persist"):
+            if not await self._release_job(
+                job, session, status=JobStatusEnum.done
+            ):
+                raise LeaseLostError(job.id)
+            await session.execute(
+                delete(Segment).where(Segment.audio_id == audio.id)
+            )
+            await self._save_segments(session, audio.id, segments)
+        with spans.span("commit"):
+            await session.commit()
+        JOBS_COMPLETED.labels(type=job.type).inc()
+        await self._save_timings(session, {job.id: spans})
+        logger.info(
+            "Job %s resegmented upload %s: %s segments",
+            job.id,
+            job.upload_id,
+            len(segments),
+        )
+
+    async def _save_timings(
+        self, session: AsyncSession, job_spans: dict[uuid.UUID, Spans]
+    ) -> None:
+        """
+        Пишет этапы в Job.timings и гистограммы метрик.
+        Отдельной транзакцией после commit, чтобы учесть и его длительность.
+        Задачи к этому моменту уже завершены, поэтому ошибка записи
+        только логируется и не уходит в _handle_failure.
+        """
+        if not job_spans:
+            return
+        for spans in job_spans.values():
+            for stage, seconds in spans.durations.items():
+                JOB_STAGE_SECONDS.labels(stage=stage).observe(seconds)
+        try:
+            await session.execute(
+                update(Job),
+                [
+                    dict(id=job_id, timings=spans.as_dict())
+                    for job_id, spans in job_spans.items()
+                ],
+            )
+            await session.commit()
+        except Exception as e:
+            logger.exception(
+                "Failed to save timings of jobs %s: %s", list(job_spans), e
+            )
+            await session.rollback()
+
+    def _profile_mode(self) -> str | None:
+        """Режим профилирования для выборки задач (PROFILE_SAMPLE_RATE)."""
+        if PROFILE_MODE and random.random() < PROFILE_SAMPLE_RATE:
+            return PROFILE_MODE
+        return None
+
+    async def _reuse_duplicate(
+        self, job: Job, upload: Upload, session: AsyncSession
+    ) -> bool:
+        """Копирует готовый анализ того же содержимого вместо нового."""
+        source = await find_analyzed_duplicate(
+            session, upload.id, upload.checksum_sha256
+        )
+        if not source:
+            return False
+        await self._apply_duplicate(job, upload.id, source, session)
+        await session.commit()
+        JOBS_COMPLETED.labels(type=job.type).inc()
+        logger.info(
+            "Job %s reused analysis of upload %s", job.id, source.upload_id
+        )
+        return True
+
+    async def _apply_duplicate(
+        self,
+        job: Job,
+        upload_id: uuid.UUID,
+        source: AudioFile,
+        session: AsyncSession,
+    ) -> None:
+        """Завершает задачу копией анализа source (без commit)."""
+        if not await self._release_job(
+            job, session, status=JobStatusEnum.done
+        ):
+            raise LeaseLostError(job.id)
+        await asyncio.to_thread(
+            share_upload_storage, source.upload_id, upload_id
+        )
+        await clone_analysis(session, source, upload_id)
+        await session.execute(
+            update(Upload)
+            .where(Upload.id == upload_id)
+            .values(status=StatusUploadEnum.ready)
+        )
+
+    async def _save_results(
+        self,
+        session: AsyncSession,
+        upload_id: uuid.UUID,
+        file_path: str,
+        meta: dict,
+        segments: list[dict],
+    ) -> uuid.UUID:
+        """
+        Записывает AudioFile и его сегменты.
+        id генерируется на клиенте, поэтому flush ради audio.id не нужен.
+        """
+        audio_id = uuid.uuid4()
+        await session.execute(
+            insert(AudioFile).values(
+                id=audio_id,
+                upload_id=upload_id,
+                file_path=file_path,
+                duration_s=meta["duration_s"],
+                channels=meta["channels"],
+                sample_rate=meta["sample_rate"],
+                format=meta["format"],
+                rms_avg=meta["rms_avg"],
+                zcr_avg=meta["zcr_avg"],
+            )
+        )
+        await self._save_segments(session, audio_id, segments)
+        return audio_id
+
+    async def _save_segments(
+        self,
+        session: AsyncSession,
+        audio_id: uuid.UUID,
+        segments: list[dict],
+    ) -> None:
+        """Сегменты пишутся одним executemany (или COPY для больших наборов)."""
+        if not segments:
+            return
+
+        if len(segments) >= SEGMENTS_COPY_THRESHOLD:
+            await self._copy_segments(session, audio_id, segments)
+        else:
+            await session.execute(
+                insert(Segment),
+                [
+                    dict(
+                        audio_id=audio_id,
+                        start_ms=seg["start_ms"],
+                        end_ms=seg["end_ms"],
+                        rms=seg["rms"],
+                        zcr=seg["zcr"],
+                        transcript="(placeholder)",
+                    )
+                    for seg in segments
+                ],
+            )
+
+    async def _copy_segments(
+        self,
+        session: AsyncSession,
+        audio_id: uuid.UUID,
+        segments: list[dict],
+    ) -> None:
+        """COPY сегментов через asyncpg в транзакции сессии."""
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        created_at = datetime.utcnow()
+        await raw.driver_connection.copy_records_to_table(
+            Segment.__tablename__,
+            columns=[
+                "audio_id",
+                "start_ms",
+                "end_ms",
+                "rms",
+                "zcr",
+                "transcript",
+                "created_at",
+            ],
+            records=[
+                (
+                    audio_id,
+                    seg["start_ms"],
+                    seg["end_ms"],
+                    seg["rms"],
+                    seg["zcr"],
+                    "(placeholder)",
+                    created_at,
+                )
+                for seg in segments
+            ],
+        )
+
     @connection
     async def _handle_failure(
         self, job: Job, error: str, session: AsyncSession
     ) -> None:
-        """Обработка ошибок, экспоненциальная задержка."""
-        job.last_error = error
+        """
+        Обработка ошибок, экспоненциальная задержка.
+        Повтор планируется через run_after, воркер при этом не ждёт.
+        """
+        await self._record_failure(job, error, session)
+        await session.commit()
+
+    async def _record_failure(
+        self, job: Job, error: str, session: AsyncSession
+    ) -> None:
+        """Записывает неудачу задачи в текущую транзакцию (без commit)."""
         if job.attempts >= MAX_ATTEMPTS:
-            job.status = JobStatusEnum.failed
+            if not await self._release_job(
+                job, session, status=JobStatusEnum.failed, last_error=error
+            ):
+                logger.warning("Lease of job %s lost", job.id)
+                return
             upload = await session.get(Upload, job.upload_id)
-            if upload:
+            if upload and job.type == "analyze":
                 upload.status = StatusUploadEnum.failed
+            JOB_FAILURES.labels(type=job.type).inc()
             logger.error(
                 "Job %s failed permanently after %s attempts",
                 job.id,
                 job.attempts,
             )
         else:
-            job.status = JobStatusEnum.queued
             delay = RETRY_BASE_DELAY * (2**job.attempts)
+            if not await self._release_job(
+                job,
+                session,
+                status=JobStatusEnum.queued,
+                last_error=error,
+                run_after=datetime.utcnow() + timedelta(seconds=delay),
+            ):
+                logger.warning("Lease of job %s lost", job.id)
+                return
+            JOB_RETRIES.labels(type=job.type).inc()
             logger.warning("Retrying job %s in %ss", job.id, delay)
-            await asyncio.sleep(delay)
-        await session.commit()
-
-
-def analyze_audio_bytes(raw_bytes: bytes) -> tuple[dict, list[dict]]:
-    """
-    Выполняется в отдельном потоке через run_in_executor.
-    Возвращает (метаданные, список сегментов)
-    """
-    with wave.open(io.BytesIO(raw_bytes), "rb") as wf:
-        channels = wf.getnchannels()
-        sample_rate = wf.getframerate()
-        n_frames = wf.getnframes()
-        duration_s = n_frames / sample_rate
-        audio = np.frombuffer(wf.readframes(n_frames), dtype=np.int16)
-
-    window_size = int(sample_rate * 0.05)  # 50мс окна
-    threshold = 500
-    segments = []
-    rms_all, zcr_all = [], []
-
-    in_voice = False
-    seg_start = 0
-
-    for i in range(0, len(audio), window_size):
-        window = audio[i : i + window_size]
-        if len(window) == 0:
-            continue
-        rms = float(np.sqrt(np.mean(window**2)))
-        zcr = float(((window[:-1] * window[1:]) < 0).mean())
-        rms_all.append(rms)
-        zcr_all.append(zcr)
-
-        if rms > threshold and not in_voice:
-            in_voice = True
-            seg_start = i
-        elif rms <= threshold and in_voice:
-            in_voice = False
-            segments.append(
-                dict(
-                    start_ms=int(seg_start / sample_rate * 1000),
-                    end_ms=int(i / sample_rate * 1000),
-                    rms=rms,
-                    zcr=zcr,
-                )
-            )
-
-    if in_voice:
-        segments.append(
-            dict(
-                start_ms=int(seg_start / sample_rate * 1000),
-                end_ms=int(len(audio) / sample_rate * 1000),
-                rms=rms_all[-1],
-                zcr=zcr_all[-1],
-            )
-        )
-
-    meta = dict(
-        duration_s=duration_s,
-        channels=channels,
-        sample_rate=sample_rate,
-        format="wav",
-        rms_avg=float(np.mean(rms_all)),
-        zcr_avg=float(np.mean(zcr_all)),
-    )
-    return meta, segments
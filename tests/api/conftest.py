@@ -0,0 +1,121 @@
+import hashlib
+import uuid
+from datetime import datetime
+
+import httpx
+import pytest
+from sqlalchemy import update
+
+from app.core.storage import upload_file_path
+from app.db.database import async_session_maker
+from app.db.models import AudioFile, Segment, StatusUploadEnum, Upload
+from app.main import create_app
+from app.tools.synth import SynthSpec, wav_bytes
+
+
+@pytest.fixture
+def app(db, storage):
+    # без lifespan: воркер и LISTEN в этих тестах не запускаются
+    return create_app()
+
+
+@pytest.fixture
+async def client(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def wav() -> bytes:
+    """2 с моно 8 кГц, 16 бит."""
+    return wav_bytes(SynthSpec("test", 2, sample_rate=8000, seed=1))
+
+
+@pytest.fixture
+def upload(client):
+    """Загружает байты чанками и завершает загрузку, возвращает JSON."""
+
+    async def upload(data: bytes, chunk_size: int = 4096) -> dict:
+        created = await client.post(
+            "/audio/uploads",
+            json=dict(filename="test.wav", size_bytes=len(data)),
+        )
+        assert created.status_code == 201
+        upload_id = created.json()["id"]
+        for offset in range(0, len(data), chunk_size):
+            response = await client.patch(
+                f"/audio/uploads/{upload_id}",
+                params=dict(offset=offset),
+                content=data[offset : offset + chunk_size],
+            )
+            assert response.status_code == 200
+        completed = await client.post(
+            f"/audio/uploads/{upload_id}/complete",
+            json=dict(checksum_sha256=hashlib.sha256(data).hexdigest()),
+        )
+        assert completed.status_code == 202
+        return completed.json()
+
+    return upload
+
+
+async def add_uploads(created_at: list[datetime]) -> list[uuid.UUID]:
+    """Готовые загрузки без файлов с заданным created_at."""
+    async with async_session_maker() as session:
+        uploads = [
+            Upload(
+                filename=f"{i}.wav",
+                content_type="audio/wav",
+                size_bytes=1,
+                status=StatusUploadEnum.ready,
+                created_at=ts,
+            )
+            for i, ts in enumerate(created_at)
+        ]
+        session.add_all(uploads)
+        await session.commit()
+        return [upload.id for upload in uploads]
+
+
+async def collect(client, url: str, **params) -> tuple[list, int]:
+    """Все элементы по next_cursor и число запрошенных страниц."""
+    items, pages, cursor = [], 0, None
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(url, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        items += page["items"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+async def mark_analyzed(upload_id: str) -> None:
+    """Результат анализа, как его записал бы воркер."""
+    async with async_session_maker() as session:
+        audio = AudioFile(
+            upload_id=uuid.UUID(upload_id),
+            file_path=upload_file_path(upload_id),
+            duration_s=2,
+            channels=1,
+            sample_rate=8000,
+            format="wav/pcm_s16le",
+        )
+        session.add(audio)
+        await session.flush()
+        session.add_all(
+            Segment(audio_id=audio.id, start_ms=s, end_ms=s + 300)
+            for s in (0, 1000)
+        )
+        await session.execute(
+            update(Upload)
+            .where(Upload.id == audio.upload_id)
+            .values(status=StatusUploadEnum.ready)
+        )
+        await session.commit()
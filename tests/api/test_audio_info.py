@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import update
+
+from app.core.config import worker_settings
+from app.db.database import async_session_maker
+from app.db.models import Segment, StatusUploadEnum, Upload
+from app.db.notifications import PgListener, notify
+
+from .conftest import add_uploads, mark_analyzed
+
+
+async def analyzed_upload() -> str:
+    (upload_id,) = await add_uploads([datetime.utcnow()])
+    await mark_analyzed(str(upload_id))
+    return str(upload_id)
+
+
+async def shift_segments(upload_id: str, ms: int) -> None:
+    """Меняет сегменты в БД, как пересегментация, без NOTIFY."""
+    async with async_session_maker() as session:
+        await session.execute(
+            update(Segment).values(
+                start_ms=Segment.start_ms + ms, end_ms=Segment.end_ms + ms
+            )
+        )
+        await session.commit()
+
+
+async def test_etag_and_not_modified(client):
+    upload_id = await analyzed_upload()
+    url = f"/audio/{upload_id}"
+
+    response = await client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert [s["start_ms"] for s in response.json()["segments"]] == [0, 1000]
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = await client.get(url, headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+async def test_results_notify_invalidates_cache(app, client):
+    audio_service = app.container.audio_service()
+    upload_id = await analyzed_upload()
+    url = f"/audio/{upload_id}"
+    etag = (await client.get(url)).headers["etag"]
+
+    # без уведомления ответ берётся из кэша
+    await shift_segments(upload_id, 100)
+    assert (await client.get(url)).headers["etag"] == etag
+
+    # воркер шлёт NOTIFY при commit результатов (в т.ч. resegment)
+    listener = PgListener(
+        worker_settings.RESULTS_CHANNEL,
+        callback=audio_service.invalidate_audio_info,
+    )
+    await listener.start()
+    try:
+        generation = audio_service.audio_info_cache.generation
+        async with async_session_maker() as session:
+            await notify(session, worker_settings.RESULTS_CHANNEL, upload_id)
+            await session.commit()
+        for _ in range(100):
+            if audio_service.audio_info_cache.generation != generation:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await listener.stop()
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [s["start_ms"] for s in response.json()["segments"]] == [
+        100,
+        1100,
+    ]
+
+
+async def test_invalidation_during_load_not_cached(app, client, monkeypatch):
+    audio_service = app.container.audio_service()
+    upload_id = await analyzed_upload()
+    load = audio_service._load_audio_info
+
+    async def racing_load(upload_id):
+        loaded = await load(upload_id)
+        # NOTIFY пришёл, пока читались старые результаты
+        audio_service.invalidate_audio_info(str(upload_id))
+        return loaded
+
+    monkeypatch.setattr(audio_service, "_load_audio_info", racing_load)
+    assert (await client.get(f"/audio/{upload_id}")).status_code == 200
+    assert audio_service.audio_info_cache.get(UUID(upload_id)) is None
+    monkeypatch.undo()
+
+    await client.get(f"/audio/{upload_id}")
+    assert audio_service.audio_info_cache.get(UUID(upload_id)) is not None
+
+
+async def test_not_ready_results_not_cached(app, client):
+    audio_service = app.container.audio_service()
+    upload_id = await analyzed_upload()
+    async with async_session_maker() as session:
+        await session.execute(
+            update(Upload).values(status=StatusUploadEnum.processing)
+        )
+        await session.commit()
+
+    assert (await client.get(f"/audio/{upload_id}")).status_code == 200
+    assert audio_service.audio_info_cache.get(UUID(upload_id)) is None
@@ -0,0 +1,49 @@
+import os
+import uuid
+
+from sqlalchemy import func, select
+
+from app.core.storage import upload_file_path
+from app.db.database import async_session_maker
+from app.db.models import Job
+
+from .conftest import mark_analyzed
+
+
+async def test_duplicate_upload_reuses_analysis(client, upload, wav):
+    source = await upload(wav)
+    await mark_analyzed(source["id"])
+
+    duplicate = await upload(wav)
+
+    # результат готов сразу: без задачи и без анализа
+    assert duplicate["status"] == "ready"
+    async with async_session_maker() as session:
+        jobs = await session.scalar(
+            select(func.count())
+            .select_from(Job)
+            .where(Job.upload_id == uuid.UUID(duplicate["id"]))
+        )
+    assert jobs == 0
+
+    response = await client.get(f"/audio/{duplicate['id']}")
+    assert response.status_code == 200
+    audio = response.json()
+    assert audio["upload_id"] == duplicate["id"]
+    assert [s["start_ms"] for s in audio["segments"]] == [0, 1000]
+
+    # файл дубликата — жёсткая ссылка на файл источника
+    assert os.path.samefile(
+        upload_file_path(source["id"]), upload_file_path(duplicate["id"])
+    )
+
+
+async def test_same_content_not_analyzed_yet(upload, wav):
+    first = await upload(wav)
+    second = await upload(wav)
+
+    # готового результата нет: обе загрузки ждут анализа
+    assert first["status"] == second["status"] == "processing"
+    assert not os.path.samefile(
+        upload_file_path(first["id"]), upload_file_path(second["id"])
+    )
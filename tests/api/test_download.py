@@ -0,0 +1,105 @@
+import hashlib
+import io
+import wave
+
+import pytest
+
+from app.core.storage import upload_file_path
+
+
+@pytest.fixture
+async def uploaded(upload, wav) -> tuple[str, str]:
+    body = await upload(wav)
+    return body["id"], f'"{hashlib.sha256(wav).hexdigest()}"'
+
+
+async def test_download_full_and_etag(client, wav, uploaded):
+    upload_id, etag = uploaded
+
+    response = await client.get(f"/audio/{upload_id}/download")
+    assert response.status_code == 200
+    assert response.content == wav
+    assert response.headers["etag"] == etag
+
+    response = await client.get(
+        f"/audio/{upload_id}/download", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+
+async def test_download_range(client, wav, uploaded):
+    upload_id, _ = uploaded
+
+    response = await client.get(
+        f"/audio/{upload_id}/download", headers={"Range": "bytes=100-199"}
+    )
+
+    assert response.status_code == 206
+    assert response.content == wav[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(wav)}"
+
+
+async def test_download_if_range(client, wav, uploaded):
+    upload_id, etag = uploaded
+    url = f"/audio/{upload_id}/download"
+
+    response = await client.get(
+        url, headers={"Range": "bytes=0-9", "If-Range": etag}
+    )
+    assert response.status_code == 206
+    assert response.content == wav[:10]
+
+    # файл на клиенте другой версии: отдаём целиком
+    response = await client.get(
+        url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.content == wav
+
+
+async def test_wav_snippet(client, wav, uploaded):
+    upload_id, etag = uploaded
+
+    response = await client.get(
+        f"/audio/{upload_id}/download",
+        params=dict(start_ms=500, end_ms=1500),
+    )
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert int(response.headers["content-length"]) == len(response.content)
+    with wave.open(io.BytesIO(response.content)) as snippet:
+        assert (snippet.getframerate(), snippet.getnchannels()) == (8000, 1)
+        frames = snippet.readframes(snippet.getnframes())
+    # 16 бит моно 8 кГц: 1 с = 8000 фреймов по 2 байта после заголовка 44
+    assert frames == wav[44 + 500 * 16 : 44 + 1500 * 16]
+
+
+async def test_wav_snippet_out_of_range(client, uploaded):
+    upload_id, _ = uploaded
+
+    response = await client.get(
+        f"/audio/{upload_id}/download", params=dict(start_ms=5000)
+    )
+
+    assert response.status_code == 416
+
+
+async def test_wav_snippet_corrupt_file(client, uploaded):
+    upload_id, _ = uploaded
+    with open(upload_file_path(upload_id), "r+b") as f:
+        f.write(b"JUNK")
+
+    response = await client.get(
+        f"/audio/{upload_id}/download", params=dict(start_ms=500)
+    )
+
+    assert response.status_code == 415
+    assert response.json()["detail"] == "Not a RIFF/WAVE file"
+
+
+async def test_download_unknown_upload(client):
+    response = await client.get(
+        "/audio/00000000-0000-0000-0000-000000000000/download"
+    )
+    assert response.status_code == 404
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from .conftest import add_uploads, collect
+
+
+async def test_uploads_keyset_pages(client):
+    now = datetime.utcnow()
+    # две пары с одинаковым created_at: порядок добирается по id
+    ids = await add_uploads(
+        [now, now, now - timedelta(seconds=1), now - timedelta(seconds=1)]
+        + [now - timedelta(seconds=s) for s in range(2, 5)]
+    )
+    expected = sorted(
+        zip([now, now] + [now - timedelta(seconds=1)] * 2, ids[:4]),
+        reverse=True,
+    )
+
+    items, pages = await collect(client, "/audio/uploads", limit=2)
+
+    assert pages == 4
+    assert [item["id"] for item in items] == [
+        str(upload_id) for _, upload_id in expected
+    ] + [str(upload_id) for upload_id in ids[4:]]
+
+
+async def test_uploads_cursor_with_filter(client):
+    now = datetime.utcnow()
+    await add_uploads([now - timedelta(minutes=m) for m in range(6)])
+
+    items, _ = await collect(
+        client,
+        "/audio/uploads",
+        limit=2,
+        created_from=(now - timedelta(minutes=3, seconds=30)).isoformat(),
+    )
+
+    assert len(items) == 4
+
+
+async def test_invalid_cursor(client):
+    for cursor in ("not-a-cursor", "WyJ4Il0"):  # второй — ["x"]
+        response = await client.get(
+            "/audio/uploads", params=dict(cursor=cursor)
+        )
+        assert response.status_code == 400
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from app.db.database import async_session_maker
+from app.db.models import AudioFile, Segment
+
+from .conftest import add_uploads, collect
+
+
+async def test_segments_keyset_pages(client):
+    (upload_id,) = await add_uploads([datetime.utcnow()])
+    async with async_session_maker() as session:
+        audio = AudioFile(
+            upload_id=upload_id,
+            file_path="f",
+            duration_s=10,
+            channels=1,
+            sample_rate=8000,
+            format="pcm_s16le",
+        )
+        session.add(audio)
+        await session.flush()
+        # два сегмента с одним start_ms
+        starts = [0, 1000, 1000, 2000, 3000, 4000, 5000]
+        session.add_all(
+            Segment(audio_id=audio.id, start_ms=s, end_ms=s + 500)
+            for s in starts
+        )
+        await session.commit()
+
+    url = f"/audio/{upload_id}/segments"
+    items, pages = await collect(client, url, limit=3)
+    assert pages == 3
+    assert [item["start_ms"] for item in items] == starts
+    assert len({item["id"] for item in items}) == len(starts)
+
+    # окно: сегменты, пересекающие [1200, 3100)
+    items, _ = await collect(client, url, limit=2, from_ms=1200, to_ms=3100)
+    assert [item["start_ms"] for item in items] == [1000, 1000, 2000, 3000]
+
+    response = await client.get(url, params=dict(cursor="bad"))
+    assert response.status_code == 400
@@ -0,0 +1,156 @@
+import hashlib
+import os
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.storage import upload_file_path
+from app.db.database import async_session_maker
+from app.db.models import Job, JobStatusEnum
+
+
+async def create(client, size_bytes: int) -> str:
+    response = await client.post(
+        "/audio/uploads", json=dict(filename="a.wav", size_bytes=size_bytes)
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+async def patch(client, upload_id: str, offset: int, data: bytes):
+    return await client.patch(
+        f"/audio/uploads/{upload_id}", params=dict(offset=offset), content=data
+    )
+
+
+async def get_offset(client, upload_id: str) -> int:
+    response = await client.get(f"/audio/uploads/{upload_id}/offset")
+    assert response.status_code == 200
+    return response.json()["uploaded_bytes"]
+
+
+async def test_chunked_upload_resume_and_complete(client, wav):
+    upload_id = await create(client, len(wav))
+    half = len(wav) // 2
+
+    response = await patch(client, upload_id, 0, wav[:half])
+    assert response.status_code == 200
+    assert response.json()["uploaded_bytes"] == half
+
+    # клиент переподключился и узнаёт, с какого места продолжать
+    offset = await get_offset(client, upload_id)
+    assert offset == half
+    response = await patch(client, upload_id, offset, wav[offset:])
+    assert response.json()["uploaded_bytes"] == len(wav)
+
+    response = await client.post(
+        f"/audio/uploads/{upload_id}/complete",
+        json=dict(checksum_sha256=hashlib.sha256(wav).hexdigest()),
+    )
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "processing"
+    assert body["checksum_sha256"] == hashlib.sha256(wav).hexdigest()
+    with open(upload_file_path(upload_id), "rb") as f:
+        assert f.read() == wav
+
+    async with async_session_maker() as session:
+        job = (await session.execute(select(Job))).scalar_one()
+    assert (job.type, job.status) == ("analyze", JobStatusEnum.queued)
+
+    # повторный complete возвращает текущее состояние
+    response = await client.post(f"/audio/uploads/{upload_id}/complete")
+    assert response.status_code == 202
+    assert response.json()["status"] == "processing"
+
+
+async def test_offset_mismatch(client, wav):
+    upload_id = await create(client, len(wav))
+    await patch(client, upload_id, 0, wav[:100])
+
+    for offset in (0, 50, 200):
+        response = await patch(client, upload_id, offset, wav[offset:])
+        assert response.status_code == 409
+        assert "Offset mismatch" in response.json()["detail"]
+    assert await get_offset(client, upload_id) == 100
+
+
+async def test_chunk_over_declared_size_keeps_offset(client, wav):
+    upload_id = await create(client, 100)
+
+    response = await patch(client, upload_id, 0, wav[:150])
+
+    assert response.status_code == 409
+    assert await get_offset(client, upload_id) == 0
+
+
+async def test_complete_rejects_incomplete_and_bad_checksum(client, wav):
+    upload_id = await create(client, len(wav))
+    await patch(client, upload_id, 0, wav[:100])
+
+    response = await client.post(f"/audio/uploads/{upload_id}/complete")
+    assert response.status_code == 409
+    assert "incomplete" in response.json()["detail"]
+
+    await patch(client, upload_id, 100, wav[100:])
+    response = await client.post(
+        f"/audio/uploads/{upload_id}/complete",
+        json=dict(checksum_sha256="0" * 64),
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Checksum mismatch"
+
+
+async def test_failed_write_does_not_advance_offset(app, client, wav):
+    upload_id = await create(client, len(wav))
+    await patch(client, upload_id, 0, wav[:100])
+
+    async def broken_body():
+        yield wav[100:200]
+        raise OSError("connection reset")
+
+    audio_service = app.container.audio_service()
+    with pytest.raises(OSError, match="connection reset"):
+        await audio_service.write_chunk(upload_id, 100, broken_body())
+    assert await get_offset(client, upload_id) == 100
+
+    # повтор с прежнего offset: хвост отброшен, SHA-256 сходится
+    await patch(client, upload_id, 100, wav[100:])
+    assert os.path.getsize(upload_file_path(upload_id)) == len(wav)
+    response = await client.post(
+        f"/audio/uploads/{upload_id}/complete",
+        json=dict(checksum_sha256=hashlib.sha256(wav).hexdigest()),
+    )
+    assert response.status_code == 202
+
+
+async def test_idle_upload_hasher_evicted(app, client, wav, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_HASHER_TTL", 0)
+    audio_service = app.container.audio_service()
+    idle = await create(client, len(wav))
+    await patch(client, idle, 0, wav[:100])
+    assert UUID(idle) in audio_service._hashers
+
+    # следующая запись в другую загрузку вытесняет простаивающую
+    active = await create(client, len(wav))
+    await patch(client, active, 0, wav[:100])
+    assert list(audio_service._hashers) == [UUID(active)]
+
+    # продолжение после вытеснения: хеш пересчитан с диска
+    await patch(client, idle, 100, wav[100:])
+    response = await client.post(
+        f"/audio/uploads/{idle}/complete",
+        json=dict(checksum_sha256=hashlib.sha256(wav).hexdigest()),
+    )
+    assert response.status_code == 202
+    assert UUID(idle) not in audio_service._hashers
+
+
+async def test_unknown_upload(client):
+    upload_id = "00000000-0000-0000-0000-000000000000"
+
+    assert (await patch(client, upload_id, 0, b"x")).status_code == 404
+    response = await client.get(f"/audio/uploads/{upload_id}/offset")
+    assert response.status_code == 404
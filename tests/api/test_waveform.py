@@ -0,0 +1,81 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.core.peaks import PeakPyramidBuilder
+from app.core.storage import upload_peaks_path
+
+BINS = 2000  # точек нулевого уровня: уровни 2000, 1000, 500
+
+
+@pytest.fixture
+def peaks_upload(storage) -> str:
+    """
+    Пирамида пиков 8 кГц без записи в БД: в k-й точке нулевого уровня
+    отсчёты k и один отсчёт -k, то есть пара (-k, k).
+    """
+    upload_id = str(uuid.uuid4())
+    builder = PeakPyramidBuilder(8000)
+    samples = np.repeat(np.arange(BINS, dtype=np.int16), 256)
+    samples[::256] *= -1
+    builder.feed(samples)
+    path = upload_peaks_path(upload_id)
+    os.makedirs(os.path.dirname(path))
+    builder.write(path)
+    return upload_id
+
+
+async def test_waveform_slice(client, peaks_upload):
+    url = f"/audio/{peaks_upload}/waveform"
+
+    # точка нулевого уровня — 256 отсчётов, 32 мс: [100, 200) — точки 3..6
+    response = await client.get(url, params=dict(from_ms=100, to_ms=200))
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["levels"], body["samples_per_bin"]) == (3, 256)
+    assert body["start_ms"] == 96
+    assert body["data"] == [-3, 3, -4, 4, -5, 5, -6, 6]
+
+    # уровень 1 вдвое грубее: точка k сводит точки 2k и 2k + 1
+    response = await client.get(
+        url, params=dict(level=1, from_ms=100, to_ms=200)
+    )
+    body = response.json()
+    assert (body["samples_per_bin"], body["start_ms"]) == (512, 64)
+    assert body["data"] == [-3, 3, -5, 5, -7, 7]
+
+
+async def test_waveform_level_out_of_range(client, peaks_upload):
+    response = await client.get(
+        f"/audio/{peaks_upload}/waveform", params=dict(level=3)
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "level must be in [0, 2]"
+
+
+async def test_waveform_bins_capped(client, peaks_upload, monkeypatch):
+    monkeypatch.setattr(settings, "WAVEFORM_MAX_BINS", 600)
+    url = f"/audio/{peaks_upload}/waveform"
+
+    response = await client.get(url)
+    assert response.status_code == 400
+    assert response.json()["detail"] == (
+        "Too many bins (2000 > 600): use level >= 2 or a narrower range"
+    )
+
+    response = await client.get(url, params=dict(level=2))
+    assert response.status_code == 200
+    assert len(response.json()["data"]) == 2 * 500
+
+    # подробный уровень по частям
+    response = await client.get(url, params=dict(from_ms=0, to_ms=19200))
+    assert len(response.json()["data"]) == 2 * 600
+
+
+async def test_waveform_not_found(client, storage):
+    response = await client.get(f"/audio/{uuid.uuid4()}/waveform")
+    assert response.status_code == 404
@@ -0,0 +1,103 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# RTF в baselines.json нормирован калибровочным циклом (rtf_norm =
+# rtf * calibration_s), который замеряется в той же сессии: базовые
+# значения переносимы между машинами с точностью до соотношения
+# скоростей numpy-операций. Если допуск всё же срабатывает на другом
+# классе CI-раннеров — перезапишите файл на нём (AUDIO_BENCH_UPDATE=1)
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+
+# AUDIO_BENCH_UPDATE=1 перезаписывает baselines.json текущими замерами
+UPDATE_BASELINES = os.getenv("AUDIO_BENCH_UPDATE") == "1"
+# AUDIO_BENCH_LONG=1 включает многочасовые записи
+RUN_LONG = os.getenv("AUDIO_BENCH_LONG") == "1"
+# допустимое падение real-time factor относительно базового, доля
+RTF_TOLERANCE = float(os.getenv("AUDIO_BENCH_RTF_TOLERANCE", "0.5"))
+# допустимый рост пиковой памяти относительно базовой, доля
+MEMORY_TOLERANCE = float(os.getenv("AUDIO_BENCH_MEMORY_TOLERANCE", "0.25"))
+
+# калибровочный цикл: те же операции, что в покадровом анализе
+CALIBRATION_WINDOW = 800  # кадр 50 мс при 16 кГц
+CALIBRATION_SAMPLES = CALIBRATION_WINDOW * 1200  # блок анализа ~60 с
+CALIBRATION_ROUNDS = 7
+CALIBRATION_REPEATS = 30  # проходов по блоку в одном замере
+
+_results: dict[str, dict] = {}
+
+
+def _calibrate() -> float:
+    """Лучшее CPU-время фиксированного цикла, секунды."""
+    rng = np.random.default_rng(0)
+    audio = rng.integers(-(2**15), 2**15, CALIBRATION_SAMPLES, np.int16)
+    frames = audio.reshape(-1, CALIBRATION_WINDOW)
+    best = float("inf")
+    for _ in range(CALIBRATION_ROUNDS):
+        start = time.process_time()
+        for _ in range(CALIBRATION_REPEATS):
+            samples = frames.astype(np.float32)
+            np.sqrt(np.einsum("ij,ij->i", samples, samples))
+            signs = np.sign(frames)
+            np.count_nonzero(signs[:, :-1] * signs[:, 1:] < 0, axis=1)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+@pytest.fixture(scope="session")
+def calibration_s() -> float:
+    return _calibrate()
+
+
+@pytest.fixture(scope="session")
+def baselines() -> dict[str, dict]:
+    if not BASELINES_PATH.exists():
+        return {}
+    return json.loads(BASELINES_PATH.read_text())
+
+
+@pytest.fixture(scope="session")
+def bench_results() -> dict[str, dict]:
+    return _results
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("analysis benchmarks")
+    terminalreporter.write_line(
+        f"{'case':<28}{'audio, s':>10}{'cpu, s':>10}"
+        f"{'wall, s':>10}{'RTF':>10}{'RTF norm':>10}{'peak, MB':>10}"
+    )
+    for name, r in sorted(_results.items()):
+        terminalreporter.write_line(
+            f"{name:<28}{r['duration_s']:>10.1f}{r['cpu_s']:>10.3f}"
+            f"{r['wall_s']:>10.3f}{r['rtf']:>10.0f}{r['rtf_norm']:>10.2f}"
+            f"{r['peak_mb']:>10.1f}"
+        )
+
+    if UPDATE_BASELINES:
+        stored = (
+            json.loads(BASELINES_PATH.read_text())
+            if BASELINES_PATH.exists()
+            else {}
+        )
+        for name, r in _results.items():
+            stored[name] = {
+                key: r[key]
+                for key in (
+                    "duration_s",
+                    "segments",
+                    "voiced_ms",
+                    "rtf_norm",
+                    "peak_mb",
+                )
+            }
+        BASELINES_PATH.write_text(
+            json.dumps(stored, indent=2, sort_keys=True) + "\n"
+        )
+        terminalreporter.write_line(f"baselines written to {BASELINES_PATH}")
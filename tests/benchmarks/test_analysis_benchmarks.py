@@ -0,0 +1,168 @@
+import time
+import tracemalloc
+
+import pytest
+
+from app.tools.synth import SynthSpec, wav_bytes, write_wav
+from app.workers.analysis import analyze_audio_bytes, analyze_audio_file
+
+from .conftest import (
+    MEMORY_TOLERANCE,
+    RTF_TOLERANCE,
+    RUN_LONG,
+    UPDATE_BASELINES,
+)
+
+pytestmark = pytest.mark.benchmark
+
+# записи в памяти: analyze_audio_bytes
+MEMORY_CASES = [
+    SynthSpec("speech_8k_mono_60s", 60, sample_rate=8000, seed=1),
+    SynthSpec("speech_16k_mono_60s", 60, seed=2),
+    SynthSpec(
+        "speech_22k_mono_f32_30s",
+        30,
+        sample_rate=22050,
+        codec="pcm_f32le",
+        seed=3,
+    ),
+    SynthSpec(
+        "mixed_44k_stereo_60s",
+        60,
+        sample_rate=44100,
+        channels=2,
+        seed=4,
+        speech_ratio=0.4,
+        noise_ratio=0.3,
+    ),
+    SynthSpec(
+        "noise_48k_stereo_s24_30s",
+        30,
+        sample_rate=48000,
+        channels=2,
+        codec="pcm_s24le",
+        seed=5,
+        speech_ratio=0.1,
+        noise_ratio=0.8,
+    ),
+    SynthSpec(
+        "silence_16k_mono_60s",
+        60,
+        seed=6,
+        speech_ratio=0.0,
+        noise_ratio=0.0,
+    ),
+]
+
+# записи на диске: потоковый analyze_audio_file
+FILE_CASES = [
+    SynthSpec("speech_16k_mono_10min_file", 600, seed=7),
+    pytest.param(
+        SynthSpec(
+            "speech_48k_stereo_1h_file",
+            3600,
+            sample_rate=48000,
+            channels=2,
+            seed=8,
+        ),
+        marks=pytest.mark.skipif(
+            not RUN_LONG, reason="set AUDIO_BENCH_LONG=1 to run"
+        ),
+    ),
+    pytest.param(
+        SynthSpec("speech_16k_mono_4h_file", 4 * 3600, seed=9),
+        marks=pytest.mark.skipif(
+            not RUN_LONG, reason="set AUDIO_BENCH_LONG=1 to run"
+        ),
+    ),
+]
+
+ROUNDS = 5  # лучший из замеров времени для коротких записей
+
+
+def _measure(func, rounds: int) -> dict:
+    """
+    Лучшее время (CPU и wall) из rounds прогонов и пиковая память
+    отдельного прогона под tracemalloc: трассировка замедляет анализ
+    и не должна попадать в замер времени.
+    """
+    cpu_s = wall_s = float("inf")
+    for _ in range(rounds):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        meta, segments = func()
+        cpu_s = min(cpu_s, time.process_time() - cpu_start)
+        wall_s = min(wall_s, time.perf_counter() - wall_start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    duration_s = meta["duration_s"]
+    return dict(
+        duration_s=duration_s,
+        segments=len(segments),
+        voiced_ms=sum(s["end_ms"] - s["start_ms"] for s in segments),
+        cpu_s=cpu_s,
+        wall_s=wall_s,
+        rtf=round(duration_s / max(cpu_s, 1e-9), 1),
+        peak_mb=round(peak / 2**20, 2),
+    )
+
+
+def _check(
+    spec: SynthSpec, result: dict, baselines, bench_results, calibration_s
+) -> None:
+    result["rtf_norm"] = round(result["rtf"] * calibration_s, 3)
+    bench_results[spec.name] = result
+    if UPDATE_BASELINES:
+        return
+    baseline = baselines.get(spec.name)
+    if baseline is None:
+        pytest.skip(f"no baseline for {spec.name} (AUDIO_BENCH_UPDATE=1)")
+
+    # корпус детерминирован: результат анализа должен совпасть точно
+    assert result["duration_s"] == baseline["duration_s"]
+    assert result["segments"] == baseline["segments"]
+    assert result["voiced_ms"] == baseline["voiced_ms"]
+
+    min_rtf = baseline["rtf_norm"] * (1 - RTF_TOLERANCE)
+    assert result["rtf_norm"] >= min_rtf, (
+        f"{spec.name}: normalized RTF {result['rtf_norm']} < {min_rtf:.3f} "
+        f"(baseline {baseline['rtf_norm']}, calibration {calibration_s:.4f} s)"
+    )
+    # +1 МБ: мелкие колебания аллокатора на коротких записях
+    max_mb = baseline["peak_mb"] * (1 + MEMORY_TOLERANCE) + 1
+    assert result["peak_mb"] <= max_mb, (
+        f"{spec.name}: peak {result['peak_mb']} MB > {max_mb:.1f} MB "
+        f"(baseline {baseline['peak_mb']} MB)"
+    )
+
+
+@pytest.mark.parametrize("spec", MEMORY_CASES, ids=lambda s: s.name)
+def test_analyze_bytes(
+    spec: SynthSpec, baselines, bench_results, calibration_s
+):
+    raw = wav_bytes(spec)
+    result = _measure(lambda: analyze_audio_bytes(raw), ROUNDS)
+    _check(spec, result, baselines, bench_results, calibration_s)
+
+
+@pytest.mark.parametrize("spec", FILE_CASES, ids=lambda s: s.name)
+def test_analyze_file(
+    spec: SynthSpec, baselines, bench_results, calibration_s, tmp_path
+):
+    path = tmp_path / "audio.wav"
+    with open(path, "wb") as f:
+        write_wav(spec, f)
+    result = _measure(
+        lambda: analyze_audio_file(
+            str(path),
+            str(tmp_path / "peaks"),
+            str(tmp_path / "features.npy"),
+        ),
+        rounds=1,
+    )
+    _check(spec, result, baselines, bench_results, calibration_s)
@@ -0,0 +1,89 @@
+import uuid
+from datetime import datetime
+
+import asyncpg
+import pytest
+
+from app.core.config import settings
+from app.db.database import async_session_maker, engine
+from app.db.models import Base, Job, JobStatusEnum, StatusUploadEnum, Upload
+
+
+async def _ensure_database() -> None:
+    conn = await asyncpg.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASS,
+        database="postgres",
+    )
+    try:
+        exists = await conn.fetchval(
+            "SELECT 1 FROM pg_database WHERE datname = $1", settings.DB_NAME
+        )
+        if not exists:
+            await conn.execute(f'CREATE DATABASE "{settings.DB_NAME}"')
+    finally:
+        await conn.close()
+
+
+@pytest.fixture
+async def db():
+    """
+    Пустая схема тестовой БД (.env.test) на время теста. Без Postgres
+    или с рабочей БД (имя не оканчивается на _test) тест пропускается.
+    """
+    if not settings.DB_NAME.endswith("_test"):
+        pytest.skip(f"DB_NAME={settings.DB_NAME} is not a *_test database")
+    try:
+        await _ensure_database()
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"Postgres is not available: {e}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    # соединения пула привязаны к циклу событий теста
+    await engine.dispose()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Каталог загрузок во временной папке теста."""
+    path = tmp_path / "uploads"
+    monkeypatch.setattr(settings, "UPLOADS_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def add_job(db):
+    """Фабрика загрузки с задачей в очереди: await add_job(size_bytes)."""
+
+    async def add_job(
+        size_bytes: int,
+        priority: int = 0,
+        run_after: datetime | None = None,
+        type: str = "analyze",
+        status: JobStatusEnum = JobStatusEnum.queued,
+    ) -> uuid.UUID:
+        async with async_session_maker() as session:
+            upload = Upload(
+                filename="test.wav",
+                content_type="audio/wav",
+                size_bytes=size_bytes,
+                status=StatusUploadEnum.processing,
+            )
+            session.add(upload)
+            await session.flush()
+            job = Job(
+                upload_id=upload.id,
+                type=type,
+                status=status,
+                priority=priority,
+                run_after=run_after or datetime.utcnow(),
+            )
+            session.add(job)
+            await session.commit()
+            return job.id
+
+    return add_job
@@ -0,0 +1,150 @@
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from app.core.wav import (
+    WAVE_FORMAT_EXTENSIBLE,
+    WAVE_FORMAT_PCM,
+    read_wav_layout,
+)
+from app.tools.synth import SynthSpec, wav_bytes
+from app.workers.analysis import FRAME_S, analyze_audio_bytes
+
+
+def make_wav(raw: bytes, sample_width: int, channels: int = 1) -> io.BytesIO:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(sample_width)
+        w.setframerate(8000)
+        w.writeframes(raw)
+    buf.seek(0)
+    return buf
+
+
+def decode(f: io.BytesIO) -> tuple[str, np.ndarray]:
+    layout = read_wav_layout(f)
+    f.seek(layout.data_offset)
+    return layout.codec, layout.downmix(f.read(layout.data_size))
+
+
+def test_u8_is_offset_binary():
+    codec, mono = decode(make_wav(bytes([0, 128, 255]), 1))
+
+    assert codec == "pcm_u8"
+    np.testing.assert_array_equal(mono, [-32768, 0, 127 * 256])
+
+
+def test_s24_keeps_sign_and_scale():
+    values = [0, 1 << 8, -(1 << 8), (1 << 23) - 1, -(1 << 23)]
+    raw = b"".join(v.to_bytes(3, "little", signed=True) for v in values)
+
+    codec, mono = decode(make_wav(raw, 3))
+
+    assert codec == "pcm_s24le"
+    # шкала int16: старшие 16 бит отсчёта
+    np.testing.assert_allclose(
+        mono, [0, 1, -1, 32767.99609375, -32768], rtol=0, atol=1e-6
+    )
+
+
+def test_s24_stereo_channels():
+    left, right = [100 << 8, -(200 << 8)], [300 << 8, 400 << 8]
+    raw = b"".join(
+        v.to_bytes(3, "little", signed=True)
+        for frame in zip(left, right)
+        for v in frame
+    )
+    f = make_wav(raw, 3, channels=2)
+    layout = read_wav_layout(f)
+    f.seek(layout.data_offset)
+    data = f.read(layout.data_size)
+
+    views = layout.channel_views(data)
+    assert views.shape == (2, 2)
+    np.testing.assert_array_equal(views[:, 0] >> 16, [100, -200])
+    np.testing.assert_array_equal(views[:, 1] >> 16, [300, 400])
+    np.testing.assert_allclose(layout.downmix(data), [200, 100])
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"RIFX\0\0\0\0WAVE", "Not a RIFF/WAVE"),
+        (b"RIFF\0\0\0\0WAVEdata\0\0\0\0", "fmt chunk not found"),
+    ],
+)
+def test_malformed_header(data, message):
+    with pytest.raises(ValueError, match=message):
+        read_wav_layout(io.BytesIO(data))
+
+
+SPEC = dict(name="speech", duration_s=5, sample_rate=8000, seed=3)
+
+
+def assert_bounds_close(actual: list[dict], expected: list[dict]) -> None:
+    # кадр у порога тишины может уйти в соседний сегмент от разницы
+    # квантования: границы совпадают с точностью до кадра анализа
+    bounds = np.array([(s["start_ms"], s["end_ms"]) for s in actual])
+    reference = np.array([(s["start_ms"], s["end_ms"]) for s in expected])
+    assert bounds.shape == reference.shape
+    assert np.abs(bounds - reference).max() <= FRAME_S * 1000
+
+
+@pytest.mark.parametrize("codec", ["pcm_s24le", "pcm_f32le"])
+def test_analysis_matches_s16(codec):
+    s16 = analyze_audio_bytes(wav_bytes(SynthSpec(**SPEC)))
+    other = analyze_audio_bytes(wav_bytes(SynthSpec(**SPEC, codec=codec)))
+
+    assert other[0]["format"] == f"wav/{codec}"
+    assert other[0]["duration_s"] == s16[0]["duration_s"]
+    assert_bounds_close(other[1], s16[1])
+
+
+def test_u8_analysis_matches_s16():
+    wav = wav_bytes(SynthSpec(**SPEC))
+    s16 = np.frombuffer(wav[44:], dtype="<i2")
+    u8 = ((s16 >> 8) + 128).astype(np.uint8)
+
+    meta, segments = analyze_audio_bytes(make_wav(u8.tobytes(), 1).read())
+
+    assert meta["format"] == "wav/pcm_u8"
+    assert_bounds_close(segments, analyze_audio_bytes(wav)[1])
+
+
+def test_extensible_analysis_equals_pcm():
+    wav = wav_bytes(SynthSpec(**SPEC))
+    layout = read_wav_layout(io.BytesIO(wav))
+    # WAVE_FORMAT_EXTENSIBLE: cbSize, validBits, маска каналов и GUID
+    # SubFormat, первые два байта которого — тег PCM
+    fmt = struct.pack(
+        "<HHIIHHHHI16s",
+        WAVE_FORMAT_EXTENSIBLE,
+        1,
+        8000,
+        16000,
+        2,
+        16,
+        22,
+        16,
+        0x4,
+        struct.pack("<H", WAVE_FORMAT_PCM)
+        + bytes.fromhex("000000001000800000aa00389b71"),
+    )
+    data = wav[layout.data_offset :]
+    extensible = b"".join(
+        (
+            struct.pack(
+                "<4sI4s", b"RIFF", 4 + 8 + len(fmt) + 8 + len(data), b"WAVE"
+            ),
+            struct.pack("<4sI", b"fmt ", len(fmt)),
+            fmt,
+            struct.pack("<4sI", b"data", len(data)),
+            data,
+        )
+    )
+
+    assert analyze_audio_bytes(extensible) == analyze_audio_bytes(wav)
@@ -0,0 +1,237 @@
+import numpy as np
+import pytest
+
+from app.tools.synth import SynthSpec, wav_bytes
+from app.workers import analysis
+from app.workers.analysis import (
+    FRAME_S,
+    VOICE_THRESHOLD,
+    FrameAnalyzer,
+    analyze_audio_bytes,
+    analyze_audio_file,
+    resegment_features,
+)
+
+SAMPLE_RATE = 8000
+WINDOW = int(SAMPLE_RATE * FRAME_S)
+# фразы, шум и тишина по секундам; длина не кратна кадру
+SPEC = SynthSpec("speech", 12.0123, sample_rate=SAMPLE_RATE, seed=1)
+
+
+@pytest.fixture(scope="module")
+def wav() -> bytes:
+    return wav_bytes(SPEC)
+
+
+@pytest.fixture(scope="module")
+def audio(wav) -> np.ndarray:
+    # 16 бит моно: данные сразу после 44-байтного заголовка
+    return np.frombuffer(wav[44:], dtype="<i2")
+
+
+def reference_analysis(
+    audio: np.ndarray,
+    window_size: int = WINDOW,
+    threshold: float = VOICE_THRESHOLD,
+    hangover: int = 0,
+) -> tuple[dict, list[dict]]:
+    """
+    Исходный покадровый цикл (до векторизации) с hangover и средними
+    rms/zcr по кадрам сегмента — эталон для FrameAnalyzer.
+    Квадраты и произведения — во float64, без переполнения int16.
+    """
+    rms_all, zcr_all, bounds = [], [], []
+    start, last_voiced = None, -hangover - 1
+    for frame, i in enumerate(range(0, len(audio), window_size)):
+        window = audio[i : i + window_size].astype(np.float64)
+        signs = np.sign(window)
+        rms_all.append(float(np.sqrt(np.mean(window**2))))
+        zcr_all.append(
+            float((signs[:-1] * signs[1:] < 0).mean())
+            if len(window) > 1
+            else 0
+        )
+        if rms_all[-1] > threshold:
+            last_voiced = frame
+        voiced = frame - last_voiced <= hangover
+        if voiced and start is None:
+            start = frame
+        elif not voiced and start is not None:
+            bounds.append((start, frame))
+            start = None
+    if start is not None:
+        bounds.append((start, len(rms_all)))
+
+    segments = [
+        dict(
+            start_ms=start * window_size * 1000 // SAMPLE_RATE,
+            end_ms=min(end * window_size, len(audio)) * 1000 // SAMPLE_RATE,
+            rms=float(np.mean(rms_all[start:end])),
+            zcr=float(np.mean(zcr_all[start:end])),
+        )
+        for start, end in bounds
+    ]
+    averages = dict(rms_avg=np.mean(rms_all), zcr_avg=np.mean(zcr_all))
+    return averages, segments
+
+
+def assert_segments_equal(actual: list[dict], expected: list[dict]) -> None:
+    assert [(s["start_ms"], s["end_ms"]) for s in actual] == [
+        (s["start_ms"], s["end_ms"]) for s in expected
+    ]
+    # RMS кадров считается во float32
+    np.testing.assert_allclose(
+        [s["rms"] for s in actual], [s["rms"] for s in expected], rtol=1e-5
+    )
+    np.testing.assert_allclose(
+        [s["zcr"] for s in actual], [s["zcr"] for s in expected], atol=1e-6
+    )
+
+
+def analyze(audio: np.ndarray, chunk: int, **kwargs) -> tuple[dict, list]:
+    analyzer = FrameAnalyzer(SAMPLE_RATE, WINDOW, **kwargs)
+    for i in range(0, len(audio), chunk):
+        analyzer.feed(audio[i : i + chunk])
+    return analyzer.finish()
+
+
+@pytest.mark.parametrize("hangover", [0, 3])
+@pytest.mark.parametrize(
+    "chunk",
+    [
+        10**9,  # весь сигнал одним блоком
+        WINDOW * 7,  # границы блоков совпадают с кадрами
+        997,  # кадры разрезаны между блоками
+        1,
+    ],
+)
+def test_frame_analyzer_matches_reference(audio, chunk, hangover):
+    averages, segments = analyze(audio, chunk, hangover=hangover)
+    expected_averages, expected = reference_analysis(audio, hangover=hangover)
+
+    assert len(expected) > 3
+    assert_segments_equal(segments, expected)
+    assert averages["rms_avg"] == pytest.approx(
+        expected_averages["rms_avg"], rel=1e-5
+    )
+    assert averages["zcr_avg"] == pytest.approx(
+        expected_averages["zcr_avg"], rel=1e-6
+    )
+
+
+def test_hangover_bridges_short_pauses(audio):
+    _, plain = analyze(audio, len(audio))
+    _, bridged = analyze(audio, len(audio), hangover=3)
+
+    # паузы до трёх кадров не разрывают сегмент, а хвост сегмента
+    # продлевается на hangover кадров (в пределах записи)
+    assert len(bridged) < len(plain)
+    for segment in plain:
+        assert any(
+            s["start_ms"] <= segment["start_ms"]
+            and segment["end_ms"] <= s["end_ms"]
+            for s in bridged
+        )
+
+
+def test_empty_and_short_input():
+    assert FrameAnalyzer(SAMPLE_RATE, WINDOW).finish() == (
+        dict(rms_avg=None, zcr_avg=None),
+        [],
+    )
+    # неполный единственный кадр
+    averages, segments = analyze(np.full(10, 1000, np.int16), 10)
+    assert averages == dict(rms_avg=1000.0, zcr_avg=0.0)
+    assert segments == [dict(start_ms=0, end_ms=1, rms=1000.0, zcr=0.0)]
+
+
+def test_streaming_file_matches_bytes(wav, audio, tmp_path, monkeypatch):
+    path = tmp_path / "speech.wav"
+    path.write_bytes(wav)
+    # блок чтения в 7 кадров: десятки блоков на запись
+    monkeypatch.setattr(analysis, "BLOCK_FRAMES", 7)
+
+    meta, segments = analyze_audio_file(str(path))
+
+    assert (meta, segments) == analyze_audio_bytes(wav)
+    assert meta["duration_s"] == len(audio) / SAMPLE_RATE
+    assert meta["format"] == "wav/pcm_s16le"
+    assert_segments_equal(segments, reference_analysis(audio)[1])
+
+
+@pytest.fixture
+def features_path(wav, tmp_path) -> str:
+    wav_path = tmp_path / "speech.wav"
+    wav_path.write_bytes(wav)
+    path = str(tmp_path / "speech.features.npy")
+    analyze_audio_file(str(wav_path), None, path)
+    return path
+
+
+def test_feed_features_matches_feed(audio, features_path):
+    features = np.load(features_path)
+    assert features.shape == (-(-len(audio) // WINDOW), 2)
+
+    analyzer = FrameAnalyzer(SAMPLE_RATE, WINDOW, hangover=2)
+    # признаки подаются блоками с числом отсчётов каждого блока
+    for start in range(0, len(features), 50):
+        block = features[start : start + 50]
+        n_samples = min(len(block) * WINDOW, len(audio) - start * WINDOW)
+        analyzer.feed_features(block[:, 0], block[:, 1], n_samples)
+
+    assert analyzer.finish() == analyze(audio, 997, hangover=2)
+
+
+def test_resegment_defaults_match_analysis(wav, audio, features_path):
+    segments = resegment_features(
+        features_path, SAMPLE_RATE, len(audio) / SAMPLE_RATE
+    )
+
+    assert segments == analyze_audio_bytes(wav)[1]
+
+
+def test_resegment_threshold_and_hangover(audio, features_path):
+    duration_s = len(audio) / SAMPLE_RATE
+
+    segments = resegment_features(
+        features_path,
+        SAMPLE_RATE,
+        duration_s,
+        threshold=1500,
+        hangover_ms=150,
+    )
+
+    # 150мс — ровно три кадра по 50мс
+    expected = reference_analysis(audio, threshold=1500, hangover=3)[1]
+    assert len(expected) > 3
+    assert_segments_equal(segments, expected)
+
+
+def test_resegment_wider_window(audio, features_path):
+    segments = resegment_features(
+        features_path, SAMPLE_RATE, len(audio) / SAMPLE_RATE, window_ms=100
+    )
+
+    # RMS окна из двух кадров — корень из среднего квадрата RMS кадров,
+    # то есть точный RMS окна; ZCR — среднее по кадрам, без перехода
+    # через стык кадров, поэтому расходится не больше чем на 1/WINDOW
+    expected = reference_analysis(audio, window_size=2 * WINDOW)[1]
+    assert [(s["start_ms"], s["end_ms"]) for s in segments] == [
+        (s["start_ms"], s["end_ms"]) for s in expected
+    ]
+    np.testing.assert_allclose(
+        [s["rms"] for s in segments], [s["rms"] for s in expected], rtol=1e-5
+    )
+    np.testing.assert_allclose(
+        [s["zcr"] for s in segments],
+        [s["zcr"] for s in expected],
+        atol=1 / WINDOW,
+    )
+
+
+@pytest.mark.parametrize("window_ms", [0, -50, 75])
+def test_resegment_rejects_unaligned_window(features_path, window_ms):
+    with pytest.raises(ValueError, match="multiple of 50"):
+        resegment_features(
+            features_path, SAMPLE_RATE, 1.0, window_ms=window_ms
+        )
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import uuid
+
+from sqlalchemy import func, select, update
+
+from app.db.database import async_session_maker
+from app.db.models import (
+    AudioFile,
+    Job,
+    JobStatusEnum,
+    Segment,
+    StatusUploadEnum,
+    Upload,
+)
+from app.workers.pool import AnalysisPool
+from app.workers.worker import Worker
+
+
+class NoAnalysisPool(AnalysisPool):
+    async def run_timed(self, func, *args):
+        raise AssertionError("duplicates must not be analyzed")
+
+
+class BrokenPool(AnalysisPool):
+    async def run_timed(self, func, *args):
+        raise RuntimeError("pool is broken")
+
+
+async def add_source(checksum: str) -> uuid.UUID:
+    """Проанализированная загрузка с одним сегментом."""
+    async with async_session_maker() as session:
+        upload = Upload(
+            filename="a.wav",
+            content_type="audio/wav",
+            size_bytes=1000,
+            checksum_sha256=checksum,
+            status=StatusUploadEnum.ready,
+        )
+        session.add(upload)
+        await session.flush()
+        audio = AudioFile(
+            upload_id=upload.id,
+            file_path="f",
+            duration_s=1,
+            channels=1,
+            sample_rate=8000,
+            format="wav/pcm_s16le",
+        )
+        session.add(audio)
+        await session.flush()
+        session.add(Segment(audio_id=audio.id, start_ms=0, end_ms=500))
+        await session.commit()
+        return upload.id
+
+
+async def add_duplicate_job(add_job, storage, checksum: str) -> uuid.UUID:
+    """Задача для загрузки с содержимым уже проанализированной."""
+    source = await add_source(checksum)
+    (storage / str(source)).mkdir(parents=True)
+    (storage / str(source) / "file").write_bytes(b"wav")
+    job_id = await add_job(1000)
+    async with async_session_maker() as session:
+        upload_id = await session.scalar(
+            select(Job.upload_id).where(Job.id == job_id)
+        )
+        await session.execute(
+            update(Upload)
+            .where(Upload.id == upload_id)
+            .values(checksum_sha256=checksum)
+        )
+        await session.commit()
+    return job_id
+
+
+async def test_batch_reuses_duplicates(add_job, storage):
+    for i in range(3):
+        checksum = hashlib.sha256(bytes([i])).hexdigest()
+        await add_duplicate_job(add_job, storage, checksum)
+
+    worker = Worker(asyncio.Event(), NoAnalysisPool(), concurrency=2)
+    (batch,) = await worker._fetch_next_jobs(1)
+    assert len(batch) == 3
+    await worker._run_batch(batch)
+
+    async with async_session_maker() as session:
+        statuses = (
+            await session.execute(
+                select(Job.status, func.count()).group_by(Job.status)
+            )
+        ).all()
+        uploads = (
+            await session.execute(
+                select(Upload.status, func.count()).group_by(Upload.status)
+            )
+        ).all()
+        segments = await session.scalar(select(func.count(Segment.id)))
+    assert statuses == [(JobStatusEnum.done, 3)]
+    assert uploads == [(StatusUploadEnum.ready, 6)]
+    assert segments == 6
+
+
+async def test_pool_error_fails_only_unfinished_jobs(add_job, storage, caplog):
+    checksum = hashlib.sha256(b"dup").hexdigest()
+    duplicate = await add_duplicate_job(add_job, storage, checksum)
+    analyzed = await add_job(1000)
+
+    worker = Worker(asyncio.Event(), BrokenPool(), concurrency=2)
+    (batch,) = await worker._fetch_next_jobs(1)
+    assert {job.id for job in batch} == {duplicate, analyzed}
+    await worker._run_batch(batch)
+
+    async with async_session_maker() as session:
+        done = await session.get(Job, duplicate)
+        failed = await session.get(Job, analyzed)
+    assert done.status == JobStatusEnum.done
+    assert (failed.status, failed.last_error) == (
+        JobStatusEnum.queued,
+        "pool is broken",
+    )
+    # дубликат уже завершён: повторной записи неудачи и потери аренды нет
+    assert "Lease of job" not in caplog.text
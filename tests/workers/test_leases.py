@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+import app.workers.worker as worker_module
+from app.db.database import async_session_maker
+from app.db.models import (
+    AudioFile,
+    Job,
+    JobStatusEnum,
+    StatusUploadEnum,
+    Upload,
+)
+from app.workers.pool import AnalysisPool
+from app.workers.worker import Worker
+
+META = dict(
+    duration_s=1.0,
+    channels=1,
+    sample_rate=8000,
+    format="wav/pcm_s16le",
+    rms_avg=1000.0,
+    zcr_avg=0.1,
+)
+
+
+def make_worker(pool: AnalysisPool | None = None) -> Worker:
+    return Worker(asyncio.Event(), pool or AnalysisPool(), 4)
+
+
+async def claim(worker: Worker) -> Job:
+    async with async_session_maker() as session:
+        claimed = await worker._claim_jobs(session, 1)
+        await session.commit()
+    return claimed[0][0]
+
+
+async def get_job(job_id) -> Job:
+    async with async_session_maker() as session:
+        return await session.get(Job, job_id)
+
+
+async def get_upload_status(job: Job) -> StatusUploadEnum:
+    async with async_session_maker() as session:
+        return await session.scalar(
+            select(Upload.status).where(Upload.id == job.upload_id)
+        )
+
+
+async def set_job(job_id, **values) -> None:
+    async with async_session_maker() as session:
+        await session.execute(
+            update(Job).where(Job.id == job_id).values(**values)
+        )
+        await session.commit()
+
+
+async def test_reaper_requeues_expired_lease(add_job):
+    job_id = await add_job(1024)
+    worker = make_worker()
+    job = await claim(worker)
+    now = datetime.utcnow()
+    await set_job(job_id, locked_until=now - timedelta(seconds=1))
+
+    await worker._reap_expired_leases()
+
+    job = await get_job(job_id)
+    assert job.status == JobStatusEnum.queued
+    assert job.locked_by is None and job.locked_until is None
+    assert job.last_error == "Lease expired"
+    assert job.run_after >= now
+    # попытка уже засчитана при захвате
+    assert job.attempts == 1
+
+
+async def test_reaper_keeps_live_leases(add_job):
+    job_id = await add_job(1024)
+    worker = make_worker()
+    await claim(worker)
+
+    await worker._reap_expired_leases()
+
+    job = await get_job(job_id)
+    assert job.status == JobStatusEnum.in_progress
+    assert job.locked_by == worker.worker_id
+
+
+async def test_reaper_fails_job_out_of_attempts(add_job):
+    job_id = await add_job(1024)
+    worker = make_worker()
+    job = await claim(worker)
+    await set_job(
+        job_id,
+        attempts=worker_module.MAX_ATTEMPTS,
+        locked_until=datetime.utcnow() - timedelta(seconds=1),
+    )
+
+    await worker._reap_expired_leases()
+
+    assert (await get_job(job_id)).status == JobStatusEnum.failed
+    assert await get_upload_status(job) == StatusUploadEnum.failed
+
+
+async def test_reaper_failed_resegment_keeps_upload(add_job):
+    job_id = await add_job(1024, type="resegment")
+    worker = make_worker()
+    job = await claim(worker)
+    await set_job(
+        job_id,
+        attempts=worker_module.MAX_ATTEMPTS,
+        locked_until=datetime.utcnow() - timedelta(seconds=1),
+    )
+
+    await worker._reap_expired_leases()
+
+    assert (await get_job(job_id)).status == JobStatusEnum.failed
+    assert await get_upload_status(job) == StatusUploadEnum.processing
+
+
+async def test_heartbeat_extends_own_leases(add_job, monkeypatch):
+    own_id = await add_job(1024)
+    other_id = await add_job(1024)
+    worker, other = make_worker(), make_worker()
+    await claim(worker)
+    await claim(other)
+    soon = datetime.utcnow() + timedelta(seconds=5)
+    await set_job(own_id, locked_until=soon)
+    await set_job(other_id, locked_until=soon)
+    monkeypatch.setattr(worker_module, "LEASE_TIMEOUT", 600)
+
+    await worker._extend_leases()
+
+    assert (await get_job(own_id)).locked_until > soon + timedelta(seconds=500)
+    # аренда чужой задачи не меняется
+    assert (await get_job(other_id)).locked_until == soon
+
+
+class StealingPool(AnalysisPool):
+    """Пока идёт анализ, аренду задачи забирает другой воркер."""
+
+    def __init__(self, job_id):
+        super().__init__()
+        self.job_id = job_id
+
+    async def run_timed(self, func, *args):
+        await set_job(
+            self.job_id,
+            locked_by="other-worker",
+            locked_until=datetime.utcnow() + timedelta(seconds=60),
+        )
+        segment = dict(start_ms=0, end_ms=1000, rms=1000.0, zcr=0.1)
+        return (META, [segment], {}), 0.0
+
+
+async def test_lost_lease_drops_stale_result(add_job, storage, caplog):
+    job_id = await add_job(1024)
+    worker = make_worker(StealingPool(job_id))
+    job = await claim(worker)
+    await worker._slots.acquire()
+
+    await worker._run_job(job)
+
+    # результат не записан, задача осталась за новым владельцем
+    job = await get_job(job_id)
+    assert job.status == JobStatusEnum.in_progress
+    assert job.locked_by == "other-worker"
+    assert job.last_error is None
+    assert await get_upload_status(job) == StatusUploadEnum.processing
+    async with async_session_maker() as session:
+        assert await session.scalar(select(func.count(AudioFile.id))) == 0
+    assert "result dropped" in caplog.text
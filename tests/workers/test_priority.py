@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+import app.workers.worker as worker_module
+from app.db.database import async_session_maker
+from app.db.models import Job
+from app.services.priority import job_priority
+from app.workers.pool import AnalysisPool
+from app.workers.worker import LeaseLostError, Worker
+
+MiB = 1024 * 1024
+
+
+def make_worker(concurrency: int = 4) -> Worker:
+    # пул не запускается: тесты не доходят до анализа
+    return Worker(asyncio.Event(), AnalysisPool(), concurrency)
+
+
+async def claim_one(worker: Worker):
+    async with async_session_maker() as session:
+        claimed = await worker._claim_jobs(session, 1)
+        await session.commit()
+    return claimed[0][0].id if claimed else None
+
+
+async def get_priority(job_id) -> int:
+    async with async_session_maker() as session:
+        return await session.scalar(
+            select(Job.priority).where(Job.id == job_id)
+        )
+
+
+async def set_updated_at(job_id, value: datetime) -> None:
+    async with async_session_maker() as session:
+        await session.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(updated_at=value)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+@pytest.mark.parametrize(
+    "size_bytes, lane",
+    [
+        (0, 0),
+        (MiB, 0),
+        (MiB + 1, 1),
+        (16 * MiB, 1),
+        (16 * MiB + 1, 2),
+        (128 * MiB, 2),
+        (128 * MiB + 1, 3),
+    ],
+)
+def test_job_priority_lanes(size_bytes, lane):
+    # bisect_left: файл ровно на границе остаётся в нижней полосе
+    assert job_priority("analyze", size_bytes) == lane
+
+
+def test_resegment_priority_ignores_size():
+    assert job_priority("resegment", 1024 * MiB) == 0
+
+
+async def test_lane_boundary_claim_order(add_job):
+    over = await add_job(MiB + 1, priority=job_priority("analyze", MiB + 1))
+    exact = await add_job(MiB, priority=job_priority("analyze", MiB))
+    worker = make_worker()
+
+    assert await claim_one(worker) == exact
+    assert await claim_one(worker) == over
+
+
+async def test_claim_order_by_priority_then_run_after(add_job):
+    now = datetime.utcnow()
+    late = await add_job(MiB, priority=0, run_after=now - timedelta(seconds=1))
+    early = await add_job(
+        MiB, priority=0, run_after=now - timedelta(seconds=10)
+    )
+    low = await add_job(MiB, priority=2, run_after=now - timedelta(hours=1))
+    await add_job(MiB, priority=0, run_after=now + timedelta(hours=1))
+    worker = make_worker()
+
+    order = [await claim_one(worker) for _ in range(4)]
+
+    assert order == [early, late, low, None]
+
+
+async def test_large_jobs_capped_small_jobs_claimed(add_job):
+    large = [await add_job(17 * MiB, priority=0) for _ in range(3)]
+    small = [await add_job(1000, priority=1) for _ in range(2)]
+    # 3 слота, SMALL_JOB_SLOTS=1: полоса крупных — 2 слота
+    worker = make_worker(concurrency=3)
+    assert worker.large_slots == 2
+
+    groups = await worker._fetch_next_jobs(3)
+
+    singles = [group[0].id for group in groups if len(group) == 1]
+    batches = [{job.id for job in group} for group in groups if len(group) > 1]
+    assert set(singles) == set(large[:2])
+    # мелкие задачи идут в свободный слот одной пачкой
+    assert batches == [set(small)]
+    assert worker._large_jobs == set(large[:2])
+
+    # полоса занята: третий крупный ждёт, хотя слот свободен
+    assert await worker._fetch_next_jobs(1) == []
+
+    worker._large_jobs.discard(large[0])
+    groups = await worker._fetch_next_jobs(1)
+    assert [[job.id for job in group] for group in groups] == [[large[2]]]
+
+
+async def test_aging_one_step_per_interval(add_job, monkeypatch):
+    monkeypatch.setattr(worker_module, "PRIORITY_AGING_INTERVAL", 60)
+    long_ago = datetime.utcnow() - timedelta(minutes=5)
+    job_id = await add_job(200 * MiB, priority=3, run_after=long_ago)
+    top = await add_job(MiB, priority=0, run_after=long_ago)
+    not_due = await add_job(
+        200 * MiB,
+        priority=3,
+        run_after=datetime.utcnow() + timedelta(minutes=5),
+    )
+    for id_ in (job_id, top, not_due):
+        await set_updated_at(id_, long_ago)
+    worker = make_worker()
+
+    # два прохода обслуживания в одном интервале — одна ступень
+    await worker._age_queued_jobs()
+    await worker._age_queued_jobs()
+    assert await get_priority(job_id) == 2
+
+    # прошёл интервал с последнего изменения — ещё ступень
+    await set_updated_at(job_id, datetime.utcnow() - timedelta(seconds=61))
+    await worker._age_queued_jobs()
+    assert await get_priority(job_id) == 1
+
+    assert await get_priority(top) == 0
+    assert await get_priority(not_due) == 3
+
+
+class BlockingPool(AnalysisPool):
+    """Анализ не завершается, пока не выставлен release."""
+
+    def __init__(self, error: Exception = RuntimeError("cancelled")):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def run_timed(self, func, *args):
+        await self.release.wait()
+        raise self.error
+
+
+async def test_full_large_lane_does_not_spin(add_job, storage):
+    for _ in range(3):
+        await add_job(17 * MiB, priority=0)
+    pool = BlockingPool()
+    # 2 слота, SMALL_JOB_SLOTS=1: полоса крупных — 1 слот
+    worker = Worker(asyncio.Event(), pool, concurrency=2)
+    fetches = 0
+    fetch_next_jobs = worker._fetch_next_jobs
+
+    async def counting_fetch(limit):
+        nonlocal fetches
+        fetches += 1
+        return await fetch_next_jobs(limit)
+
+    worker._fetch_next_jobs = counting_fetch
+    loop = asyncio.create_task(worker.worker_loop())
+    await asyncio.sleep(1)
+
+    # первая выборка забрала один крупный файл, дальше цикл ждёт
+    # освобождения полосы, а не опрашивает очередь без паузы
+    assert len(worker._large_jobs) == 1
+    assert fetches <= 2
+
+    worker.stop_event.set()
+    pool.release.set()
+    await asyncio.wait_for(loop, 10)
+
+
+async def test_freed_large_slot_wakes_loop(add_job, storage):
+    jobs = [await add_job(17 * MiB, priority=0) for _ in range(3)]
+    # задача завершается без изменения статуса в очереди, то есть
+    # без NOTIFY: цикл будит только освобождение слота полосы
+    pool = BlockingPool(LeaseLostError())
+    worker = Worker(asyncio.Event(), pool, concurrency=2)
+    loop = asyncio.create_task(worker.worker_loop())
+    await asyncio.sleep(0.5)
+
+    # освободившийся слот полосы сразу занимает следующий крупный
+    # файл, без ожидания FALLBACK_POLL_INTERVAL
+    pool.release.set()
+    await asyncio.sleep(1)
+    async with async_session_maker() as session:
+        attempts = await session.scalars(
+            select(Job.attempts).where(Job.id.in_(jobs))
+        )
+        assert list(attempts) == [1, 1, 1]
+
+    worker.stop_event.set()
+    await asyncio.wait_for(loop, 10)
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+import app.workers.worker as worker_module
+from app.db.database import async_session_maker
+from app.db.models import Job, JobStatusEnum, StatusUploadEnum, Upload
+from app.workers.pool import AnalysisPool
+from app.workers.worker import Worker
+
+
+def make_worker() -> Worker:
+    # пул не запускается: тесты не доходят до анализа
+    return Worker(asyncio.Event(), AnalysisPool(), 4)
+
+
+async def claim(worker: Worker, attempts: int) -> Job:
+    """Захватывает задачу как attempts-ю попытку."""
+    async with async_session_maker() as session:
+        (job, _), *_ = await worker._claim_jobs(session, 1)
+        await session.execute(
+            update(Job).where(Job.id == job.id).values(attempts=attempts)
+        )
+        await session.commit()
+    job.attempts = attempts
+    return job
+
+
+async def get_job(job_id) -> Job:
+    async with async_session_maker() as session:
+        return await session.get(Job, job_id)
+
+
+@pytest.mark.parametrize("attempts", [1, 2])
+async def test_failure_schedules_retry_with_backoff(add_job, attempts):
+    job_id = await add_job(1024)
+    worker = make_worker()
+    job = await claim(worker, attempts)
+    assert attempts < worker_module.MAX_ATTEMPTS
+    before = datetime.utcnow()
+
+    await worker._handle_failure(job, "boom")
+
+    # задержка растёт вдвое с каждой попыткой, воркер при этом не ждёт
+    delay = timedelta(seconds=worker_module.RETRY_BASE_DELAY * 2**attempts)
+    job = await get_job(job_id)
+    assert job.status == JobStatusEnum.queued
+    assert job.last_error == "boom"
+    assert job.locked_by is None and job.locked_until is None
+    assert before + delay <= job.run_after <= datetime.utcnow() + delay
+
+
+async def test_retry_not_claimed_before_run_after(add_job):
+    job_id = await add_job(1024)
+    worker = make_worker()
+    await worker._handle_failure(await claim(worker, 1), "boom")
+
+    async with async_session_maker() as session:
+        assert await worker._claim_jobs(session, 1) == []
+    # цикл воркера заснёт до отложенного повтора
+    assert await worker._seconds_until_next_job() > 0
+
+    job = await get_job(job_id)
+    assert job.status == JobStatusEnum.queued
+
+
+async def test_failure_at_attempt_limit_fails_upload(add_job):
+    job_id = await add_job(1024)
+    worker = make_worker()
+    job = await claim(worker, worker_module.MAX_ATTEMPTS)
+
+    await worker._handle_failure(job, "boom")
+
+    job = await get_job(job_id)
+    assert job.status == JobStatusEnum.failed
+    assert job.last_error == "boom"
+    assert job.locked_by is None
+    async with async_session_maker() as session:
+        upload = await session.get(Upload, job.upload_id)
+    assert upload.status == StatusUploadEnum.failed
+
+
+async def test_failure_after_lost_lease_is_ignored(add_job):
+    job_id = await add_job(1024)
+    worker = make_worker()
+    job = await claim(worker, 1)
+    async with async_session_maker() as session:
+        await session.execute(
+            update(Job).where(Job.id == job_id).values(locked_by="other")
+        )
+        await session.commit()
+
+    await worker._handle_failure(job, "boom")
+
+    job = await get_job(job_id)
+    assert job.status == JobStatusEnum.in_progress
+    assert job.locked_by == "other"
+    assert job.last_error is None
+    async with async_session_maker() as session:
+        assert (
+            await session.scalar(
+                select(Upload.status).where(Upload.id == job.upload_id)
+            )
+            == StatusUploadEnum.processing
+        )
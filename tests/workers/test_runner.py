@@ -0,0 +1,15 @@
+import pytest
+
+from app.core.config import worker_settings
+from app.workers import runner
+
+
+@pytest.mark.parametrize(
+    "processes, configured, size",
+    [(1, None, 8), (3, None, 2), (16, None, 1), (3, 5, 5)],
+)
+def test_analysis_pool_size(monkeypatch, processes, configured, size):
+    monkeypatch.setattr(runner.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(worker_settings, "ANALYSIS_PROCESSES", configured)
+
+    assert runner.analysis_pool_size(processes) == size
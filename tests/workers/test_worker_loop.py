@@ -0,0 +1,43 @@
+import asyncio
+
+import app.workers.worker as worker_module
+from app.db.database import async_session_maker
+from app.db.models import Job
+from app.workers.pool import AnalysisPool
+from app.workers.worker import Worker
+
+
+class FailingPool(AnalysisPool):
+    async def run_timed(self, func, *args):
+        raise RuntimeError("analysis failed")
+
+
+async def test_claim_errors_do_not_stop_loop(add_job, storage, monkeypatch):
+    monkeypatch.setattr(worker_module, "CLAIM_ERROR_BACKOFF", 0.01)
+    job_id = await add_job(1000)
+    worker = Worker(asyncio.Event(), FailingPool(), concurrency=2)
+    calls = 0
+    fetch_next_jobs = worker._fetch_next_jobs
+
+    async def flaky_fetch(limit):
+        nonlocal calls
+        calls += 1
+        if calls <= 2:
+            raise ConnectionError("database is restarting")
+        return await fetch_next_jobs(limit)
+
+    worker._fetch_next_jobs = flaky_fetch
+    loop = asyncio.create_task(worker.worker_loop())
+    await asyncio.sleep(0.5)
+
+    # после двух ошибок выборки задача всё же забрана и выполнена
+    assert not loop.done()
+    assert calls >= 3
+    async with async_session_maker() as session:
+        job = await session.get(Job, job_id)
+        assert (job.attempts, job.last_error) == (1, "analysis failed")
+
+    worker.stop_event.set()
+    await asyncio.wait_for(loop, 10)
+    # слоты упавших выборок возвращены
+    assert worker._slots._value == worker.concurrency